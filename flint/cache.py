@@ -0,0 +1,231 @@
+"""Caches of parsed sources and included files."""
+import hashlib
+import os
+import pickle
+import tempfile
+
+import flint
+
+# Format of the cache entries; increment if the entry layout changes
+CACHE_FORMAT = 13
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class ParseCache(object):
+    """On-disk cache of parsed `Source` objects.
+
+    Each source path has one entry, which is reused if the source key
+    (contents, flint version, tokenizer engine, parse mode, initial defines
+    and case vocabulary) is unchanged and each of its ``#include`` files
+    resolves to the same, unmodified file.  Entries are checksummed, and
+    corrupt or unreadable entries are discarded as misses.  The least
+    recently used entries are evicted once the cache exceeds `max_size`
+    bytes, down to `evict_ratio` of that size.
+    """
+
+    evict_ratio = 0.8
+
+    def __init__(self, path='.flint_cache', max_size=256 * 2**20):
+        self.path = path
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        self.size = sum(entry.stat().st_size
+                        for entry in os.scandir(self.path)
+                        if entry.name.endswith('.entry'))
+
+    def entry_path(self, src_path):
+        name = hashlib.sha256(src_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name + '.entry')
+
+    def key(self, src_path, engine, defines, mode='full', vocabulary=None,
+            statements=False):
+        """Return the key of a source file in its current state.
+
+        Sources parsed for a token index keep their statements, and have
+        their own entries.
+        """
+        if vocabulary is not None:
+            vocabulary = sorted(vocabulary)
+
+        digest = hashlib.sha256()
+        for field in (CACHE_FORMAT, flint.__version__, engine, mode, src_path,
+                      sorted(defines.items()), vocabulary, statements):
+            digest.update(repr(field).encode('utf-8'))
+        digest.update(file_digest(src_path).encode('ascii'))
+        return digest.hexdigest()
+
+    def load(self, src_path, project, engine, defines, mode='full',
+             vocabulary=None, statements=False):
+        """Return the cached source of `src_path`, or None on a miss."""
+        entry_path = self.entry_path(src_path)
+
+        src = None
+        try:
+            with open(entry_path, 'rb') as f:
+                checksum = f.readline().strip().decode('ascii')
+                payload = f.read()
+
+            if hashlib.sha256(payload).hexdigest() == checksum:
+                key, inc_digests, src = pickle.loads(payload)
+                if key != self.key(src_path, engine, defines, mode,
+                                   vocabulary, statements):
+                    src = None
+            else:
+                # Corrupt entry
+                self.discard(entry_path)
+
+        except (IOError, OSError):
+            pass
+        except Exception:
+            # Unreadable entry
+            self.discard(entry_path)
+
+        if src is not None:
+            # The includes must resolve to the same unmodified files
+            src.project = project
+            for (inc_fname, inc_path), digest in zip(src.includes,
+                                                     inc_digests):
+                if (src.find_include(inc_fname) != inc_path
+                        or (inc_path and file_digest(inc_path) != digest)):
+                    src = None
+                    break
+
+        if src is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            os.utime(entry_path, None)
+
+        return src
+
+    def store(self, src, engine, defines):
+        """Save a parsed source, evicting old entries if needed."""
+        if src.failure:
+            return
+
+        inc_digests = [file_digest(inc_path) if inc_path else None
+                       for _, inc_path in src.includes]
+        key = self.key(src.path, engine, defines, src.mode,
+                       src.report.cases.vocabulary,
+                       src.statements is not None)
+
+        # Timing only applies to the run which parsed the source
+        stats, src.stats = src.stats, None
+        try:
+            payload = pickle.dumps((key, inc_digests, src),
+                                   protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            src.stats = stats
+        checksum = hashlib.sha256(payload).hexdigest().encode('ascii')
+
+        entry_path = self.entry_path(src.path)
+        if os.path.exists(entry_path):
+            self.size -= os.path.getsize(entry_path)
+
+        # Write to a temporary file so that entries are replaced atomically
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(checksum + b'\n')
+            f.write(payload)
+        os.replace(tmp_path, entry_path)
+        self.size += len(checksum) + 1 + len(payload)
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries to free space."""
+        entries = sorted((entry.stat().st_mtime, entry.stat().st_size,
+                          entry.path)
+                         for entry in os.scandir(self.path)
+                         if entry.name.endswith('.entry'))
+
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if self.size <= self.evict_ratio * self.max_size:
+                break
+            self.discard(entry_path)
+
+    def discard(self, entry_path):
+        try:
+            size = os.path.getsize(entry_path)
+            os.remove(entry_path)
+            self.size -= size
+        except OSError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.entry'):
+                self.discard(entry.path)
+
+
+class IncludeEntry(object):
+    """The preprocessed result of an included file."""
+
+    def __init__(self):
+        self.defines = {}       # Macros defined after the include
+        self.inactive_lines = 0     # Lines skipped by conditionals
+        self.includes = []      # Nested includes, as (name, path) pairs
+        self.inc_reports = []   # Reports, as (path, Report) pairs
+        self.indent = []
+
+
+class IncludeCache(object):
+    """In-memory cache of included files, shared by the sources of a project.
+
+    Entries are keyed by the resolved path, modification time and size of
+    the file, the tokenizer engine, and the macros defined at the point of
+    inclusion.  An entry is only used if the nested includes of the file
+    resolve to the same paths for the including source.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, inc_path, engine, defines):
+        stat = os.stat(inc_path)
+        return (inc_path, stat.st_mtime_ns, stat.st_size, engine,
+                frozenset(defines.items()))
+
+    def get(self, key, src):
+        """Return the entry of `key` which is valid for `src`, if any."""
+        entry = self.entries.get(key)
+        if entry and any(src.find_include(inc_fname) != inc_path
+                         for inc_fname, inc_path in entry.includes):
+            entry = None
+
+        if entry:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+
+    def discard(self, inc_path):
+        """Remove the entries of an included file, and of the files which
+        include it."""
+        for key, entry in list(self.entries.items()):
+            if key[0] == inc_path or any(path == inc_path
+                                         for _, path in entry.includes):
+                del self.entries[key]
+
+    def clear(self):
+        self.entries.clear()
@@ -1,55 +1,20 @@
+from flint import statements
+from flint.events import CONSTRUCT_START, CONSTRUCT_END, STATEMENT
+from flint.parser import parse_scope
+from flint.statements import classify, construct_kinds, CONTINUE, END
+
+
 class Construct(object):
 
-    construct_types = [
-        'associate',
-        'block',
-        'critical',
-        'do',
-        'if',
-        'forall',
-        'where',
-        # Proxy for keyword pairs below
-        'change'
-        'select',
-    ]
-
-    # TODO: Ignore these for now
-    construct_kw_pairs = [
-        ('change', 'team'),
-        ('select', 'case'),
-        ('select', 'rank'),
-        ('select', 'type'),
-    ]
-
-    # TODO: Override for individual constructs?
+    __slots__ = ('ctype', 'name', 'events', 'depth')
+
+    construct_types = statements.construct_types
+    construct_kw_pairs = statements.construct_kw_pairs
+
     @staticmethod
     def statement(line):
-        # Pop off construct label
-        if line[0][-1] == ':':
-            line = line[1:]
-
-        # TODO: Actual rules vary for every construct type, not just 'if'
-        if line[0] in Construct.construct_types:
-            if line[0] == 'if':
-                return (line[0], line[-1]) == ('if', 'then')
-            elif line[0] == 'where':
-                assert line[1] == '('
-                par_count = 1
-                for idx, tok in enumerate(line[2:], start=2):
-                    if tok == '(':
-                        par_count += 1
-                    elif tok == ')':
-                        par_count -= 1
-
-                    if par_count == 0:
-                        break
-
-                return idx == len(line) - 1
-
-                # XXX: Need to figure this out!
-                return
-            else:
-                return True
+        """Return True if the line starts an executable construct."""
+        return classify(line) in construct_kinds
 
     def end_statement(self, line):
         if line[0].startswith('end'):
@@ -67,15 +32,21 @@ class Construct(object):
         else:
             return False
 
-    def __init__(self, depth=1, verbose=False):
+    def __init__(self, depth=1, events=None):
         self.ctype = None
         self.name = None
-        self.verbose = verbose
+
+        # Event stream of the parse, if any
+        self.events = events
 
         # Testing
         self.depth = depth
 
     def parse(self, lines):
+        parse_scope(self, lines)
+
+    def open(self, lines):
+        """Parse the construct statement at the current line."""
         line = lines.current_line
 
         # Check for construct label (and pop off)
@@ -83,23 +54,31 @@ class Construct(object):
             self.name = line[0][:-1]
             line = line[1:]
 
-        if line[0] == 'select':
+        # Constructs end with their keyword (END SELECT), except for CHANGE
+        # TEAM (END TEAM)
+        if line[0] == 'change':
             self.ctype = line[1]
         else:
             self.ctype = line[0]
 
-        if self.verbose:
-            print('C: {}{} '.format(' ' * (self.depth - 1), ' '.join(line)))
+        if self.events:
+            self.events.emit(CONSTRUCT_START, line, 'C', self.depth - 1)
+
+    def advance(self, lines):
+        """Parse the construct up to its next nested construct.
 
+        The nested construct is returned, or None once the construct has
+        ended.
+        """
         for line in lines:
-            if Construct.statement(line):
-                cons = Construct(depth=self.depth + 1, verbose=self.verbose)
-                cons.parse(lines)
-            elif self.end_statement(line):
-                if self.verbose:
-                    print('C: {}{} '.format(' ' * self.depth, ' '.join(line)))
+            kind = classify(line)
+            if kind in construct_kinds:
+                return Construct(depth=self.depth + 1, events=self.events)
+            elif kind in (END, CONTINUE) and self.end_statement(line):
+                if self.events:
+                    self.events.emit(CONSTRUCT_END, line, 'C', self.depth)
                 break
             else:
                 # Unhandled
-                if self.verbose:
-                    print('e: {}{} '.format(' ' * self.depth, ' '.join(line)))
+                if self.events:
+                    self.events.emit(STATEMENT, line, 'e', self.depth)
@@ -0,0 +1,210 @@
+"""Columnar storage and output of diagnostics."""
+import collections
+import json
+from array import array
+
+import flint
+
+# NOTE: Current codes used here are totally rubbish!
+descriptions = collections.OrderedDict([
+    ('C0101', 'Line exceeds the maximum line width'),
+    ('C0102', 'Trailing whitespace'),
+    ('C0103', 'Excess whitespace between tokens'),
+    ('C0104', 'Inconsistent keyword case'),
+    ('E0101', 'Trailing comma in a declaration'),
+])
+
+Diagnostic = collections.namedtuple('Diagnostic',
+                                    'code path line column text')
+
+
+class StringTable(object):
+    """Strings stored once, and referenced by index."""
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def __getitem__(self, idx):
+        return self.strings[idx]
+
+    def __len__(self):
+        return len(self.strings)
+
+    def index(self, s):
+        """Return the index of a string, adding it if needed."""
+        idx = self.ids.get(s)
+        if idx is None:
+            idx = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return idx
+
+    def __getstate__(self):
+        return self.strings
+
+    def __setstate__(self, strings):
+        self.strings = strings
+        self.ids = {s: idx for idx, s in enumerate(strings)}
+
+
+class Diagnostics(object):
+    """A store of diagnostics, held as columns of integers.
+
+    Each diagnostic has a code, a file, a line and column (where 0 is
+    unknown), and a detail text.  Codes, paths and texts are stored once, in
+    string tables, and each column is an `array`.  The rows of each file are
+    indexed, so that the diagnostics of a file are found without a scan.
+    """
+
+    def __init__(self):
+        self.codes = array('H')
+        self.files = array('I')
+        self.lines = array('i')
+        self.columns = array('i')
+        self.texts = array('I')
+
+        # Rows of each file id
+        self.file_rows = {}
+
+        self.code_table = StringTable()
+        self.path_table = StringTable()
+        self.text_table = StringTable()
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        codes, paths, texts = (self.code_table, self.path_table,
+                               self.text_table)
+        for code, fid, line, column, text in zip(self.codes, self.files,
+                                                 self.lines, self.columns,
+                                                 self.texts):
+            yield Diagnostic(codes[code], paths[fid], line, column,
+                             texts[text])
+
+    def row(self, idx):
+        """Return the diagnostic of a row."""
+        return Diagnostic(self.code_table[self.codes[idx]],
+                          self.path_table[self.files[idx]], self.lines[idx],
+                          self.columns[idx], self.text_table[self.texts[idx]])
+
+    def add(self, code, path, line=0, column=0, text=''):
+        fid = self.path_table.index(path)
+        self.file_rows.setdefault(fid, array('I')).append(len(self.codes))
+        self.codes.append(self.code_table.index(code))
+        self.files.append(fid)
+        self.lines.append(line)
+        self.columns.append(column)
+        self.texts.append(self.text_table.index(text))
+
+    def extend(self, other):
+        """Append the diagnostics of another store."""
+        code_ids = [self.code_table.index(s) for s in other.code_table]
+        path_ids = [self.path_table.index(s) for s in other.path_table]
+        text_ids = [self.text_table.index(s) for s in other.text_table]
+
+        n_rows = len(self.codes)
+        for fid, rows in other.file_rows.items():
+            self.file_rows.setdefault(path_ids[fid], array('I')).extend(
+                n_rows + idx for idx in rows)
+
+        self.codes.extend(code_ids[i] for i in other.codes)
+        self.files.extend(path_ids[i] for i in other.files)
+        self.lines.extend(other.lines)
+        self.columns.extend(other.columns)
+        self.texts.extend(text_ids[i] for i in other.texts)
+
+    def select(self, code=None, path=None):
+        """Generate the diagnostics of a code and/or file."""
+        code_id = self.code_table.ids.get(code)
+        path_id = self.path_table.ids.get(path)
+        if (code and code_id is None) or (path and path_id is None):
+            return
+
+        # Rows are compared by their ids before any diagnostic is built
+        if path is None:
+            rows = range(len(self.codes))
+        else:
+            rows = self.file_rows.get(path_id, ())
+
+        codes = self.codes
+        for idx in rows:
+            if code is None or codes[idx] == code_id:
+                yield self.row(idx)
+
+    def count_by_code(self):
+        """Return the number of diagnostics of each code."""
+        counts = collections.Counter(self.codes)
+        return {self.code_table[idx]: n for idx, n in counts.items()}
+
+    def count_by_file(self):
+        """Return the number of diagnostics in each file."""
+        counts = collections.Counter(self.files)
+        return {self.path_table[idx]: n for idx, n in counts.items()}
+
+
+class JSONLWriter(object):
+    """Write diagnostics as JSON lines, as they are received."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, diag):
+        self.stream.write(json.dumps(diag._asdict()) + '\n')
+
+    def close(self):
+        self.stream.flush()
+
+
+class SARIFWriter(object):
+    """Write diagnostics as a SARIF log, as they are received.
+
+    The log is written around the results, which are streamed into the
+    results array.  The log is complete once the writer is closed.
+    """
+
+    schema = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.n_results = 0
+
+        rules = [{'id': code, 'shortDescription': {'text': desc}}
+                 for code, desc in descriptions.items()]
+        driver = {'name': 'flint', 'version': flint.__version__,
+                  'rules': rules}
+
+        head = json.dumps({'version': '2.1.0', '$schema': self.schema,
+                           'runs': [{'tool': {'driver': driver},
+                                     'results': []}]})
+
+        # Split the log at the (empty) results array
+        self.head, self.tail = head.rsplit('[]', 1)
+        self.stream.write(self.head + '[')
+
+    def write(self, diag):
+        message = descriptions.get(diag.code, diag.code)
+        if diag.text:
+            message = '{}: {}'.format(message, diag.text)
+
+        location = {'artifactLocation': {'uri': diag.path}}
+        if diag.line > 0:
+            location['region'] = {'startLine': diag.line}
+            if diag.column > 0:
+                location['region']['startColumn'] = diag.column
+
+        result = {
+            'ruleId': diag.code,
+            'level': 'error' if diag.code.startswith('E') else 'warning',
+            'message': {'text': message},
+            'locations': [{'physicalLocation': location}],
+        }
+
+        if self.n_results:
+            self.stream.write(',')
+        self.stream.write('\n' + json.dumps(result))
+        self.n_results += 1
+
+    def close(self):
+        self.stream.write('\n]' + self.tail + '\n')
+        self.stream.flush()
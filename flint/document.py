@@ -10,7 +10,30 @@ def is_docstring(s):
 class Document(object):
     """The document object of the program element."""
 
+    __slots__ = ('header', 'docstring', 'footer')
+
+    def __init__(self, header='', docstring='', footer=''):
+        # The header in source code
+        self.header = header
+
+        # The principal docstring
+        self.docstring = docstring
+
+        # Additional content outside of the docstring
+        self.footer = footer
+
+
+class EmptyDocument(Document):
+    """An empty document, shared by elements without any documentation."""
+
+    __slots__ = ()
+
     def __init__(self):
-        self.header = ''        # The header in source code
-        self.docstring = ''     # The principal docstring
-        self.footer = ''        # Additional content outside of the docstring
+        for name in Document.__slots__:
+            object.__setattr__(self, name, '')
+
+    def __setattr__(self, name, value):
+        raise AttributeError('the shared empty document is read-only')
+
+
+empty_document = EmptyDocument()
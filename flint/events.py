@@ -0,0 +1,139 @@
+"""Events of the parser, and the sinks which receive them.
+
+The parser emits an event for each source file and classified statement to
+an `EventStream`, which passes it to each sink.  Without any sinks there is
+no stream, and events are neither created nor formatted.
+"""
+import collections
+import sys
+
+# Event kinds
+FILE = 0                # A source file is opened
+SKIP = 1                # A file of the project is not parsed
+MACRO = 2               # A preprocessor macro is defined or replaced
+UNIT_START = 3
+UNIT_END = 4
+SPECIFICATION = 5       # USE, IMPORT and IMPLICIT statements
+DECLARATION = 6
+CONSTRUCT_START = 7
+CONSTRUCT_END = 8
+STATEMENT = 9           # Other (mostly executable) statements
+UNRESOLVED = 10
+
+kind_names = [
+    'file', 'skip', 'macro', 'unit_start', 'unit_end', 'specification',
+    'declaration', 'construct_start', 'construct_end', 'statement',
+    'unresolved',
+]
+
+# The statement of an event is its list of tokens, or the text of the FILE,
+# SKIP and MACRO events.  Statement events have a label, which denotes the
+# type of statement (e.g. M for module, D for declaration), and constructs
+# have their depth of nesting.
+Event = collections.namedtuple('Event', 'kind statement label depth')
+
+
+def format_event(event):
+    """Return the annotated line of an event."""
+    if event.kind == FILE or event.kind == MACRO:
+        return event.statement
+    elif event.kind == SKIP:
+        return 'SKIP file: {}'.format(event.statement)
+    else:
+        return '{}: {}{}'.format(event.label, ' ' * event.depth,
+                                 ' '.join(event.statement))
+
+
+def _detached():
+    return None
+
+
+class EventStream(object):
+    """The sinks which receive the events of a parse."""
+
+    __slots__ = ('sinks',)
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def emit(self, kind, statement, label='', depth=0):
+        event = Event(kind, statement, label, depth)
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def __reduce__(self):
+        # Parsed units are pickled without their stream, since the sinks
+        # belong to the parsing process
+        return _detached, ()
+
+
+class EventSink(object):
+    """A receiver of parser events."""
+
+    def emit(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PrintSink(EventSink):
+    """Print each event as an annotated line of source."""
+
+    def __init__(self, stream=None):
+        # None for the current stdout
+        self.stream = stream
+
+    def emit(self, event):
+        stream = self.stream or sys.stdout
+        stream.write(format_event(event) + '\n')
+
+
+class FileSink(EventSink):
+    """Write the annotated lines of the events to a file.
+
+    Lines are buffered, and written in batches of `buffer_lines`.  The file
+    is complete once the sink is closed.
+    """
+
+    def __init__(self, path, buffer_lines=4096):
+        self.output = open(path, 'w')
+        self.buffer_lines = buffer_lines
+        self.buffer = []
+
+    def emit(self, event):
+        self.buffer.append(format_event(event))
+        if len(self.buffer) >= self.buffer_lines:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.output.write('\n'.join(self.buffer) + '\n')
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.output.close()
+
+
+class CountingSink(EventSink):
+    """Count the events of each kind, and the statements of each label."""
+
+    def __init__(self):
+        self.kinds = collections.Counter()
+        self.labels = collections.Counter()
+
+    def emit(self, event):
+        self.kinds[kind_names[event.kind]] += 1
+        if event.label:
+            self.labels[event.label] += 1
+
+
+class EventLog(EventSink):
+    """Record the events, e.g. to be sent to another process."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
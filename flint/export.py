@@ -0,0 +1,293 @@
+"""Export of parsed projects to an SQLite database.
+
+A database holds any number of projects (such as several versions of a
+model), each identified by name.  The schema is:
+
+``projects``
+    ``id``, ``name``
+
+``files``
+    ``id``, ``project_id``, ``path``, ``digest`` (of the contents of the
+    source and its includes, and the parse settings), ``failure`` (the parse
+    error, or NULL)
+
+``units``
+    ``id``, ``file_id``, ``parent_id`` (of the enclosing unit, or NULL),
+    ``name``, ``qualname`` (as ``module::function``), ``utype``
+    (``module``, ``function``, ``type``, ...), ``line``, ``header``,
+    ``docstring``, ``footer``
+
+``variables``
+    ``id``, ``file_id``, ``unit_id``, ``name``, ``type``, ``attributes``
+    (comma-separated), ``line``, ``docstring``
+
+``namelists``
+    ``file_id``, ``unit_id``, ``name`` (of the group), ``position``,
+    ``object`` (the name of the member)
+
+``diagnostics``
+    ``file_id``, ``path``, ``line``, ``column``, ``code``, ``text``
+
+Unnamed blocks have a NULL name and qualified name, and empty docstrings are
+NULL.  The diagnostics of an included file are recorded with each of the
+sources which include it.  For example, the real variables without a
+docstring are found with::
+
+   SELECT files.path, variables.line, variables.name
+   FROM variables JOIN files ON files.id = variables.file_id
+   WHERE variables.type = 'real' AND variables.docstring IS NULL
+"""
+import hashlib
+import sqlite3
+
+import flint
+from flint.cache import file_digest
+from flint.symbols import SEPARATOR, scope_name
+
+# Version of the schema, stored as the database `user_version`; increment if
+# the schema changes
+SCHEMA_VERSION = 1
+
+schema = '''
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects (id),
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    failure TEXT,
+    UNIQUE (project_id, path)
+);
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    parent_id INTEGER REFERENCES units (id),
+    name TEXT,
+    qualname TEXT,
+    utype TEXT,
+    line INTEGER,
+    header TEXT,
+    docstring TEXT,
+    footer TEXT
+);
+CREATE TABLE IF NOT EXISTS variables (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    unit_id INTEGER NOT NULL REFERENCES units (id),
+    name TEXT NOT NULL,
+    type TEXT,
+    attributes TEXT,
+    line INTEGER,
+    docstring TEXT
+);
+CREATE TABLE IF NOT EXISTS namelists (
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    unit_id INTEGER NOT NULL REFERENCES units (id),
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    object TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diagnostics (
+    file_id INTEGER NOT NULL REFERENCES files (id),
+    path TEXT,
+    line INTEGER,
+    column INTEGER,
+    code TEXT NOT NULL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS units_file ON units (file_id);
+CREATE INDEX IF NOT EXISTS units_name ON units (name);
+CREATE INDEX IF NOT EXISTS units_qualname ON units (qualname);
+CREATE INDEX IF NOT EXISTS variables_file ON variables (file_id);
+CREATE INDEX IF NOT EXISTS variables_unit ON variables (unit_id);
+CREATE INDEX IF NOT EXISTS variables_name ON variables (name);
+CREATE INDEX IF NOT EXISTS variables_type ON variables (type);
+CREATE INDEX IF NOT EXISTS namelists_file ON namelists (file_id);
+CREATE INDEX IF NOT EXISTS namelists_name ON namelists (name);
+CREATE INDEX IF NOT EXISTS diagnostics_file ON diagnostics (file_id);
+CREATE INDEX IF NOT EXISTS diagnostics_code ON diagnostics (code);
+'''
+
+# Tables of the contents of each file, in the order they are cleared
+file_tables = ('diagnostics', 'namelists', 'variables', 'units')
+
+
+def source_digest(src, engine, defines, vocabulary=None):
+    """Return a digest of the contents of a source and its includes, and of
+    the settings of its parse (as in the keys of the parse cache)."""
+    if vocabulary is not None:
+        vocabulary = sorted(vocabulary)
+
+    digest = hashlib.sha256()
+    digest.update(repr((flint.__version__, engine, src.mode,
+                        sorted(defines.items()), vocabulary)).encode('utf-8'))
+    digest.update(file_digest(src.path).encode('ascii'))
+    for inc_fname, inc_path in src.includes:
+        inc_digest = file_digest(inc_path) if inc_path else None
+        digest.update(repr((inc_fname, inc_path, inc_digest)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SQLiteExporter(object):
+    """Write parsed projects to an SQLite database.
+
+    Each file is keyed by the digest of its contents (and includes), so that
+    exporting a project again only rewrites its changed files.  The counts
+    of the last export are kept as `written`, `unchanged` and `removed`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            self.conn.close()
+            raise ValueError('{}: unsupported schema version {}'
+                             ''.format(path, version))
+        with self.conn:
+            self.conn.executescript(schema)
+            self.conn.execute('PRAGMA user_version = {}'
+                              ''.format(SCHEMA_VERSION))
+
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    def close(self):
+        self.conn.close()
+
+    def next_id(self, table):
+        """Return the first unused id of a table."""
+        max_id = self.conn.execute('SELECT MAX(id) FROM {}'
+                                   ''.format(table)).fetchone()[0]
+        return (max_id or 0) + 1
+
+    def export(self, project, name=None):
+        """Write the files of a project, replacing those which have changed
+        and removing those which are no longer in the project.
+
+        The project is named `name`, or else by its directories.  The
+        database is updated in a single transaction.
+        """
+        if name is None:
+            name = ', '.join(project.roots)
+        conn = self.conn
+
+        with conn:
+            conn.execute('INSERT OR IGNORE INTO projects (name) VALUES (?)',
+                         (name,))
+            project_id = conn.execute('SELECT id FROM projects WHERE name = ?',
+                                      (name,)).fetchone()[0]
+
+            # Files of the prior export, as path: (id, digest)
+            prior = {path: (file_id, digest) for file_id, path, digest
+                     in conn.execute('SELECT id, path, digest FROM files '
+                                     'WHERE project_id = ?', (project_id,))}
+
+            rows = ExportRows(self.next_id('files'), self.next_id('units'),
+                              self.next_id('variables'))
+            changed = []
+            self.unchanged = 0
+            for src in project.files:
+                digest = source_digest(src, project.engine, project.defines,
+                                       project.case_vocabulary)
+                file_id, prior_digest = prior.pop(src.path, (None, None))
+                if digest == prior_digest:
+                    self.unchanged += 1
+                    continue
+                if file_id is not None:
+                    changed.append((file_id,))
+                rows.add_source(src, project_id, digest, file_id)
+
+            # Clear the changed and removed files
+            removed = [(file_id,) for file_id, _ in prior.values()]
+            for table in file_tables:
+                conn.executemany('DELETE FROM {} WHERE file_id = ?'
+                                 ''.format(table), changed + removed)
+            conn.executemany('DELETE FROM files WHERE id = ?', removed)
+
+            conn.executemany('INSERT OR REPLACE INTO files '
+                             '(id, project_id, path, digest, failure) '
+                             'VALUES (?, ?, ?, ?, ?)', rows.files)
+            conn.executemany('INSERT INTO units '
+                             '(id, file_id, parent_id, name, qualname, utype, '
+                             'line, header, docstring, footer) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             rows.units)
+            conn.executemany('INSERT INTO variables '
+                             '(id, file_id, unit_id, name, type, attributes, '
+                             'line, docstring) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows.variables)
+            conn.executemany('INSERT INTO namelists '
+                             '(file_id, unit_id, name, position, object) '
+                             'VALUES (?, ?, ?, ?, ?)', rows.namelists)
+            conn.executemany('INSERT INTO diagnostics '
+                             '(file_id, path, line, column, code, text) '
+                             'VALUES (?, ?, ?, ?, ?, ?)', rows.diagnostics)
+
+        self.written = len(rows.files)
+        self.removed = len(removed)
+
+
+class ExportRows(object):
+    """The table rows of the exported sources, with their assigned ids."""
+
+    def __init__(self, file_id, unit_id, variable_id):
+        self.file_id = file_id
+        self.unit_id = unit_id
+        self.variable_id = variable_id
+
+        self.files = []
+        self.units = []
+        self.variables = []
+        self.namelists = []
+        self.diagnostics = []
+
+    def add_source(self, src, project_id, digest, file_id=None):
+        """Add the rows of a source, reusing its prior file id if known."""
+        if file_id is None:
+            file_id = self.file_id
+            self.file_id += 1
+        self.files.append((file_id, project_id, src.path, digest,
+                           src.failure))
+
+        stack = [(unit, None, '') for unit in reversed(src.units)]
+        while stack:
+            unit, parent_id, scope = stack.pop()
+            unit_id = self.unit_id
+            self.unit_id += 1
+
+            name = scope_name(unit)
+            if name and scope:
+                qualname = scope + SEPARATOR + name
+            else:
+                qualname = name
+            self.units.append((unit_id, file_id, parent_id, name, qualname,
+                               unit.utype, unit.line, unit.doc.header or None,
+                               unit.doc.docstring or None,
+                               unit.doc.footer or None))
+
+            for var in unit.variables:
+                self.variables.append((self.variable_id, file_id, unit_id,
+                                       var.name, var.type,
+                                       ','.join(var.attributes), var.line,
+                                       var.docstring or None))
+                self.variable_id += 1
+
+            for group, objects in unit.namelists.items():
+                for position, obj in enumerate(objects):
+                    self.namelists.append((file_id, unit_id, group, position,
+                                           obj))
+
+            for nested in reversed(unit.blocks + unit.subprograms):
+                stack.append((nested, unit_id, qualname or scope))
+
+        reports = [src.report] + list(src.inc_reports.values())
+        for report in reports:
+            for diag in report.diagnostics:
+                self.diagnostics.append((file_id, diag.path, diag.line,
+                                         diag.column, diag.code, diag.text))
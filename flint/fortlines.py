@@ -8,8 +8,13 @@ class FortLines(object):
         self.lines = iter(lines)
         self.current_line = None
 
+        # Physical line numbers of the tokens of the current line, if the
+        # input lines have a `line_number`
+        self.line_numbers = []
+
         # Split lines
         self.buffered_line = None
+        self.buffered_number = None
 
         # Docstring buffer
         # Saved as a list to track multiple docstrings of split lines
@@ -22,6 +27,14 @@ class FortLines(object):
         # of general event.
         self.prior_var = None
 
+        # Set while the parser only needs the END and CONTAINS statements, so
+        # that the line source may omit other lines
+        self.skipping = False
+
+        # If a list, each statement and the line numbers of its tokens are
+        # appended to it
+        self.statements = None
+
     def __iter__(self):
         return self
 
@@ -31,9 +44,11 @@ class FortLines(object):
     def __next__(self):
         if self.buffered_line:
             line = self.buffered_line
+            line_number = self.buffered_number
             self.buffered_line = None
         else:
             line = next(self.lines)
+            line_number = getattr(line, 'line_number', None)
 
         if line and is_docstring(line[-1]):
             self.docstrings.append(line.pop())
@@ -41,6 +56,7 @@ class FortLines(object):
         if ';' in line:
             idx = line.index(';')
             line, self.buffered_line = line[:idx], line[1 + idx:]
+            self.buffered_number = line_number
 
             # How literally do we handle end-line semicolons?
             # This tosses them aside
@@ -51,22 +67,37 @@ class FortLines(object):
         # TODO: Track and report these?
         while (line == []):
             line = next(self.lines)
+            line_number = getattr(line, 'line_number', None)
             if line and is_docstring(line[-1]):
                 self.docstrings.append(line.pop())
 
+        # Physical line number of each token
+        line_numbers = [line_number] * len(line)
+
         # Join extended lines
+        # Continuations are appended in place, and the pieces of a continued
+        # string are joined once the string is closed, so that each token is
+        # only copied once.
         # TODO: 255-limit line check
-        string_append = False
+        string_idx = None
+        string_parts = None
         while line[-1] == '&':
             next_line = next(self.lines)
+            next_number = getattr(next_line, 'line_number', None)
             if next_line and is_docstring(next_line[-1]):
                 self.docstrings.append(next_line.pop())
                 if not next_line:
                     continue
 
-            if ((len(line) > 1 and (line[-2][0] in '"\''
-                                    and line[-2][-1] not in '"\''))
-                    or string_append):
+            line.pop()
+            line_numbers.pop()
+
+            if (string_idx is None and line and line[-1][0] in '"\''
+                    and line[-1][-1] not in '"\''):
+                string_idx = len(line) - 1
+                string_parts = [line[-1]]
+
+            if string_idx is not None:
                 if '&' in next_line:
                     idx = next_line.index('&') + 1
                 else:
@@ -79,14 +110,25 @@ class FortLines(object):
                     # TODO: With no matching &, some care is needed to align
                     # the whitespace correctly.  A job for another day!
 
-                new_string = line[-2] + next_line[idx]
-                line = line[:-2] + [new_string] + next_line[idx + 1:]
+                string_parts.append(next_line[idx])
 
-                # True if string continues to next line
-                string_append = (next_line[idx][-1] not in '"\'')
+                # The string ends unless it continues to the next line
+                if next_line[idx][-1] in '"\'':
+                    line[string_idx] = ''.join(string_parts)
+                    string_idx = None
+                idx += 1
             else:
                 idx = 1 if next_line[0] == '&' else 0
-                line = line[:-1] + next_line[idx:]
+
+            line.extend(next_line[idx:])
+            line_numbers.extend([next_number] * (len(next_line) - idx))
+
+        # Unterminated strings
+        if string_idx is not None:
+            line[string_idx] = ''.join(string_parts)
 
         self.current_line = line
+        self.line_numbers = line_numbers
+        if self.statements is not None:
+            self.statements.append((line, line_numbers))
         return line
@@ -0,0 +1,180 @@
+"""Dependencies of the modules of a project, from their USE statements."""
+import collections
+import heapq
+
+
+def unit_uses(unit):
+    """Return the modules used by a program unit and its nested units."""
+    used = set()
+    units = [unit]
+    while units:
+        unit = units.pop()
+        used.update(use.module for use in unit.uses)
+        units.extend(unit.subprograms)
+        units.extend(unit.blocks)
+    return used
+
+
+class ModuleGraph(object):
+    """The graph of the modules of a project, and the modules they use.
+
+    Modules used by a module include those used by its module procedures and
+    interface bodies.  Modules which are used but not defined in the project
+    (such as intrinsic modules and libraries) are `external`, and are not
+    part of the ordering.  The other program units of a source, such as
+    programs and external procedures, are not nodes, but their used modules
+    are recorded for the source.
+    """
+
+    def __init__(self, sources=()):
+        # Source path of each module
+        self.paths = {}
+
+        # Adjacency index of the modules used by each module, and its reverse
+        self.uses = {}
+        self.users = collections.defaultdict(set)
+
+        # Modules used by the program units of each source
+        self.file_uses = {}
+
+        for src in sources:
+            self.add_source(src)
+
+    def add_source(self, src):
+        """Add the modules of a source, and their dependencies."""
+        file_uses = set()
+        for unit in src.units:
+            used = unit_uses(unit)
+            file_uses.update(used)
+            if unit.utype == 'module':
+                self.paths[unit.name] = src.path
+                self.uses[unit.name] = used
+                for module in used:
+                    self.users[module].add(unit.name)
+        self.file_uses[src.path] = file_uses
+
+    @property
+    def external(self):
+        """Return the used modules which are not defined in the project."""
+        used = set()
+        for modules in self.file_uses.values():
+            used.update(modules)
+        return used.difference(self.uses)
+
+    def dependencies(self, module, transitive=True):
+        """Return the modules used by `module`."""
+        return self.reach(module, self.uses, transitive)
+
+    def dependents(self, module, transitive=True):
+        """Return the modules which use `module`, and which may need to be
+        checked again if its interface changes."""
+        return self.reach(module, self.users, transitive)
+
+    @staticmethod
+    def reach(module, edges, transitive):
+        found = set(edges.get(module, ()))
+        if transitive:
+            stack = list(found)
+            while stack:
+                for other in edges.get(stack.pop(), ()):
+                    if other not in found:
+                        found.add(other)
+                        stack.append(other)
+        found.discard(module)
+        return found
+
+    def affected_files(self, paths):
+        """Return the sources which depend on the modules of the sources
+        `paths`, including the sources themselves."""
+        changed = {module for module, path in self.paths.items()
+                   if path in paths}
+        modules = set(changed)
+        for module in changed:
+            modules.update(self.dependents(module))
+
+        affected = set(paths)
+        affected.update(self.paths[module] for module in modules)
+        affected.update(path for path, used in self.file_uses.items()
+                        if not used.isdisjoint(modules))
+        return affected
+
+    def order(self):
+        """Return the modules of the project, each after the modules it uses.
+
+        Modules are otherwise in alphabetical order.  A ValueError is raised
+        if the modules have a cycle.
+        """
+        n_uses = {module: len(used.intersection(self.uses))
+                  for module, used in self.uses.items()}
+        ready = [module for module, n in n_uses.items() if n == 0]
+        heapq.heapify(ready)
+
+        order = []
+        while ready:
+            module = heapq.heappop(ready)
+            order.append(module)
+            for user in self.users.get(module, ()):
+                n_uses[user] -= 1
+                if n_uses[user] == 0:
+                    heapq.heappush(ready, user)
+
+        if len(order) < len(self.uses):
+            cycles = ', '.join(' -> '.join(cycle + cycle[:1])
+                               for cycle in self.cycles())
+            raise ValueError('module dependency cycle: {}'.format(cycles))
+
+        return order
+
+    def cycles(self):
+        """Return the groups of modules which use each other, directly or
+        indirectly (the strongly connected components with a cycle)."""
+        # Tarjan's algorithm, with an explicit stack
+        index = {}
+        lowlink = {}
+        on_stack = set()
+        stack = []
+        cycles = []
+
+        # Edges between the project modules, in order
+        edges = {module: sorted(used.intersection(self.uses))
+                 for module, used in self.uses.items()}
+
+        for root in sorted(self.uses):
+            if root in index:
+                continue
+
+            work = [(root, iter(edges[root]))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+
+            while work:
+                module, targets = work[-1]
+                for other in targets:
+                    if other not in index:
+                        index[other] = lowlink[other] = len(index)
+                        stack.append(other)
+                        on_stack.add(other)
+                        work.append((other, iter(edges[other])))
+                        break
+                    elif other in on_stack:
+                        lowlink[module] = min(lowlink[module], index[other])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent],
+                                              lowlink[module])
+
+                    if lowlink[module] == index[module]:
+                        group = []
+                        while True:
+                            other = stack.pop()
+                            on_stack.discard(other)
+                            group.append(other)
+                            if other == module:
+                                break
+                        if len(group) > 1 or module in self.uses[module]:
+                            cycles.append(sorted(group))
+
+        return sorted(cycles)
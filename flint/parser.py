@@ -0,0 +1,25 @@
+"""Iterative parsing of nested program units and constructs."""
+
+
+def parse_scope(scope, lines):
+    """Parse a program unit or construct, and all of its nested scopes.
+
+    A scope provides ``open(lines)``, which parses its opening statement at
+    ``lines.current_line``, and ``advance(lines)``, which parses statements
+    until either a nested scope begins, which is returned, or the scope ends
+    and None is returned.  When resumed after a nested scope has ended, the
+    scope is responsible for collecting it.
+
+    Open scopes are held on an explicit stack, so the depth of nesting is not
+    limited by the interpreter recursion limit.
+    """
+    scope.open(lines)
+    stack = [scope]
+
+    while stack:
+        nested = stack[-1].advance(lines)
+        if nested is None:
+            stack.pop()
+        else:
+            nested.open(lines)
+            stack.append(nested)
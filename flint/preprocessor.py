@@ -0,0 +1,446 @@
+"""C preprocessor macro tables and conditional expressions."""
+import collections
+import itertools
+import re
+
+from flint.tokenizer import engines
+from flint.tokens import NAME, PUNCTUATION, SPACE
+
+re_comment = re.compile(r'/\*.*?\*/|//.*')
+
+re_expr_token = re.compile(r'''
+    \s*(?:
+        (?P<number>0[xX][0-9a-fA-F]+|[0-9]+)[uUlL]*
+        |(?P<name>[A-Za-z_]\w*)
+        |(?P<op>&&|\|\||<<|>>|<=|>=|==|!=|[-+*/%()<>!~&|^?:,])
+    )''', re.VERBOSE)
+
+# Parameters are only read if the parenthesis immediately follows the name
+re_define = re.compile(r'\s*(?P<name>[A-Za-z_]\w*)(?:\((?P<params>[^)]*)\))?'
+                       r'\s*(?P<body>.*?)\s*\Z', re.DOTALL)
+
+# Binary operator precedence
+binary_ops = {
+    '||': 1,
+    '&&': 2,
+    '|': 3,
+    '^': 4,
+    '&': 5,
+    '==': 6, '!=': 6,
+    '<': 7, '>': 7, '<=': 7, '>=': 7,
+    '<<': 8, '>>': 8,
+    '+': 9, '-': 9,
+    '*': 10, '/': 10, '%': 10,
+}
+
+
+# A macro definition.  `params` is None for object-like macros, `text` is
+# the replacement text (None if empty), and `body` is its tokens as
+# (kind, text) pairs.
+Macro = collections.namedtuple('Macro', ['params', 'text', 'body'])
+
+# Macro table versions, unique within a process
+_versions = itertools.count(1)
+
+
+class MacroTable(dict):
+    """The macros of a source, indexed by name.
+
+    Replacement text is tokenized once when the macro is defined, and the
+    expansions of object-like macros are memoized until the table is
+    modified.  The number of expansions of each macro is recorded in
+    `counts`.  Each modification sets a new `version`, which is unique
+    across all tables.
+    """
+
+    def __init__(self, engine='scan', defines=None):
+        super(MacroTable, self).__init__()
+        self.engine = engine
+        self.tokenizer = None
+        self.counts = collections.Counter()
+        self.expansions = {}
+        self.version = next(_versions)
+
+        for name, text in (defines or {}).items():
+            self.define(name, None, text)
+
+    def __reduce__(self):
+        # Rebuild with a new tokenizer, version and empty memo
+        return (self.__class__, (self.engine,), {'counts': self.counts},
+                None, iter(self.items()))
+
+    def modified(self):
+        self.expansions.clear()
+        self.version = next(_versions)
+
+    def __setitem__(self, name, macro):
+        self.modified()
+        super(MacroTable, self).__setitem__(name, macro)
+
+    def __delitem__(self, name):
+        self.modified()
+        super(MacroTable, self).__delitem__(name)
+
+    def pop(self, *args):
+        self.modified()
+        return super(MacroTable, self).pop(*args)
+
+    def clear(self):
+        self.modified()
+        super(MacroTable, self).clear()
+
+    def update(self, *args, **kwargs):
+        self.modified()
+        super(MacroTable, self).update(*args, **kwargs)
+
+    def define(self, name, params, text):
+        """Add a macro, replacing any previous definition."""
+        body = ()
+        if text:
+            if self.tokenizer is None:
+                self.tokenizer = engines[self.engine]()
+            tokens = self.tokenizer.spans(text + '\n')
+            body = tuple(zip(tokens.kinds, tokens.texts()))
+
+            # Bodies are independent of any unterminated string
+            self.tokenizer.prior_delim = None
+        else:
+            text = None
+
+        if params is not None:
+            params = tuple(params)
+        self[name] = Macro(params, text, body)
+
+    def parse_define(self, line):
+        """Define a macro from the text following ``#define``.
+
+        The name of the macro is returned.
+        """
+        match = re_define.match(line)
+        if not match:
+            raise ValueError('invalid macro definition {!r}'
+                             ''.format(line.strip()))
+
+        params = match.group('params')
+        if params is not None:
+            params = [p.strip() for p in params.split(',')]
+            if params == ['']:
+                params = []
+
+        name = match.group('name')
+        self.define(name, params, match.group('body'))
+        return name
+
+    def expand(self, items, expanding=frozenset()):
+        """Return a list of (kind, text) tokens with its macros expanded."""
+        expanded = []
+        pos = 0
+        for first, last, replacement in self.invocations(items, expanding):
+            expanded.extend(items[pos:first])
+            expanded.extend(replacement)
+            pos = last
+        expanded.extend(items[pos:])
+        return expanded
+
+    def invocations(self, items, expanding=frozenset()):
+        """Generate the macro invocations in a list of (kind, text) tokens.
+
+        Each invocation is a (first, last, replacement) tuple, where the
+        invocation spans ``items[first:last]`` and `replacement` is its fully
+        expanded list of tokens.  Macros in `expanding` are not expanded,
+        which prevents recursion.
+        """
+        end = 0
+        for idx, (kind, name) in enumerate(items):
+            if idx < end or kind != NAME or name not in self:
+                continue
+            if name in expanding:
+                continue
+
+            macro = self[name]
+            args, end = None, idx + 1
+            if macro.params is not None:
+                args, end = self.arguments(items, idx + 1)
+                if args is None or len(args) != len(macro.params):
+                    # Not an invocation of a function-like macro
+                    end = idx + 1
+                    continue
+
+            self.counts[name] += 1
+            yield idx, end, self.replace(name, macro, args, expanding)
+
+    def arguments(self, items, idx):
+        """Return the arguments of a function-like macro and their end.
+
+        The arguments are returned as a list of token lists, or None if the
+        tokens at `idx` are not a complete parenthesized argument list.
+        """
+        n = len(items)
+        while idx < n and items[idx][0] == SPACE:
+            idx += 1
+        if idx == n or tuple(items[idx]) != (PUNCTUATION, '('):
+            return None, idx
+
+        args = [[]]
+        depth = 0
+        for idx in range(idx + 1, n):
+            kind, tok = items[idx]
+            if kind == PUNCTUATION:
+                if tok == '(':
+                    depth += 1
+                elif tok == ')' and depth > 0:
+                    depth -= 1
+                elif tok == ')':
+                    args = [strip_space(arg) for arg in args]
+                    return (args if args != [[]] else []), idx + 1
+                elif tok == ',' and depth == 0:
+                    args.append([])
+                    continue
+            args[-1].append(items[idx])
+
+        # Unterminated argument list
+        return None, n
+
+    def replace(self, name, macro, args, expanding):
+        """Return the expanded tokens of a macro invocation."""
+        if args is None and not expanding:
+            try:
+                expanded, nested = self.expansions[name]
+                self.counts.update(nested)
+            except KeyError:
+                counts = self.counts.copy()
+                expanded = self.expand(macro.body, frozenset((name,)))
+                nested = self.counts - counts
+                self.expansions[name] = (expanded, nested)
+            return expanded
+
+        body = macro.body
+        if args is not None:
+            # Arguments are fully expanded before substitution
+            args = [self.expand(arg, expanding) for arg in args]
+            body = []
+            for kind, tok in macro.body:
+                if kind == NAME and tok in macro.params:
+                    body.extend(args[macro.params.index(tok)])
+                else:
+                    body.append((kind, tok))
+
+        return self.expand(body, expanding | {name})
+
+
+def strip_space(items):
+    """Remove the leading and trailing whitespace of a token list."""
+    start, end = 0, len(items)
+    while start < end and items[start][0] == SPACE:
+        start += 1
+    while end > start and items[end - 1][0] == SPACE:
+        end -= 1
+    return items[start:end]
+
+
+def strip_comments(line):
+    """Remove C comments from a directive line."""
+    return re_comment.sub(' ', line)
+
+
+def evaluate(expr, defines):
+    """Return the integer value of an ``#if`` expression.
+
+    Macros are expanded by evaluating their replacement text, and
+    undefined names are zero.  A ValueError is raised if the expression
+    cannot be evaluated.
+    """
+    return Expression(expr, defines).evaluate()
+
+
+class Expression(object):
+    """A precedence-climbing parser of a preprocessor expression.
+
+    As in C, the unused operands of ``&&``, ``||`` and ``?:`` are parsed
+    without being evaluated, so that ``0 && 1 / 0`` is zero.
+    """
+
+    def __init__(self, expr, defines, expanding=frozenset()):
+        self.defines = defines
+        self.expanding = expanding
+
+        # Depth of the unused operands being parsed, whose value is zero
+        self.skipping = 0
+
+        self.tokens = []
+        pos = 0
+        expr = strip_comments(expr).strip()
+        while pos < len(expr):
+            match = re_expr_token.match(expr, pos)
+            if not match:
+                raise ValueError('invalid token in {!r}'.format(expr))
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            pos = match.end()
+        self.idx = 0
+
+    def evaluate(self):
+        if not self.tokens:
+            raise ValueError('empty expression')
+
+        value = self.parse_conditional()
+        if self.idx != len(self.tokens):
+            raise ValueError('unexpected {!r}'.format(self.peek()))
+        return value
+
+    def peek(self):
+        if self.idx < len(self.tokens):
+            return self.tokens[self.idx][1]
+        return None
+
+    def next(self):
+        if self.idx >= len(self.tokens):
+            raise ValueError('unexpected end of expression')
+        token = self.tokens[self.idx]
+        self.idx += 1
+        return token
+
+    def expect(self, tok):
+        kind, value = self.next()
+        if value != tok:
+            raise ValueError('expected {!r}, found {!r}'.format(tok, value))
+
+    def skip(self, parse, *args):
+        """Parse an unused operand, without evaluating it."""
+        self.skipping += 1
+        try:
+            parse(*args)
+        finally:
+            self.skipping -= 1
+
+    def parse_conditional(self):
+        cond = self.parse_binary(1)
+        if self.peek() == '?':
+            self.next()
+            if cond:
+                value = self.parse_conditional()
+                self.expect(':')
+                self.skip(self.parse_conditional)
+            else:
+                self.skip(self.parse_conditional)
+                self.expect(':')
+                value = self.parse_conditional()
+            return value
+        return cond
+
+    def parse_binary(self, min_prec):
+        lhs = self.parse_unary()
+        while True:
+            op = self.peek()
+            prec = binary_ops.get(op)
+            if prec is None or prec < min_prec:
+                return lhs
+            self.next()
+            if op == '&&' and not lhs or op == '||' and lhs:
+                # The result is known from the left operand
+                self.skip(self.parse_binary, prec + 1)
+                lhs = int(bool(lhs))
+            else:
+                rhs = self.parse_binary(prec + 1)
+                lhs = self.apply(op, lhs, rhs)
+
+    def apply(self, op, lhs, rhs):
+        if self.skipping:
+            return 0
+        elif op == '||':
+            return int(bool(lhs or rhs))
+        elif op == '&&':
+            return int(bool(lhs and rhs))
+        elif op == '|':
+            return lhs | rhs
+        elif op == '^':
+            return lhs ^ rhs
+        elif op == '&':
+            return lhs & rhs
+        elif op == '==':
+            return int(lhs == rhs)
+        elif op == '!=':
+            return int(lhs != rhs)
+        elif op == '<':
+            return int(lhs < rhs)
+        elif op == '>':
+            return int(lhs > rhs)
+        elif op == '<=':
+            return int(lhs <= rhs)
+        elif op == '>=':
+            return int(lhs >= rhs)
+        elif op == '<<':
+            return lhs << rhs
+        elif op == '>>':
+            return lhs >> rhs
+        elif op == '+':
+            return lhs + rhs
+        elif op == '-':
+            return lhs - rhs
+        elif op == '*':
+            return lhs * rhs
+        elif rhs == 0:
+            raise ValueError('division by zero')
+
+        # C division truncates toward zero
+        quot = abs(lhs) // abs(rhs)
+        if (lhs < 0) != (rhs < 0):
+            quot = -quot
+
+        if op == '/':
+            return quot
+        else:
+            return lhs - rhs * quot
+
+    def parse_unary(self):
+        kind, tok = self.next()
+
+        if tok == '!':
+            return int(not self.parse_unary())
+        elif tok == '~':
+            return ~self.parse_unary()
+        elif tok == '-':
+            return -self.parse_unary()
+        elif tok == '+':
+            return self.parse_unary()
+        elif tok == '(':
+            value = self.parse_conditional()
+            self.expect(')')
+            return value
+        elif kind == 'number':
+            if tok[:2] in ('0x', '0X'):
+                return int(tok, 16)
+            elif tok[0] == '0' and len(tok) > 1:
+                return int(tok, 8)
+            return int(tok)
+        elif tok == 'defined':
+            if self.peek() == '(':
+                self.next()
+                kind, name = self.next()
+                self.expect(')')
+            else:
+                kind, name = self.next()
+            if kind != 'name':
+                raise ValueError('invalid defined() argument')
+            return int(name in self.defines)
+        elif kind == 'name':
+            return self.expand(tok)
+        else:
+            raise ValueError('unexpected {!r}'.format(tok))
+
+    def expand(self, name):
+        """Return the value of a macro name (zero if undefined)."""
+        if self.skipping:
+            return 0
+
+        value = self.defines.get(name)
+        if isinstance(value, Macro):
+            if value.params is not None:
+                raise ValueError('function-like macro {} in expression'
+                                 ''.format(name))
+            value = value.text
+
+        if value is None or name in self.expanding:
+            return 0
+        return Expression(value, self.defines,
+                          self.expanding | {name}).evaluate()
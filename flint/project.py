@@ -1,38 +1,479 @@
+import cProfile
 import os
-import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 
-from flint.source import Source
+from flint.cache import IncludeCache, ParseCache
+from flint.diagnostics import Diagnostics
+from flint.events import EventLog, EventStream, PrintSink, SKIP
+from flint.modules import ModuleGraph
+from flint.report import CaseCounts
+from flint.source import Source, parse_modes
+from flint.stats import ProjectStats, perf_counter
+from flint.symbols import SymbolIndex
+from flint.tokenindex import TokenIndex
+from flint.tokenizer import TokenCache
+
+# Project of the current worker process, and its events (if recorded)
+_worker_project = None
+_worker_events = None
 
 
 class Project(object):
 
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, engine='scan', jobs=1, cache=None,
+                 include_paths=None, token_cache=False, case_vocabulary=None,
+                 stats=False, profile=None, token_index=False):
         self.files = []
         self.verbose = verbose
+        self.engine = engine
+
+        # Receivers of the parser events, in order.  Verbose projects print
+        # the events.
+        self.sinks = [PrintSink()] if verbose else []
+
         self.path = None
 
+        # Parse mode of the sources ('full' or 'skeleton')
+        self.mode = 'full'
+
+        # Number of parsing processes (None for one per CPU)
+        self.jobs = jobs
+
+        # Parse cache, or its directory
+        if isinstance(cache, str):
+            cache = ParseCache(cache)
+        self.cache = cache
+
+        # Preprocessed include files, shared by all sources
+        self.include_cache = IncludeCache()
+
+        # Tokenized lines, shared by all sources (True for the default size)
+        if token_cache is True:
+            token_cache = TokenCache()
+        self.token_cache = token_cache or None
+
+        # Preprocessor macros defined at the start of each source
+        self.defines = {}
+
+        # Diagnostics of the parsed files, which are also sent to each writer
+        # as each file is parsed
+        self.diagnostics = Diagnostics()
+        self.writers = []
+        self.reported_includes = set()
+
+        # Spellings of the keywords (or the lowercase words of
+        # `case_vocabulary`) across all files, or None until rebuilt
+        self.case_vocabulary = case_vocabulary
+        self._cases = CaseCounts(case_vocabulary)
+
+        # Module dependencies, or None until rebuilt
+        self._modules = None
+
+        # Named units and variables of the files, updated with each file
+        self.symbols = SymbolIndex()
+
+        # Positions of the statement tokens of the files, if indexed
+        self.token_index = TokenIndex() if token_index else None
+
+        # Timing and counts of each phase and file, if instrumented
+        self.stats = ProjectStats() if stats or profile else None
+
+        # Files whose parse is run under cProfile, selected by a function of
+        # the file path (which must be picklable if jobs > 1)
+        self.profile = profile
+
+        # Directories passed to `parse`, and all of their directories
+        self.roots = []
         self.directories = []
 
+        # Include search paths, searched in order (as with -I) before the
+        # project directories
+        self.include_paths = list(include_paths) if include_paths else []
+
+        # Filenames of the include paths and project directories, and the
+        # search order of their directories
+        self.include_index = {}
+        self.include_ranks = {}
+        self.indexed_dirs = set()
+
     # TODO: *paths is generally a bad idea for a public API.  I am only using
     #   it here to get sensible output in my MOM6 tests.
     # TODO: `exclude` may prove more useful here.
-    def parse(self, *paths):
+    def parse(self, *paths, mode='full'):
+        """Parse the Fortran sources of the project directories.
+
+        With ``mode='skeleton'``, the executable statements of each program
+        unit are skipped (and mostly left untokenized), which yields the same
+        units, variables and docstrings as a full parse, but without the
+        statement diagnostics of the skipped lines.
+        """
+        if mode not in parse_modes:
+            raise ValueError('unknown parse mode: {!r}'.format(mode))
+        self.mode = mode
+        events = EventStream(self.sinks) if self.sinks else None
+        start = perf_counter()
+
+        for ipath in self.include_paths:
+            for root, dirs, files in os.walk(ipath):
+                self.index_files(root, files)
+
         filepaths = []
         for path in paths:
             assert os.path.isdir(path)
             self.path = path
+            self.roots.append(path)
 
             for root, dirs, files in os.walk(self.path):
                 self.directories.append(root)
+                self.index_files(root, files)
 
                 for fname in files:
                     fpath = os.path.join(root, fname)
-                    if os.path.splitext(fname)[1] in ('.f90', '.F90'):
+                    if is_source(fname):
                         filepaths.append(fpath)
-                    else:
-                        print('SKIP file: {}'.format(fpath))
+                    elif events:
+                        events.emit(SKIP, fpath)
+
+        self.rank_include_paths()
+
+        if self.cache:
+            sources = [self.cache.load(fpath, self, self.engine,
+                                       self.defines, self.mode,
+                                       self.case_vocabulary,
+                                       self.token_index is not None)
+                       for fpath in filepaths]
+            misses = [fpath for fpath, src in zip(filepaths, sources)
+                      if src is None]
+
+            parsed = self.parse_files(misses)
+            for idx, src in enumerate(sources):
+                if src is None:
+                    sources[idx] = src = next(parsed)
+                    self.cache.store(src, self.engine, self.defines)
+                elif self.stats:
+                    self.stats.counts['cached'] += 1
+                self.add_source(src)
+        else:
+            for src in self.parse_files(filepaths):
+                self.add_source(src)
+
+        if self.stats:
+            self.stats.elapsed += perf_counter() - start
+
+    def add_source(self, src):
+        """Add a parsed source and its diagnostics to the project."""
+        src.project = self
+        self.files.append(src)
+
+        if self.stats and src.stats:
+            self.stats.add(src.stats)
+
+        self.add_reports(src, self.writers)
+        self.symbols.add_source(src)
+        if self.token_index is not None:
+            self.index_tokens(src)
+        self._modules = None
+
+    def index_tokens(self, src):
+        """Add the statements of a source to the token index.
+
+        The statements are recorded as the source is parsed (and are kept
+        by the parse cache).  Failed sources are indexed up to their failure.
+        """
+        self.token_index.add_file(src.path, src.statements or ())
+        src.statements = None
+
+    @property
+    def modules(self):
+        """Return the module dependency graph of the files."""
+        if self._modules is None:
+            self._modules = ModuleGraph(self.files)
+        return self._modules
+
+    @property
+    def cases(self):
+        """Return the merged keyword cases of the files."""
+        if self._cases is None:
+            self._cases = CaseCounts(self.case_vocabulary)
+            reported_includes = set()
+            for src in self.files:
+                for report in merged_reports(src, reported_includes):
+                    self._cases.update(report.cases)
+        return self._cases
+
+    def add_reports(self, src, writers=()):
+        """Merge the reports of a source, and send its diagnostics to
+        `writers`."""
+        for report in merged_reports(src, self.reported_includes):
+            if self._cases is not None:
+                self._cases.update(report.cases)
+            self.diagnostics.extend(report.diagnostics)
+            for writer in writers:
+                for diag in report.diagnostics:
+                    writer.write(diag)
+
+    def update(self, paths):
+        """Update the project after its files `paths` have changed.
+
+        Changed or added sources are parsed, and removed sources are dropped
+        from `files`.  Sources which include a changed file, or whose includes
+        may now resolve to an added or removed file, are also parsed again.
+        The symbols of each parsed or removed source are replaced, the merged
+        diagnostics are rebuilt, and the keyword cases are rebuilt when next
+        used.  Returns the parsed sources.
+        """
+        parse_paths = set()
+        removed = set()
+        changed_includes = set()
+        moved_names = set()
+
+        known = {os.path.normpath(src.path): src.path for src in self.files}
+
+        for path in paths:
+            norm_path = os.path.normpath(path)
+            fname = os.path.basename(norm_path)
+            exists = os.path.isfile(path)
+
+            if is_source(fname) and any(in_directory(path, root)
+                                        for root in self.roots):
+                if exists:
+                    parse_paths.add(known.get(norm_path, path))
+                else:
+                    removed.add(known.get(norm_path, path))
+
+            # Update the include index
+            indexed = self.include_index.get(fname, [])
+            if exists and norm_path not in indexed:
+                self.include_index.setdefault(fname, indexed).append(norm_path)
+                moved_names.add(fname)
+                root = os.path.dirname(norm_path)
+                if root not in self.indexed_dirs:
+                    self.indexed_dirs.add(root)
+                    self.directories.append(root)
+                    self.rank_include_paths()
+            elif not exists and norm_path in indexed:
+                indexed.remove(norm_path)
+                if not indexed:
+                    del self.include_index[fname]
+                moved_names.add(fname)
+
+            changed_includes.add(norm_path)
+            self.include_cache.discard(norm_path)
+
+        for src in self.files:
+            for inc_fname, inc_path in src.includes:
+                if ((inc_path and os.path.normpath(inc_path)
+                        in changed_includes)
+                        or os.path.basename(inc_fname) in moved_names):
+                    parse_paths.add(src.path)
+                    break
+        parse_paths -= removed
+
+        index = {src.path: idx for idx, src in enumerate(self.files)}
+        parse_paths = sorted(parse_paths,
+                             key=lambda p: (p not in index, index.get(p), p))
+
+        sources = []
+        for src in self.parse_files(parse_paths):
+            src.project = self
+            if src.path in index:
+                self.files[index[src.path]] = src
+            else:
+                self.files.append(src)
+            if self.cache:
+                self.cache.store(src, self.engine, self.defines)
+            if self.stats and src.stats:
+                self.stats.add(src.stats)
+            self.symbols.add_source(src)
+            if self.token_index is not None:
+                self.index_tokens(src)
+            sources.append(src)
+
+        self.files = [src for src in self.files if src.path not in removed]
+        for path in removed:
+            self.symbols.remove(path)
+            if self.stats:
+                self.stats.remove(path)
+            if self.token_index is not None:
+                self.token_index.remove(path)
+
+        # Rebuild the merged reports, in the order of the files
+        self.diagnostics = Diagnostics()
+        self._cases = None
+        self._modules = None
+        self.reported_includes = set()
+        for src in self.files:
+            self.add_reports(src)
+
+        return sources
+
+    def index_files(self, root, files):
+        """Add the files of a directory to the include index."""
+        root = os.path.normpath(root)
+        if root in self.indexed_dirs:
+            return
+        self.indexed_dirs.add(root)
+
+        for fname in files:
+            fpath = os.path.normpath(os.path.join(root, fname))
+            self.include_index.setdefault(fname, []).append(fpath)
+
+    def rank_include_paths(self):
+        """Set the search order of the include directories."""
+        self.include_ranks = {}
+        for idir in self.include_paths + self.directories:
+            self.include_ranks.setdefault(os.path.normpath(idir),
+                                          len(self.include_ranks))
+
+    def find_include(self, inc_fname, curdir):
+        """Return the path of an included file, or None if not found.
+
+        The directory of the including file is searched first, followed by
+        the include paths and then the project directories.  The first match
+        is used.
+        """
+        name = os.path.normpath(inc_fname)
+        curdir = os.path.normpath(curdir)
+
+        if os.path.isabs(name) or name.split(os.sep)[0] == os.pardir:
+            # Paths outside of the indexed directories
+            for idir in [curdir] + self.include_paths + self.directories:
+                test_fpath = os.path.join(idir, inc_fname)
+                if os.path.isfile(test_fpath):
+                    return test_fpath
+            return None
+
+        inc_path = None
+        inc_rank = None
+        for fpath in self.include_index.get(os.path.basename(name), ()):
+            if fpath == name:
+                idir = os.curdir
+            elif fpath.endswith(os.sep + name):
+                idir = fpath[:-len(name) - 1] or os.sep
+            else:
+                continue
+
+            if idir == curdir:
+                return fpath
+
+            rank = self.include_ranks.get(idir)
+            if rank is not None and (inc_rank is None or rank < inc_rank):
+                inc_path, inc_rank = fpath, rank
+
+        return inc_path
+
+    def parse_files(self, filepaths):
+        """Generate the parsed sources of `filepaths`, in order."""
+        if self.jobs == 1 or len(filepaths) < 2:
+            return (parse_source(self, fpath) for fpath in filepaths)
+        else:
+            return self.parse_parallel(filepaths)
+
+    def parse_parallel(self, filepaths):
+        """Generate the sources parsed over a pool of worker processes."""
+        # Each worker has its own token cache
+        token_cache = self.token_cache.max_size if self.token_cache else None
+
+        # Events are recorded by the workers, and sent on to the sinks with
+        # their source
+        config = (self.path, self.directories, bool(self.sinks), self.engine,
+                  self.mode, self.defines, self.include_paths,
+                  self.include_index, token_cache, self.case_vocabulary,
+                  bool(self.stats), self.profile,
+                  self.token_index is not None)
+
+        # Send the files in batches to reduce the messaging overhead
+        n_workers = self.jobs or os.cpu_count() or 1
+        chunksize = max(1, len(filepaths) // (4 * n_workers))
+
+        with ProcessPoolExecutor(max_workers=n_workers,
+                                 initializer=_init_worker,
+                                 initargs=config) as pool:
+            for src, events in pool.map(_parse_worker, filepaths,
+                                        chunksize=chunksize):
+                for event in events:
+                    for sink in self.sinks:
+                        sink.emit(event)
+                yield src
+
+    def failures(self):
+        """Return the sources which could not be parsed."""
+        return [src for src in self.files if src.failure]
+
+
+def merged_reports(src, reported_includes):
+    """Return the reports of a source, and of its includes which are not in
+    `reported_includes` (which are then added)."""
+    # Include diagnostics are only reported for the first includer
+    reports = [src.report]
+    for inc_path, report in src.inc_reports.items():
+        if inc_path not in reported_includes:
+            reported_includes.add(inc_path)
+            reports.append(report)
+    return reports
+
+
+def is_source(fname):
+    """Return True if a file name is a Fortran source."""
+    return os.path.splitext(fname)[1] in ('.f90', '.F90')
+
+
+def in_directory(path, directory):
+    """Return True if `path` is within `directory`."""
+    rel_path = os.path.relpath(path, directory)
+    return (rel_path != os.pardir
+            and not rel_path.startswith(os.pardir + os.sep))
+
+
+def parse_source(project, fpath):
+    """Parse a file of the project, recording any failure on the source."""
+    src = Source(project=project, engine=project.engine, mode=project.mode)
+
+    profiler = None
+    if project.profile and project.profile(fpath):
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        src.parse(fpath)
+    except Exception:
+        src.failure = traceback.format_exc()
+        print('flint: error: unable to parse {}'.format(fpath))
+
+    if profiler:
+        profiler.disable()
+        profiler.create_stats()
+        src.stats.profile = profiler.stats
+    return src
+
+
+def _init_worker(path, directories, record_events, engine, mode, defines,
+                 include_paths, include_index, token_cache, case_vocabulary,
+                 stats, profile, token_index):
+    global _worker_project, _worker_events
+    if token_cache:
+        token_cache = TokenCache(token_cache)
+    _worker_project = Project(engine=engine, include_paths=include_paths,
+                              token_cache=token_cache,
+                              case_vocabulary=case_vocabulary,
+                              stats=stats, profile=profile,
+                              token_index=token_index)
+    if record_events:
+        _worker_events = EventLog()
+        _worker_project.sinks.append(_worker_events)
+    _worker_project.path = path
+    _worker_project.mode = mode
+    _worker_project.directories = directories
+    _worker_project.defines = defines
+    _worker_project.include_index = include_index
+    _worker_project.rank_include_paths()
+
+
+def _parse_worker(fpath):
+    src = parse_source(_worker_project, fpath)
 
-        for fpath in filepaths:
-            f90file = Source(project=self, verbose=self.verbose)
-            f90file.parse(fpath)
-            self.files.append(f90file)
+    events = []
+    if _worker_events:
+        events, _worker_events.events = _worker_events.events, []
+    return src, events
@@ -1,46 +1,162 @@
 import collections
-import string
+from types import MappingProxyType
+
+from flint.diagnostics import Diagnostics
+from flint.statements import keywords
+from flint.tokens import SPACE, COMMENT, DOCSTRING, keyword_kinds
+
+CaseSpelling = collections.namedtuple(
+    'CaseSpelling', 'word spelling count preferred path line column'
+)
+
+
+class CaseCounts(object):
+    """Occurrences of each spelling of the words of a vocabulary.
+
+    Each spelling has a count and the location of its first occurrence.  Only
+    the words of the vocabulary (by default, the Fortran keywords) are
+    tracked, with at most `max_spellings` spellings of each, so the memory is
+    bounded by the vocabulary rather than the size of the source.  Spellings
+    found once a word has `max_spellings` spellings are not counted (nor
+    reported), even if they are later more frequent than those kept.
+    """
+
+    max_spellings = 8
+
+    def __init__(self, vocabulary=None):
+        # Lowercase words, or None for the keywords
+        self.vocabulary = vocabulary
+
+        # Spellings of each word, as [count, path, line, column]
+        self.words = {}
+
+    def add(self, word, spelling, path, line, column):
+        spellings = self.words.get(word)
+        if spellings is None:
+            spellings = self.words[word] = {}
+
+        entry = spellings.get(spelling)
+        if entry:
+            entry[0] += 1
+        elif len(spellings) < self.max_spellings:
+            spellings[spelling] = [1, path, line, column]
+
+    def update(self, other):
+        """Add the counts of another set of counts."""
+        for word, others in other.words.items():
+            spellings = self.words.setdefault(word, {})
+            for spelling, (count, path, line, column) in others.items():
+                entry = spellings.get(spelling)
+                if entry:
+                    entry[0] += count
+                elif len(spellings) < self.max_spellings:
+                    spellings[spelling] = [count, path, line, column]
+
+    def inconsistent(self):
+        """Generate the words with several spellings, and their spellings.
+
+        Spellings are (spelling, [count, path, line, column]) pairs, from
+        most to least frequent.
+        """
+        for word, spellings in self.words.items():
+            if len(spellings) > 1:
+                yield word, sorted(spellings.items(),
+                                   key=lambda s: (-s[1][0], s[0]))
+
+    def minority(self):
+        """Return the less frequent spellings of each word, ranked by their
+        number of occurrences."""
+        minority = []
+        for word, spellings in self.inconsistent():
+            preferred = spellings[0][0]
+            for spelling, (count, path, line, column) in spellings[1:]:
+                minority.append(CaseSpelling(word, spelling, count, preferred,
+                                             path, line, column))
+        minority.sort(key=lambda s: (-s.count, s.word, s.spelling))
+        return minority
 
 
 class Report(object):
-    def __init__(self):
+    def __init__(self, path=None, vocabulary=None):
         # Default behaviour
         self.linewidth = 79
         self.indent = 4
 
-        # NOTE: Current codes used here are totally rubbish!
-        self.errors = collections.defaultdict(list)
-        self.cases = collections.defaultdict(set)
+        # File of the diagnostics
+        self.path = path
+        self.diagnostics = Diagnostics()
+
+        # Spellings of the keywords (or other vocabulary)
+        self.cases = CaseCounts(vocabulary)
+
+    @property
+    def errors(self):
+        """Return the diagnostics of each code, in their original formats.
+
+        Most are the line numbers, but C0103 are (line, text) pairs and C0104
+        are the sets of inconsistent keywords.  This is a read-only view,
+        derived from `diagnostics` on each access; diagnostics are added with
+        `add`.
+        """
+        errors = collections.defaultdict(list)
+        for diag in self.diagnostics:
+            if diag.code == 'C0103':
+                err = diag.line, diag.text
+            elif diag.code == 'C0104':
+                err = set(diag.text.split())
+            else:
+                err = diag.line
+            errors[diag.code].append(err)
+        return MappingProxyType(errors)
+
+    def add(self, code, line=0, column=0, text=''):
+        self.diagnostics.add(code, self.path, line, column, text)
 
     def check_linewidth(self, line, line_number):
         code = 'C0101'
         if len(line) > self.linewidth:
-            self.errors[code].append(line_number)
+            self.add(code, line_number, self.linewidth + 1)
 
     def check_trailing_whitespace(self, tokens, line_number):
         code = 'C0102'
-        if tokens and all(c in string.whitespace for c in tokens[-1]):
-            self.errors[code].append(line_number)
+        if tokens and tokens.kinds[-1] == SPACE:
+            self.add(code, line_number, tokens.starts[-1] + 1)
 
     def check_token_spacing(self, tokens, line_number):
         code = 'C0103'
         # TODO: Obviously room for improvement here...
-        for idx, tok in enumerate(tokens[1:], start=1):
-            if all(c in ' \t' for c in tok) and len(tok) > 1:
-                if idx == len(tokens) - 2 and tokens[-1].startswith('!'):
+        kinds = tokens.kinds
+        for idx in range(1, len(kinds)):
+            if kinds[idx] == SPACE and tokens.size(idx) > 1:
+                if (idx == len(kinds) - 2
+                        and kinds[-1] in (COMMENT, DOCSTRING)):
                     continue
-                err = line_number, ''.join(tokens[idx-1:idx+2])
-                self.errors[code].append(err)
+                self.add(code, line_number, tokens.starts[idx] + 1,
+                         tokens.join(idx - 1, idx + 2))
 
     def check_mixed_tabs_spaces(self, tokens, line_number):
         raise NotImplementedError
 
+    def track_case(self, tokens, line_number):
+        """Count the spellings of the keywords of a tokenized line."""
+        cases = self.cases
+        vocabulary = keywords if cases.vocabulary is None else cases.vocabulary
+        for idx, kind in enumerate(tokens.kinds):
+            if kind in keyword_kinds:
+                tok = tokens.text(idx)
+                word = tok.lower()
+                if word in vocabulary:
+                    cases.add(word, tok, self.path, line_number,
+                              tokens.starts[idx] + 1)
+
     def check_keyword_case(self):
+        """Report each keyword with inconsistent case, at the first use of
+        its most frequent minority spelling."""
         code = 'C0104'
-        for kw in self.cases:
-            kw_set = self.cases[kw]
-            if len(kw_set) > 1:
-                self.errors[code].append(kw_set)
+        for word, spellings in self.cases.inconsistent():
+            count, path, line, column = spellings[1][1]
+            self.add(code, line, column,
+                     ' '.join(sorted(s for s, entry in spellings)))
 
     def error_endcomma(self, line_number=None):
         code = 'E0101'
@@ -49,4 +165,4 @@ class Report(object):
         if line_number is None:
             line_number = -1
 
-        self.errors[code].append(line_number)
+        self.add(code, line_number)
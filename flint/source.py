@@ -1,5 +1,5 @@
 import os
-import sys
+import re
 
 # Use Python 3 compatible open()
 try:
@@ -7,39 +7,100 @@ try:
 except ImportError:
     pass                    # Python 3
 
+from flint.cache import IncludeEntry
+from flint.document import doc_tokens
+from flint.events import EventStream, PrintSink, FILE, MACRO, UNRESOLVED
 from flint.fortlines import FortLines
+from flint.preprocessor import MacroTable, evaluate, strip_comments
 from flint.report import Report
+from flint.stats import FileStats, TimedLines, TimedObject
+from flint.stats import CHECKS, PARSE, PREPROCESS, READ, TOKENIZE
 from flint.units.unit import Unit
-from flint.tokenizer import Tokenizer
-from flint.document import is_docstring
+from flint.tokenizer import engines
+from flint.tokens import TokenLine, SPACE
+from flint.tokens import unnamed_kinds
 
+from flint.statements import unit_types
 from flint.units import get_program_unit_type
 
+# Parse modes: all statements, or only the specification and subprogram parts
+parse_modes = ('full', 'skeleton')
+
+# Statements which may end the execution part of a program unit
+re_scan_end = re.compile(r'\s*(?:end\s*(\w*)|contains\b)', re.IGNORECASE)
+scan_end_words = frozenset([''] + unit_types)
+
+# Macro replacements which may change the statements of a skipped line
+re_scan_text = re.compile(r'[&;!]|end|contains', re.IGNORECASE)
+
 
 class Source(object):
-    def __init__(self, project=None, verbose=False):
+    def __init__(self, project=None, verbose=False, engine='scan',
+                 mode='full'):
         self.project = project
-        self.verbose = verbose
+        self.engine = engine
+        self.mode = mode
         self.path = None
         self.abspath = None
 
+        # Parser events are sent to the project's sinks, or printed if
+        # verbose, and are not created without any sinks
+        if project:
+            sinks = project.sinks
+        else:
+            sinks = [PrintSink()] if verbose else []
+        self.events = EventStream(sinks) if sinks else None
+
+        # Timing and counts of the parse, if instrumented
+        self.stats = FileStats() if project and project.stats else None
+
+        # Parsed statements and their line numbers, if recorded for the
+        # project's token index.  All lines are then tokenized, even in
+        # skeleton mode.
+        if project and project.token_index is not None:
+            self.statements = []
+        else:
+            self.statements = None
+
         # Program units
         self.units = []
 
         # Diagnostics
         self.indent = []
-        self.report = Report()
+        self.report = Report(
+            vocabulary=project.case_vocabulary if project else None
+        )
         self.inc_reports = {}
 
+        # Included files, as (name, resolved path) pairs
+        self.includes = []
+
         # Preprocessor substitution
-        self.defines = {}
+        self.defines = MacroTable(engine, project.defines if project else None)
         self.stop_parsing = False
 
+        # Conditional blocks, as [parent active, branch taken, active] frames
+        self.conditions = []
+        self.inactive_lines = 0
+
+        # Macros which are checked in skipped lines, by macro table version
+        self.scan_macros = (None, [])
+
+        # Reason for abandoning the file, if any
+        self.failure = None
+
+    def __getstate__(self):
+        # Sources are returned from worker processes without their project
+        state = self.__dict__.copy()
+        state['project'] = None
+        return state
+
     def parse(self, path):
         # NOTE: Tracking both path and abspath is probably pointless...
 
         # Resolve filepaths
         if os.path.isabs(path):
+            self.path = path
             self.abspath = path
 
             if self.project:
@@ -58,133 +119,273 @@ class Source(object):
             else:
                 self.abspath = os.path.abspath(path)
 
-        src_lines = self.tokenize()
-
-        # NOTE: Would be great to integrate this with self.tokenize()
-        flines = FortLines(src_lines)
-
+        stats = self.stats
+        if stats:
+            stats.path = self.path
+            stats.switch(PARSE)
+            flines = TimedLines((), stats)
+        else:
+            flines = FortLines(())
+
+        # Tokenized lines are streamed into the parser as they are read.  In
+        # skeleton mode, the parser marks the executable parts on the
+        # FortLines, so that their lines are not tokenized (unless all of the
+        # statements are recorded).
+        if self.mode == 'skeleton' and self.statements is None:
+            scan = flines
+        else:
+            scan = None
+        flines.lines = self.tokenized_lines(scan=scan)
+        flines.statements = self.statements
+        if stats:
+            flines.lines = stats.timed_iter(READ, flines.lines)
+
+        try:
+            self.parse_units(flines)
+        finally:
+            if stats:
+                stats.switch(None)
+                stats.counts['units'] += count_units(self.units)
+
+    def parse_units(self, flines):
+        """Parse the program units of the source lines."""
         for line in flines:
             try:
                 unit_type = get_program_unit_type(line)
                 unit = unit_type()
-                unit.verbose = self.verbose
+                unit.events = self.events
+                unit.mode = self.mode
                 unit.parse(flines)
                 self.units.append(unit)
             except ValueError:
                 # Unresolved line
-                print('X: {}'.format(' '.join(line)))
+                if self.events:
+                    self.events.emit(UNRESOLVED, line, 'X')
 
             #if Unit.statement(line):
-            #    unit = Unit(verbose=self.verbose)
+            #    unit = Unit(events=self.events)
             #    unit.parse(flines)
             #    self.units.append(unit)
             #else:
             #    # Unresolved line
-            #    print('X: {}'.format(' '.join(line)))
+            #    self.events.emit(UNRESOLVED, line, 'X')
 
     def tokenize(self, path=None, report=None):
+        """Return the tokenized lines of a source file."""
+        return list(self.tokenized_lines(path=path, report=report))
+
+    def tokenized_lines(self, path=None, report=None, scan=None):
+        """Generate the tokenized lines of a source file.
+
+        Reports which depend on the whole file, such as keyword case, are
+        completed once the lines are exhausted.
+
+        While the `skipping` attribute of `scan` is set, lines which cannot
+        start an END or CONTAINS statement are dropped without tokenizing, and
+        are not checked.
+        """
         if not path:
             path = self.path
         if not report:
             report = self.report
+        if report.path is None:
+            report.path = path
+
+        tokenizer = engines[self.engine]()
+        if self.project:
+            tokenizer.cache = self.project.token_cache
+
+        preprocess = self.preprocess
+        substitute = self.substitute
+        stats = self.stats
+        if stats:
+            tokenizer = TimedObject(tokenizer, stats, TOKENIZE)
+            report = TimedObject(report, stats, CHECKS)
+            preprocess = stats.timed(PREPROCESS, preprocess)
+            substitute = stats.timed(PREPROCESS, substitute)
 
-        tokenizer = Tokenizer()
         line_number = 0
-        src_lines = []
-        print('{} ({})'.format(self.path, self.abspath))
-
-        # TODO: Settle on name, move to __init__
+        continued = False
+        skip_continued = False
+        if self.events:
+            self.events.emit(FILE, '{} ({})'.format(self.path, self.abspath))
+
+        # Each file has its own stack of conditional blocks
+        outer_conditions = self.conditions
+        self.conditions = []
         self.stop_parsing = False
 
         # TODO: pycodestyle has a better way to deal with nonunicode files
         with open(path, errors='replace') as srcfile:
             for line in srcfile:
                 line_number += 1
+                if stats:
+                    stats.counts['lines'] += 1
 
                 report.check_linewidth(line, line_number)
 
-                if line.lstrip().startswith('#'):
-                    self.preprocess(line[1:])
+                directive = line.lstrip()
+                if directive.startswith('#'):
+                    preprocess(directive[1:])
 
+                # Abandon the file if an included file has failed
+                if self.failure:
+                    return
+
+                # Skip inactive conditional blocks without tokenizing
                 if self.stop_parsing:
+                    self.inactive_lines += 1
                     continue
 
+                if scan and scan.skipping and not continued:
+                    skip, skip_continued = self.scan_line(line,
+                                                          skip_continued)
+                    if skip:
+                        continue
+                continued = '&' in line
+                skip_continued = False
+
                 try:
-                    tokens = tokenizer.parse(line)
+                    tokens = tokenizer.spans(line, line_number)
                 except ValueError:
-                    print('error', srcfile)
-                    print(line)
-                    sys.exit()
+                    self.failure = ('{}:{}: unable to tokenize {!r}'
+                                    ''.format(path, line_number, line))
+                    print('flint: error: {}'.format(self.failure))
+                    return
 
                 # Substitute any preprocessor tokens
-                for i, tok in enumerate(tokens):
-                    if tok in self.defines:
-                        val = self.defines[tok]
+                if self.defines:
+                    tokens = substitute(tokens)
 
-                        # Substitute unknown values with empty strings
-                        # TODO: Better way to do this?
-                        if val is None:
-                            val = ''
-
-                        replacement = val + '\n'
-                        tokens[i:i+1] = tokenizer.parse(replacement)
-                        if (self.verbose):
-                            print('replacing {} with {}'
-                                  ''.format(repr(tok), repr(val)))
+                if stats:
+                    stats.counts['tokens'] += len(tokens)
 
                 # TODO: Shouldn't this be done with `lines`?
                 report.check_trailing_whitespace(tokens, line_number)
 
                 # TODO: Check whitespace between tokens
-                if tokens and all(c in ' \t' for c in tokens[0]):
-                    self.indent.append(len(tokens[0]))
+                if tokens and tokens.kinds[0] == SPACE:
+                    self.indent.append(tokens.size(0))
                 else:
                     self.indent.append(0)
 
                 report.check_token_spacing(tokens, line_number)
 
-                # Track the case consistency of tokens
+                # Track the case consistency of keywords
                 # NOTE: This is at the source level, but should possibly be
                 #       handled at the block level (module, function, etc)
-                for tok in tokens:
-                    # Exclude comments and strings
-                    if tok[0] not in ('!', '"', '\''):
-                        report.cases[tok.lower()].add(tok)
+                report.track_case(tokens, line_number)
 
-                # Strip comments and preprocessed lines, but keep docstrings
+                # Strip whitespace, comments and preprocessed lines, but keep
+                # docstrings, and lowercase everything except strings
                 # TODO: Handle preprocessed lines better
-                tokens = [tok for tok in tokens
-                          if tok[0] not in '!#' or is_docstring(tok)]
-
-                # XXX: Is this changing the case of comment tokens?
-                tokens = [
-                    tok.lower()
-                    if tok[0] not in '\'"' and not is_docstring(tok)
-                    else tok
-                    for tok in tokens
-                ]
-
-                # Remove whitespace
-                tokenized_line = [tok for tok in tokens
-                                  if not all(c in ' \t' for c in tok)]
+                tokenized_line = tokens.statement_tokens()
                 if tokenized_line:
-                    src_lines.append(tokenized_line)
+                    yield tokenized_line
+
+        if self.conditions:
+            print('flint: warning: unterminated #if block in {}'
+                  ''.format(path))
+        self.conditions = outer_conditions
+        self.stop_parsing = False
 
         report.check_keyword_case()
 
-        return src_lines
+    def scan_line(self, line, continuation=False):
+        """Check a line of a skipped part of the source.
+
+        Returns whether the line can be skipped, and whether its statement
+        continues on the next line.  Lines are kept if any statement could be
+        an END (of a program unit) or CONTAINS statement, or if they hold a
+        docstring, a continuation which may be hidden by a comment, or a
+        macro whose replacement could change the statements.
+        """
+        if '!' in line:
+            if '&' in line or any(doc in line for doc in doc_tokens):
+                return False, False
+            continues = False
+        else:
+            continues = line.rstrip().endswith('&')
+
+        if continuation:
+            return True, continues
+
+        for stmt in line.split(';'):
+            match = re_scan_end.match(stmt)
+            if match and (match.group(1) is None
+                          or match.group(1).lower() in scan_end_words):
+                return False, False
+
+        if self.defines:
+            if self.scan_macros[0] != self.defines.version:
+                names = [name for name, macro in self.defines.items()
+                         if macro.text and re_scan_text.search(macro.text)]
+                self.scan_macros = (self.defines.version, names)
+            if any(name in line for name in self.scan_macros[1]):
+                return False, False
+
+        return True, continues
+
+    def substitute(self, tokens):
+        """Replace any preprocessor macros in a tokenized line.
+
+        Substituted tokens keep the position of the macro in the line.
+        """
+        if not any(tok in self.defines
+                   for tok in tokens.texts(exclude=unnamed_kinds)):
+            return tokens
+
+        items = list(zip(tokens.kinds, tokens.texts()))
+        expanded = TokenLine(tokens.line, tokens.line_number)
+
+        pos = 0
+        for first, last, replacement in self.defines.invocations(items):
+            for idx in range(pos, first):
+                expanded.append(tokens.kinds[idx], tokens.starts[idx],
+                                tokens.ends[idx], tokens.subs.get(idx))
+
+            start, end = tokens.starts[first], tokens.ends[last - 1]
+            for kind, tok in replacement:
+                expanded.append(kind, start, end, tok)
+            pos = last
+
+            if self.events:
+                self.events.emit(MACRO, 'replacing {} with {}'.format(
+                    repr(tokens.join(first, last)),
+                    repr(''.join(tok for kind, tok in replacement))))
+
+        for idx in range(pos, len(tokens)):
+            expanded.append(tokens.kinds[idx], tokens.starts[idx],
+                            tokens.ends[idx], tokens.subs.get(idx))
+
+        return expanded
 
     def preprocess(self, line):
         words = line.strip().split(None, 2)
+        if not words:
+            # Null directive
+            return
         directive = words[0]
 
+        if directive in ('if', 'ifdef', 'ifndef', 'elif', 'else', 'endif'):
+            self.condition(directive, line.strip()[len(directive):])
+            self.stop_parsing = bool(self.conditions
+                                     and not self.conditions[-1][2])
+            return
+
+        # Other directives only apply to active blocks
+        if self.stop_parsing:
+            return
+
         if directive == 'define':
-            # TODO: macro functions
-            replacement = words[2] if len(words) == 3 else None
-            self.defines[words[1]] = replacement
-            if (self.verbose):
-                print('#define: {} as {}'
-                      ''.format(repr(words[1]), repr(replacement)))
+            try:
+                name = self.defines.parse_define(line.strip()[len('define'):])
+            except ValueError as exc:
+                print('flint: warning: {}'.format(exc))
+                return
+            if self.events:
+                self.events.emit(MACRO, '#define: {} as {}'.format(
+                    repr(name), repr(self.defines[name].text)))
 
         elif directive == 'undef':
             identifier = words[1]
@@ -194,26 +395,6 @@ class Source(object):
                 print('flint: warning: unset identifier {} was never '
                       'defined.'.format(identifier))
 
-        # TODO
-        #elif directive == 'if':
-        #    expr = line.strip().split(None, 1)[1]
-
-        elif directive == 'ifdef':
-            macro = line.split(None, 1)[1]
-            if macro not in self.defines:
-                self.stop_parsing = True
-
-        elif directive == 'ifndef':
-            macro = line.split(None, 1)[1]
-            if macro in self.defines:
-                self.stop_parsing = True
-
-        elif directive == 'else':
-            self.stop_parsing = not self.stop_parsing
-
-        elif directive == 'endif':
-            self.stop_parsing = False
-
         elif directive.startswith('include'):
             # This directive uniquely does not require a whitespace delimiter.
             if directive != 'include':
@@ -224,27 +405,11 @@ class Source(object):
             assert (words[1][0], words[1][-1]) in (('"', '"'), ('<', '>'))
             inc_fname = words[1][1:-1]
 
-            # First check current directory
-            curdir = os.path.dirname(self.path)
-            test_fpath = os.path.join(curdir, inc_fname)
-
-            inc_path = None
-            if os.path.isfile(test_fpath):
-                inc_path = test_fpath
-            elif self.project:
-                # Scan the project directories for the file
-                for idir in self.project.directories:
-                    test_fpath = os.path.join(idir, inc_fname)
-                    if os.path.isfile(test_fpath):
-                        inc_path = test_fpath
-            # else: do not bother looking
+            inc_path = self.find_include(inc_fname)
+            self.includes.append((inc_fname, inc_path))
 
             if inc_path:
-                # TODO: Using the Source tokenize seems dumb here but I
-                #  don't have a better solution at the moment.
-                inc_report = Report()
-                self.tokenize(path=inc_path, report=inc_report)
-                self.inc_reports[inc_path] = inc_report
+                self.include(inc_path)
             else:
                 print('flint: Include file {} not found; skipping.'
                       ''.format(inc_fname))
@@ -252,3 +417,115 @@ class Source(object):
         else:
             print('flint: unsupported preprocess directive: {}'
                   ''.format(line))
+
+    def condition(self, directive, expr):
+        """Update the conditional block stack for a directive."""
+        if directive in ('if', 'ifdef', 'ifndef'):
+            parent = not self.conditions or self.conditions[-1][2]
+            active = parent and self.test_condition(directive, expr)
+            self.conditions.append([parent, active, active])
+            return
+
+        if not self.conditions:
+            print('flint: warning: #{} without #if'.format(directive))
+            return
+
+        frame = self.conditions[-1]
+        parent, taken = frame[0], frame[1]
+
+        if directive == 'elif':
+            # Later branches are not evaluated once one has been taken
+            active = (parent and not taken
+                      and self.test_condition(directive, expr))
+            frame[1:] = [taken or active, active]
+
+        elif directive == 'else':
+            frame[1:] = [True, parent and not taken]
+
+        elif directive == 'endif':
+            self.conditions.pop()
+
+    def test_condition(self, directive, expr):
+        """Return True if the condition of a directive is satisfied."""
+        if directive in ('ifdef', 'ifndef'):
+            words = strip_comments(expr).split()
+            if not words:
+                print('flint: warning: #{} without a macro'.format(directive))
+                return False
+            return (words[0] in self.defines) == (directive == 'ifdef')
+
+        try:
+            return bool(evaluate(expr, self.defines))
+        except ValueError as exc:
+            print('flint: warning: unable to evaluate #{} {}: {}'
+                  ''.format(directive, expr.strip(), exc))
+            return False
+
+    def include(self, inc_path):
+        """Preprocess an included file.
+
+        The result is shared through the project's include cache, so that
+        each include is only tokenized once for each set of visible defines.
+        """
+        cache = self.project.include_cache if self.project else None
+        if cache is not None:
+            key = cache.key(inc_path, self.engine, self.defines)
+            entry = cache.get(key, self)
+            if self.stats:
+                self.stats.counts['include_hits' if entry
+                                  else 'include_misses'] += 1
+            if entry:
+                self.defines.clear()
+                self.defines.update(entry.defines)
+                self.inactive_lines += entry.inactive_lines
+                self.includes.extend(entry.includes)
+                self.inc_reports.update(entry.inc_reports)
+                self.indent.extend(entry.indent)
+                return
+
+        n_includes = len(self.includes)
+        n_indent = len(self.indent)
+        n_inactive = self.inactive_lines
+        prior_reports = dict(self.inc_reports)
+
+        # TODO: Using the Source tokenize seems dumb here but I
+        #  don't have a better solution at the moment.
+        inc_report = Report(vocabulary=self.report.cases.vocabulary)
+        # The lines are only read for their directives and diagnostics
+        for _ in self.tokenized_lines(path=inc_path, report=inc_report):
+            pass
+        self.inc_reports[inc_path] = inc_report
+
+        if cache is not None and not self.failure:
+            entry = IncludeEntry()
+            entry.defines = dict(self.defines)
+            entry.inactive_lines = self.inactive_lines - n_inactive
+            entry.includes = self.includes[n_includes:]
+            entry.inc_reports = [
+                (path, report) for path, report in self.inc_reports.items()
+                if prior_reports.get(path) is not report
+            ]
+            entry.indent = self.indent[n_indent:]
+            cache.put(key, entry)
+
+    def find_include(self, inc_fname):
+        """Return the path of an included file, or None if not found."""
+        curdir = os.path.dirname(self.path)
+        if self.project:
+            return self.project.find_include(inc_fname, curdir)
+
+        # Without a project, only the current directory is searched
+        test_fpath = os.path.join(curdir, inc_fname)
+        return test_fpath if os.path.isfile(test_fpath) else None
+
+
+def count_units(units):
+    """Return the number of program units, including nested units."""
+    n_units = 0
+    units = list(units)
+    while units:
+        unit = units.pop()
+        n_units += 1
+        units.extend(unit.subprograms)
+        units.extend(unit.blocks)
+    return n_units
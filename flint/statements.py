@@ -0,0 +1,298 @@
+"""Classification of Fortran statements.
+
+Statements are classified by a dispatch table on their first token, with
+the final token or the unit prefix checked only for the statements which
+need them.
+"""
+from flint.variable import Variable
+
+# Statement kinds
+OTHER = 0           # Executable and unsupported statements
+USE = 1
+IMPORT = 2
+IMPLICIT = 3
+DECLARATION = 4
+CONTAINS = 5
+CONTINUE = 6        # Labeled CONTINUE
+END = 7
+PROGRAM = 8
+MODULE = 9
+SUBMODULE = 10
+SUBROUTINE = 11
+FUNCTION = 12
+BLOCK = 13          # BLOCK construct (or BLOCK DATA)
+INTERFACE = 14
+TYPE = 15           # Derived type definitions and TYPE(...) declarations
+ENUM = 16
+CONSTRUCT = 17
+
+kind_names = (
+    'other',
+    'use',
+    'import',
+    'implicit',
+    'declaration',
+    'contains',
+    'continue',
+    'end',
+    'program',
+    'module',
+    'submodule',
+    'subroutine',
+    'function',
+    'block',
+    'interface',
+    'type',
+    'enum',
+    'construct',
+)
+
+unit_types = [
+    'program',
+    'function',
+    'subroutine',
+    'module',
+    'submodule',
+    'block',
+    # Not really a program unit, but seems to work...
+    'interface',
+    'type',
+    'enum',
+]
+
+# R507 access-spec
+access_specs = [
+    'public',
+    'private',
+]
+
+# R502 attr-spec
+attribute_specs = access_specs + [
+    'allocatable',
+    'asynchronous',
+    'codimension',
+    'contiguous',
+    'dimension',
+    'external',
+    'intent',
+    'intrinsic',
+    'namelist',     # NOTE: Not an attribute...
+    # language-binding-spec
+    'optional',
+    'pointer',
+    'protected',
+    'save',
+    'target',
+    'value',
+    'volatile',
+    'common',       # Deprecated
+    'equivalence',  # Deprecated
+]
+
+declaration_types = Variable.intrinsic_types + attribute_specs + [
+    'type',         # R426, R403
+    'enum',         # R459 ("ENUM, BIND(C)")
+    'generic',      # R1210
+    'interface',    # R1201
+    'parameter',    # R551
+    'procedure',    # R1213: Procedure declaration statement
+    'data',         # R537
+    'format',       # R1001
+    'entry',        # R1242 (obsolete)
+]
+
+unit_prefix = Variable.intrinsic_types + [
+    'elemental',
+    'impure',
+    'non_recursive',
+    'pure',
+    'recursive',
+]
+
+construct_types = [
+    'associate',
+    'block',
+    'critical',
+    'do',
+    'if',
+    'forall',
+    'where',
+    # Proxy for keyword pairs below
+    'change',
+    'select',
+]
+
+construct_kw_pairs = [
+    ('change', 'team'),
+    ('select', 'case'),
+    ('select', 'rank'),
+    ('select', 'type'),
+]
+
+# Keywords of the END statements of constructs, which for the keyword pairs
+# are END SELECT and END TEAM
+construct_end_types = [w for w in construct_types if w != 'change'] + [
+    'team',
+]
+
+# Keywords, which are checked for consistent case
+keywords = frozenset(
+    unit_types + attribute_specs + declaration_types + unit_prefix
+    + construct_types
+    + ['end' + w for w in unit_types + construct_end_types]
+    + [
+        'abstract', 'allocate', 'assignment', 'backspace', 'bind', 'call',
+        'case', 'class', 'close', 'contains', 'continue', 'cycle',
+        'deallocate', 'default', 'else', 'elseif', 'elsewhere', 'end',
+        'endfile', 'exit', 'extends', 'final', 'flush', 'go', 'goto',
+        'implicit', 'import', 'in', 'inout', 'include', 'inquire', 'kind',
+        'len', 'none', 'non_overridable', 'nopass', 'nullify', 'only', 'open',
+        'operator', 'out', 'pass', 'precision', 'print', 'read', 'result',
+        'return', 'rewind', 'select', 'selectcase', 'sequence', 'stop',
+        'then', 'to', 'use', 'wait', 'while', 'write',
+        # Operators and logical constants
+        '.and.', '.or.', '.not.', '.eqv.', '.neqv.', '.eq.', '.ne.', '.lt.',
+        '.le.', '.gt.', '.ge.', '.true.', '.false.',
+    ]
+)
+
+# Kinds of the statements which start a program unit or block
+unit_kinds = frozenset((PROGRAM, MODULE, SUBMODULE, SUBROUTINE, FUNCTION,
+                        BLOCK, INTERFACE, TYPE, ENUM))
+
+# Kinds of the declaration constructs of a specification part
+declaration_kinds = frozenset((DECLARATION, INTERFACE, TYPE, ENUM))
+
+# Kinds of the statements which start an executable construct
+construct_kinds = frozenset((CONSTRUCT, BLOCK))
+
+unit_kinds_by_type = {
+    'program': PROGRAM,
+    'function': FUNCTION,
+    'subroutine': SUBROUTINE,
+    'module': MODULE,
+    'submodule': SUBMODULE,
+    'block': BLOCK,
+    'interface': INTERFACE,
+    'type': TYPE,
+    'enum': ENUM,
+}
+
+_intrinsic_types = frozenset(Variable.intrinsic_types)
+_unit_types = frozenset(unit_types)
+_unit_prefix = frozenset(unit_prefix)
+_construct_kw_pairs = frozenset(construct_kw_pairs)
+
+
+def classify(line):
+    """Return the kind of a statement, from its lowercased tokens."""
+    rule = _rules.get(line[0])
+    if rule is None:
+        return _labeled_statement(line) if line[0].isdigit() else OTHER
+    elif rule.__class__ is int:
+        return rule
+    return rule(line)
+
+
+def _unit_statement(line, default):
+    """Classify a statement which may begin with a unit prefix."""
+    idx = next((i for i, w in enumerate(line) if w in _unit_types), -1)
+    if idx < 0:
+        return default
+
+    # NOTE: The token following a type is not checked, which allows for
+    #   DOUBLE PRECISION
+    i = 0
+    while i < idx:
+        word = line[i]
+        if word in _intrinsic_types:
+            i += 1
+            if i < idx and line[i] == '(':
+                # TODO: Parse this more formally
+                while i < idx and line[i] != ')':
+                    i += 1
+        elif word not in _unit_prefix:
+            return default
+        i += 1
+
+    return unit_kinds_by_type[line[idx]]
+
+
+def _typed_statement(line):
+    return _unit_statement(line, DECLARATION)
+
+
+def _prefixed_statement(line):
+    return _unit_statement(line, OTHER)
+
+
+def _module_statement(line):
+    """Distinguish MODULE PROCEDURE statements (R1206) of interface blocks
+    from module statements."""
+    if len(line) > 1 and line[1] == 'procedure':
+        return DECLARATION
+    return MODULE
+
+
+def _abstract_statement(line):
+    if len(line) > 1 and line[1] == 'interface':
+        return INTERFACE
+    return OTHER
+
+
+def _if_statement(line):
+    return CONSTRUCT if line[-1] == 'then' else OTHER
+
+
+def _paired_statement(line):
+    """Classify a construct which starts with a pair of keywords, as in
+    SELECT CASE or CHANGE TEAM."""
+    if len(line) > 1 and (line[0], line[1]) in _construct_kw_pairs:
+        return CONSTRUCT
+    return OTHER
+
+
+def _where_statement(line):
+    """Distinguish WHERE constructs from single-line WHERE statements."""
+    if len(line) < 3 or line[1] != '(':
+        return OTHER
+
+    par_count = 0
+    for idx in range(1, len(line)):
+        tok = line[idx]
+        if tok == '(':
+            par_count += 1
+        elif tok == ')':
+            par_count -= 1
+            if par_count == 0:
+                break
+
+    return CONSTRUCT if idx == len(line) - 1 else OTHER
+
+
+def _labeled_statement(line):
+    if len(line) == 2 and line[1] == 'continue':
+        return CONTINUE
+    return OTHER
+
+
+# Statement kinds (or classification functions) by first token
+_rules = {}
+_rules.update((w, DECLARATION) for w in declaration_types)
+_rules.update((w, _prefixed_statement) for w in unit_prefix)
+_rules.update((w, _typed_statement) for w in Variable.intrinsic_types)
+_rules.update((w, CONSTRUCT) for w in construct_types)
+_rules.update((w, _paired_statement) for w, _ in construct_kw_pairs)
+_rules.update(unit_kinds_by_type)
+_rules.update({
+    'use': USE,
+    'import': IMPORT,
+    'implicit': IMPLICIT,
+    'contains': CONTAINS,
+    'end': END,
+    'module': _module_statement,
+    'abstract': _abstract_statement,
+    'if': _if_statement,
+    'where': _where_statement,
+})
+_rules.update(('end' + w, END) for w in unit_types + construct_end_types)
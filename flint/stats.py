@@ -0,0 +1,221 @@
+"""Timing and counts of the phases of parsing."""
+import collections
+import pstats
+
+try:
+    from time import perf_counter, process_time     # Python 3
+except ImportError:
+    from time import time as perf_counter           # Python 2
+    from time import clock as process_time
+
+from flint.fortlines import FortLines
+
+# Phases of parsing a source
+READ = 'read'                   # Reading lines and tracking their state
+TOKENIZE = 'tokenize'
+PREPROCESS = 'preprocess'       # Directives, includes and macro substitution
+CHECKS = 'checks'               # Style checks of the report
+LINES = 'lines'                 # Splitting and joining of statements
+PARSE = 'parse'                 # Program units and constructs
+
+phases = (READ, TOKENIZE, PREPROCESS, CHECKS, LINES, PARSE)
+
+# Counters: lines, tokens, statements, units, include_hits, include_misses
+# and (for the project) cached files
+
+
+class FileStats(object):
+    """Wall and CPU time of each phase of parsing a file, and its counts.
+
+    The time of a file is spent in one phase at a time, so that the time of
+    a phase excludes the phases which it calls.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.wall = dict.fromkeys(phases, 0.)
+        self.cpu = dict.fromkeys(phases, 0.)
+        self.counts = collections.Counter()
+
+        # Raw cProfile statistics, if the file was profiled
+        self.profile = None
+
+        # Current phase, and the times when it began
+        self.phase = None
+        self.wall_mark = None
+        self.cpu_mark = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['phase'] = None
+        return state
+
+    @property
+    def wall_time(self):
+        return sum(self.wall.values())
+
+    @property
+    def cpu_time(self):
+        return sum(self.cpu.values())
+
+    def switch(self, phase):
+        """Charge the time since the last switch to the current phase, and
+        begin `phase` (or stop timing if None).  Returns the prior phase."""
+        wall, cpu = perf_counter(), process_time()
+
+        prior = self.phase
+        if prior is not None:
+            self.wall[prior] += wall - self.wall_mark
+            self.cpu[prior] += cpu - self.cpu_mark
+
+        self.phase = phase
+        self.wall_mark, self.cpu_mark = wall, cpu
+        return prior
+
+    def timed(self, phase, func):
+        """Return `func`, timed as a phase."""
+        def timed_func(*args, **kwargs):
+            prior = self.switch(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.switch(prior)
+        return timed_func
+
+    def timed_iter(self, phase, iterable):
+        """Generate the items of `iterable`, timed as a phase."""
+        items = iter(iterable)
+        while True:
+            prior = self.switch(phase)
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                self.switch(prior)
+            yield item
+
+
+class TimedObject(object):
+    """An object whose method calls are timed as a phase."""
+
+    def __init__(self, obj, stats, phase):
+        self._obj = obj
+        self._stats = stats
+        self._phase = phase
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if callable(attr):
+            # Methods are timed once, and then found on the instance
+            attr = self._stats.timed(self._phase, attr)
+            setattr(self, name, attr)
+        return attr
+
+
+class TimedLines(FortLines):
+    """Fortran source lines, whose statements are timed and counted."""
+
+    def __init__(self, lines, stats):
+        super(TimedLines, self).__init__(lines)
+        self.stats = stats
+
+    def __next__(self):
+        prior = self.stats.switch(LINES)
+        try:
+            line = super(TimedLines, self).__next__()
+        finally:
+            self.stats.switch(prior)
+        self.stats.counts['statements'] += 1
+        return line
+
+
+class _ProfileData(object):
+    """The raw statistics of a profile, as loaded by `pstats.Stats`."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class ProjectStats(object):
+    """Timing and counts of the files of a project."""
+
+    def __init__(self):
+        self.files = []
+        self.wall = dict.fromkeys(phases, 0.)
+        self.cpu = dict.fromkeys(phases, 0.)
+        self.counts = collections.Counter()
+
+        # Wall time of the whole run, including cached and skipped files
+        self.elapsed = 0.
+
+    def add(self, file_stats):
+        """Add the stats of a parsed file, replacing any prior stats of its
+        path."""
+        self.remove(file_stats.path)
+        self.files.append(file_stats)
+        for phase in phases:
+            self.wall[phase] += file_stats.wall[phase]
+            self.cpu[phase] += file_stats.cpu[phase]
+        self.counts.update(file_stats.counts)
+
+    def remove(self, path):
+        """Remove the stats of a file, and subtract them from the totals."""
+        for idx, file_stats in enumerate(self.files):
+            if file_stats.path == path:
+                break
+        else:
+            return
+        del self.files[idx]
+        for phase in phases:
+            self.wall[phase] -= file_stats.wall[phase]
+            self.cpu[phase] -= file_stats.cpu[phase]
+        for name, n in file_stats.counts.items():
+            self.counts[name] -= n
+            if not self.counts[name]:
+                del self.counts[name]
+
+    def slowest(self, n=10):
+        """Return the stats of the `n` files with the most wall time."""
+        return sorted(self.files, key=lambda f: f.wall_time,
+                      reverse=True)[:n]
+
+    def profile(self, path, stream=None):
+        """Return the `pstats.Stats` of a profiled file, or None."""
+        for file_stats in self.files:
+            if file_stats.path == path and file_stats.profile:
+                return pstats.Stats(_ProfileData(file_stats.profile),
+                                    stream=stream)
+
+    def phase_table(self):
+        """Return a table of the time of each phase."""
+        rows = ['{:<12} {:>10} {:>10}'.format('phase', 'wall (s)', 'cpu (s)')]
+        for phase in phases:
+            rows.append('{:<12} {:10.3f} {:10.3f}'
+                        ''.format(phase, self.wall[phase], self.cpu[phase]))
+        rows.append('{:<12} {:10.3f} {:10.3f}'
+                    ''.format('total', sum(self.wall.values()),
+                              sum(self.cpu.values())))
+        return '\n'.join(rows)
+
+    def table(self, n=10):
+        """Return a table of the `n` slowest files."""
+        rows = ['{:>10} {:>10} {:>8} {:>8} {:<10}  {}'
+                ''.format('wall (s)', 'cpu (s)', 'lines', 'stmts', 'slowest',
+                          'file')]
+        for f in self.slowest(n):
+            rows.append('{:10.3f} {:10.3f} {:8} {:8} {:<10}  {}'.format(
+                f.wall_time, f.cpu_time, f.counts['lines'],
+                f.counts['statements'], max(phases, key=f.wall.get),
+                f.path))
+        return '\n'.join(rows)
+
+    def __str__(self):
+        counts = ', '.join('{} {}'.format(n, name)
+                           for name, n in sorted(self.counts.items()))
+        return '{}\n\n{}\n\n{} files in {:.3f} s: {}'.format(
+            self.phase_table(), self.table(), len(self.files), self.elapsed,
+            counts)
@@ -0,0 +1,155 @@
+"""Index of the named program units, blocks and variables of a project."""
+import bisect
+import collections
+
+# Separator of the scopes of a qualified name, as in `module::function::x`
+SEPARATOR = '::'
+
+# A definition: its name, qualified name, kind (the unit type, such as
+# 'module' or 'type', or 'variable' or 'component'), and its location
+Symbol = collections.namedtuple('Symbol', 'name qualname kind path line')
+
+
+def block_name(block):
+    """Return the name of a derived type, interface or enum block, or None.
+
+    The names of blocks are currently their header statement, as in
+    `type , public :: point` or `interface operator ( + )`.  Abstract
+    interfaces are unnamed.
+    """
+    tokens = block.name.split() if block.name else []
+    if tokens[:1] == ['abstract']:
+        return None
+    if SEPARATOR in tokens:
+        tokens = tokens[tokens.index(SEPARATOR) + 1:]
+    elif len(tokens) > 1 and tokens[1] != ',':
+        tokens = tokens[1:]
+    else:
+        return None
+    return ''.join(tokens) or None
+
+
+def scope_name(unit):
+    """Return the name of a program unit or block, or None if unnamed."""
+    if unit.utype in ('type', 'interface', 'enum'):
+        return block_name(unit)
+    return unit.name
+
+
+def unit_symbols(unit, path, scope=''):
+    """Generate the symbols of a program unit and its nested units."""
+    stack = [(unit, scope)]
+    while stack:
+        unit, scope = stack.pop()
+        name = scope_name(unit)
+        if not name:
+            # Unnamed blocks (such as interface bodies and enumerations)
+            continue
+
+        qualname = scope + SEPARATOR + name if scope else name
+        yield Symbol(name, qualname, unit.utype, path, unit.line)
+
+        # Interface bodies are not definitions
+        if unit.utype == 'interface':
+            continue
+
+        kind = 'component' if unit.utype == 'type' else 'variable'
+        for var in unit.variables:
+            yield Symbol(var.name, qualname + SEPARATOR + var.name, kind,
+                         path, var.line)
+
+        # Nested units are generated in order
+        for nested in reversed(unit.blocks + unit.subprograms):
+            stack.append((nested, qualname))
+
+
+class SymbolIndex(object):
+    """The symbols of the parsed sources, by qualified and bare name.
+
+    Names are case-insensitive, and symbols are found by name in constant
+    time.  Sources are added as they are parsed, and removed (or replaced)
+    by path, so that the index follows the sources of a project.
+    """
+
+    def __init__(self, sources=()):
+        self.qualnames = collections.defaultdict(list)
+        self.names = collections.defaultdict(list)
+        self.files = {}
+
+        # Sorted qualified and bare names, or None until rebuilt
+        self._sorted = None
+
+        for src in sources:
+            self.add_source(src)
+
+    def __len__(self):
+        return sum(len(symbols) for symbols in self.files.values())
+
+    def __iter__(self):
+        for symbols in self.files.values():
+            for symbol in symbols:
+                yield symbol
+
+    def add_source(self, src):
+        """Add the symbols of a source, replacing any prior symbols of its
+        path."""
+        self.remove(src.path)
+
+        symbols = []
+        for unit in src.units:
+            symbols.extend(unit_symbols(unit, src.path))
+        self.files[src.path] = symbols
+
+        for symbol in symbols:
+            self.add_key(self.qualnames, symbol.qualname, symbol)
+            self.add_key(self.names, symbol.name, symbol)
+
+    def remove(self, path):
+        """Remove the symbols of a source."""
+        for symbol in self.files.pop(path, ()):
+            self.remove_key(self.qualnames, symbol.qualname, symbol)
+            self.remove_key(self.names, symbol.name, symbol)
+
+    def add_key(self, index, key, symbol):
+        if key not in index:
+            self._sorted = None
+        index[key].append(symbol)
+
+    def remove_key(self, index, key, symbol):
+        symbols = index[key]
+        symbols.remove(symbol)
+        if not symbols:
+            del index[key]
+            self._sorted = None
+
+    def lookup(self, name, kind=None):
+        """Return the symbols of a qualified or bare name, optionally of a
+        kind (or kinds)."""
+        name = name.lower()
+        index = self.qualnames if SEPARATOR in name else self.names
+        symbols = index.get(name, [])
+        return filter_kinds(symbols, kind)
+
+    def search(self, prefix='', kind=None, qualified=False):
+        """Return the symbols whose bare (or qualified) name starts with
+        `prefix`, optionally of a kind (or kinds), ordered by name."""
+        if self._sorted is None:
+            self._sorted = (sorted(self.names), sorted(self.qualnames))
+        keys = self._sorted[1] if qualified else self._sorted[0]
+        index = self.qualnames if qualified else self.names
+
+        prefix = prefix.lower()
+        symbols = []
+        for idx in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[idx].startswith(prefix):
+                break
+            symbols.extend(index[keys[idx]])
+        return filter_kinds(symbols, kind)
+
+
+def filter_kinds(symbols, kind):
+    """Return the symbols of a kind, or a collection of kinds."""
+    if kind is None:
+        return list(symbols)
+    kinds = (kind,) if isinstance(kind, str) else kind
+    return [symbol for symbol in symbols if symbol.kind in kinds]
@@ -0,0 +1,317 @@
+"""Inverted index of the statement tokens of a project."""
+import bisect
+import collections
+from array import array
+
+# Wildcards of a search pattern: any one token, and any run of tokens
+ANY_TOKEN = '?'
+ANY_TOKENS = '...'
+
+# Postings are encoded as (statement id << POS_BITS) + token position
+POS_BITS = 20
+POS_MASK = (1 << POS_BITS) - 1
+
+# A statement which matches a pattern: its file, the line of its first
+# matched token, and the index of the statement in the file
+TokenMatch = collections.namedtuple('TokenMatch', 'path line statement')
+
+
+class TokenIndex(object):
+    """The positions of each token in the statements of a project.
+
+    Tokens are those of the parser: lowercased (except for strings), without
+    comments, docstrings or whitespace, with continued lines joined into
+    logical statements and preprocessor macros replaced.  Each token has a
+    posting list of its statements and positions, in a compact array, and
+    the offset of its line from the first line of its statement.
+
+    Removed files are dropped from the results at once, and from the posting
+    lists (and statement arrays) once they are most of the postings.
+    """
+
+    def __init__(self):
+        # Path of each file id (None once removed), its first statement and
+        # its number of postings
+        self.paths = []
+        self.file_ids = {}
+        self.file_starts = []
+        self.file_postings = []
+
+        # File, first line and number of tokens of each statement id
+        self.stmt_files = array('l')
+        self.stmt_lines = array('l')
+        self.stmt_sizes = array('l')
+
+        # Posting lists of each token, and the line offset of each posting
+        self.postings = {}
+        self.line_offsets = {}
+
+        # Postings of the current and of the removed files
+        self.live_postings = 0
+        self.removed_postings = 0
+
+    def __len__(self):
+        return len(self.file_ids)
+
+    def add_file(self, path, statements):
+        """Add the (tokens, line numbers) statements of a file, replacing any
+        prior statements of its path."""
+        self.remove(path)
+
+        file_id = len(self.paths)
+        self.paths.append(path)
+        self.file_ids[path] = file_id
+        self.file_starts.append(len(self.stmt_files))
+
+        postings = self.postings
+        line_offsets = self.line_offsets
+        n_postings = 0
+        for tokens, line_numbers in statements:
+            stmt_id = len(self.stmt_files)
+            first_line = line_numbers[0] if line_numbers else None
+            if first_line is None:
+                first_line = 0
+            self.stmt_files.append(file_id)
+            self.stmt_lines.append(first_line)
+            self.stmt_sizes.append(min(len(tokens), POS_MASK + 1))
+            n_postings += min(len(tokens), len(line_numbers), POS_MASK + 1)
+
+            key = stmt_id << POS_BITS
+            for tok, line_number in zip(tokens[:POS_MASK + 1], line_numbers):
+                try:
+                    postings[tok].append(key)
+                except KeyError:
+                    postings[tok] = array('q', [key])
+                    line_offsets[tok] = array('H')
+
+                offset = line_number - first_line if line_number else 0
+                line_offsets[tok].append(min(offset, 0xffff))
+                key += 1
+
+        self.file_postings.append(n_postings)
+        self.live_postings += n_postings
+
+    def remove(self, path):
+        """Remove the statements of a file."""
+        file_id = self.file_ids.pop(path, None)
+        if file_id is None:
+            return
+        self.paths[file_id] = None
+
+        n_postings = self.file_postings[file_id]
+        self.live_postings -= n_postings
+        self.removed_postings += n_postings
+        if self.removed_postings > self.live_postings:
+            self.compact()
+
+    def compact(self):
+        """Drop the postings and statements of removed files.
+
+        The remaining files and statements are renumbered in order, so that
+        the posting lists stay sorted.
+        """
+        n_stmts = len(self.stmt_files)
+        file_ends = self.file_starts[1:] + [n_stmts]
+
+        # New id of each statement of the remaining files (or -1)
+        stmt_map = array('l', [-1]) * n_stmts
+        paths = []
+        file_starts = []
+        file_postings = []
+        stmt_files = array('l')
+        stmt_lines = array('l')
+        stmt_sizes = array('l')
+        for file_id, path in enumerate(self.paths):
+            if path is None:
+                continue
+            new_file_id = len(paths)
+            paths.append(path)
+            self.file_ids[path] = new_file_id
+            file_starts.append(len(stmt_files))
+            file_postings.append(self.file_postings[file_id])
+
+            start, end = self.file_starts[file_id], file_ends[file_id]
+            for stmt_id in range(start, end):
+                stmt_map[stmt_id] = len(stmt_files)
+                stmt_files.append(new_file_id)
+            stmt_lines.extend(self.stmt_lines[start:end])
+            stmt_sizes.extend(self.stmt_sizes[start:end])
+
+        for tok in list(self.postings):
+            keys = self.postings[tok]
+            offsets = self.line_offsets[tok]
+            live = [idx for idx, key in enumerate(keys)
+                    if stmt_map[key >> POS_BITS] >= 0]
+            if live:
+                self.postings[tok] = array('q', (
+                    stmt_map[keys[i] >> POS_BITS] << POS_BITS
+                    | keys[i] & POS_MASK for i in live))
+                self.line_offsets[tok] = array('H', (offsets[i]
+                                                     for i in live))
+            else:
+                del self.postings[tok]
+                del self.line_offsets[tok]
+
+        self.paths = paths
+        self.file_starts = file_starts
+        self.file_postings = file_postings
+        self.stmt_files = stmt_files
+        self.stmt_lines = stmt_lines
+        self.stmt_sizes = stmt_sizes
+        self.removed_postings = 0
+
+    def count(self, token):
+        """Return the number of uses of a token."""
+        return len(self.postings.get(token.lower(), ()))
+
+    def search(self, pattern):
+        """Return the statements which contain a sequence of tokens.
+
+        The pattern is a list of tokens, or a string of tokens separated by
+        spaces, as in ``'allocate ( field'``.  ``?`` matches any one token and
+        ``...`` matches any (possibly empty) run of tokens.  Tokens are
+        lowercased, except for strings.  Each statement is returned once, at
+        its first match, in order of the files and statements.
+        """
+        if isinstance(pattern, str):
+            pattern = pattern.split()
+        pattern = [tok if tok[0] in '"\'' else tok.lower() for tok in pattern]
+
+        # Split the pattern into segments of a fixed length
+        segments = [[]]
+        for tok in pattern:
+            if tok == ANY_TOKENS:
+                segments.append([])
+            else:
+                segments[-1].append(tok)
+        segments = [seg for seg in segments if seg]
+
+        literals = set(tok for seg in segments for tok in seg
+                       if tok != ANY_TOKEN)
+        if not literals:
+            raise ValueError('pattern has no tokens: {!r}'.format(pattern))
+        if any(tok not in self.postings for tok in literals):
+            return []
+
+        # Only the statements of the least used token can match
+        stmts = None
+        if len(literals) > 1:
+            rarest = min(literals, key=lambda tok: len(self.postings[tok]))
+            stmts = sorted(set(key >> POS_BITS
+                               for key in self.postings[rarest]))
+
+        # Start keys of each segment with tokens
+        seg_starts = []
+        for seg in segments:
+            if all(tok == ANY_TOKEN for tok in seg):
+                seg_starts.append(None)
+                continue
+            starts = self.segment_starts(seg, stmts)
+            if not starts:
+                return []
+            seg_starts.append(starts)
+
+        # Matches are located at the first token of their first segment
+        # with tokens
+        first_seg = next(seg for seg, starts in zip(segments, seg_starts)
+                         if starts is not None)
+        first_offset, first_tok = next(
+            (offset, tok) for offset, tok in enumerate(first_seg)
+            if tok != ANY_TOKEN)
+
+        matches = []
+        if len(segments) == 1:
+            prior = None
+            for start in seg_starts[0]:
+                stmt_id = start >> POS_BITS
+                if stmt_id != prior:
+                    matches.append(self.match(start + first_offset,
+                                              first_tok))
+                    prior = stmt_id
+            return matches
+
+        candidates = set.intersection(*(
+            set(start >> POS_BITS for start in starts)
+            for starts in seg_starts if starts is not None))
+
+        # Match the segments in order, at their first position after the
+        # prior segment
+        for stmt_id in sorted(candidates):
+            base = stmt_id << POS_BITS
+            end = base + self.stmt_sizes[stmt_id]
+            key = base
+            first = None
+            for seg, starts in zip(segments, seg_starts):
+                if starts is None:
+                    start = key
+                else:
+                    idx = bisect.bisect_left(starts, key)
+                    if idx == len(starts) or starts[idx] >= end:
+                        break
+                    start = starts[idx]
+                    if first is None:
+                        first = start
+                key = start + len(seg)
+                if key > end:
+                    break
+            else:
+                matches.append(self.match(first + first_offset, first_tok))
+        return matches
+
+    def segment_starts(self, segment, stmts=None):
+        """Return the sorted start keys of a segment of tokens, optionally
+        within the sorted statements `stmts`."""
+        lists = [(self.postings[tok], offset)
+                 for offset, tok in enumerate(segment) if tok != ANY_TOKEN]
+
+        # Search from the least used token
+        lists.sort(key=lambda item: len(item[0]))
+        (driver, driver_offset), others = lists[0], lists[1:]
+
+        # Only the postings of the statements are searched, if they are few
+        allowed = None
+        if stmts is not None:
+            if 2 * len(stmts) < len(driver):
+                keys = array('q')
+                for stmt_id in stmts:
+                    lo = bisect.bisect_left(driver, stmt_id << POS_BITS)
+                    hi = bisect.bisect_left(driver, (stmt_id + 1) << POS_BITS,
+                                            lo)
+                    keys.extend(driver[lo:hi])
+                driver = keys
+            else:
+                allowed = set(stmts)
+
+        paths = self.paths
+        stmt_files = self.stmt_files
+        stmt_sizes = self.stmt_sizes
+        size = len(segment)
+
+        starts = []
+        for key in driver:
+            stmt_id = key >> POS_BITS
+            pos = (key & POS_MASK) - driver_offset
+            if (pos < 0 or pos + size > stmt_sizes[stmt_id]
+                    or allowed is not None and stmt_id not in allowed):
+                continue
+            start = key - driver_offset
+            for keys, offset in others:
+                other = start + offset
+                idx = bisect.bisect_left(keys, other)
+                if idx == len(keys) or keys[idx] != other:
+                    break
+            else:
+                if paths[stmt_files[stmt_id]] is not None:
+                    starts.append(start)
+        return starts
+
+    def match(self, key, tok):
+        """Return the match of a token at a key."""
+        keys = self.postings[tok]
+        line_offset = self.line_offsets[tok][bisect.bisect_left(keys, key)]
+
+        stmt_id = key >> POS_BITS
+        file_id = self.stmt_files[stmt_id]
+        return TokenMatch(self.paths[file_id],
+                          self.stmt_lines[stmt_id] + line_offset,
+                          stmt_id - self.file_starts[file_id])
@@ -1,4 +1,9 @@
+import collections
 import itertools
+import re
+import time
+
+from flint.tokens import TokenLine
 
 
 class Tokenizer(object):
@@ -22,6 +27,9 @@ class Tokenizer(object):
 
         self.prior_delim = None
 
+        # Optional cache of tokenized lines
+        self.cache = None
+
     def parse(self, line, macros={}):
         """Tokenize a line of Fortran source."""
         tokens = []
@@ -95,6 +103,15 @@ class Tokenizer(object):
 
         return tokens
 
+    def spans(self, line, line_number=None):
+        """Tokenize a line of Fortran source into a `TokenLine`."""
+        prior_delim = self.prior_delim
+        if self.cache is not None:
+            tokens = self.cache.parse(self, line)
+        else:
+            tokens = self.parse(line)
+        return TokenLine.from_tokens(line, tokens, line_number, prior_delim)
+
     def parse_name(self, line):
         end = self.idx
         for char in line[self.idx:]:
@@ -199,3 +216,262 @@ class Tokenizer(object):
     def update_chars(self):
         self.prior_char, self.char = self.char, next(self.characters)
         self.idx += 1
+
+
+class ScanTokenizer(Tokenizer):
+    """Tokenizer which scans each line by index rather than by character.
+
+    The token lists (and the `prior_delim` continuation state) are identical
+    to those of `Tokenizer`.  Most lines are split by a single precompiled
+    token pattern; the remainder are scanned by index over the line string.
+    """
+
+    re_space = re.compile(r'[ \t]+')
+    re_name = re.compile(r'\w+')
+    re_eol = re.compile(r'[ \t]*\Z')
+    re_delims = {
+        '"': re.compile(r'["&]'),
+        '\'': re.compile(r"['&]"),
+    }
+
+    # Complete ASCII tokens, used when no string continuation is pending.
+    # Strings with continuations, and anything else unmatched, are passed to
+    # the index scanner in `scan`.
+    re_token = re.compile(
+        r'[ \t]+'
+        r'|[A-Za-z_]\w*'
+        r'|\.?[0-9]+(?:\.[0-9]*)?(?:[eEdD][+-]?[0-9]*)?'
+        r'(?:_(?:[A-Za-z]\w*|[A-Za-z0-9]*))?'
+        r'|\.[A-Za-z]*\.?'
+        r'|"(?:[^"&]|""|&(?![ \t]*\Z))*"(?!")'
+        r"|'(?:[^'&]|''|&(?![ \t]*\Z))*'(?!')"
+        r'|[!#].*'
+        r'|::|=>|\*\*|//|==|/=|<=|>='
+        r'|[=+\-*/\\()\[\]{},:;%&~<>?`|$@]'
+    )
+
+    def parse(self, line, macros={}):
+        """Tokenize a line of Fortran source."""
+        n = len(line) - 1 if line.endswith('\n') else len(line)
+
+        if macros or self.prior_delim or not line.isascii():
+            return self.scan(line, n, macros)
+
+        # Without gaps between matches, findall is the complete token list
+        tokens = self.re_token.findall(line, 0, n)
+        if sum(map(len, tokens)) == n:
+            return tokens
+
+        tokens = []
+        i = 0
+        match = self.re_token.match
+        while i < n:
+            m = match(line, i, n)
+            if m:
+                i = m.end()
+                tokens.append(m.group())
+            else:
+                # String continuations (or errors) are left to the scanner
+                tokens.extend(self.scan(line, n, macros, i))
+                break
+
+        return tokens
+
+    def scan(self, line, n, macros, i=0):
+        """Tokenize `line` by index, from `i` up to `n`."""
+        tokens = []
+
+        while i < n:
+            char = line[i]
+
+            if char in ' \t':
+                j = self.re_space.match(line, i, n).end()
+                word = line[i:j]
+
+            elif char in '"\'' or (self.prior_delim and char != '&'):
+                word, j = self.parse_string(line, i, n)
+
+            elif char.isalpha() or char == '_':
+                j = self.re_name.match(line, i, n).end()
+                word = line[i:j]
+
+            elif char.isdigit():
+                j = self.parse_numeric(line, i, n)
+                word = line[i:j]
+
+            elif char in ('!', '#'):
+                # The comment token is the rest of the line
+                j = n
+                word = line[i:j]
+
+            elif char == '.':
+                j = i + 1
+                if j < n and line[j].isdigit():
+                    j = self.parse_numeric(line, j, n)
+                else:
+                    while j < n and line[j].isalpha():
+                        j += 1
+                    if j < n and line[j] == '.':
+                        j += 1
+                word = line[i:j]
+
+            elif char in Tokenizer.punctuation:
+                # See Tokenizer.parse for the omission of (/ and /)
+                if line[i:i + 2] in self.pairs:
+                    tokens.append(line[i:i + 2])
+                    i += 2
+                    continue
+                j = i + 1
+                word = char
+
+            else:
+                # This should never happen
+                raise ValueError
+
+            if word in macros:
+                print('replacing {} with {}'.format(word, macros[word]))
+                word = macros[word]
+
+            tokens.append(word)
+            i = j
+
+        return tokens
+
+    def parse_string(self, line, i, n):
+        """Return the string token starting at `i` and the index after it."""
+        if self.prior_delim:
+            delim = self.prior_delim
+            self.prior_delim = None
+            start = j = i
+        else:
+            delim = line[i]
+            start, j = i, i + 1
+
+        re_delim = self.re_delims[delim]
+        while True:
+            match = re_delim.search(line, j, n)
+            if not match:
+                # Unterminated string
+                raise ValueError
+            j = match.start()
+
+            if line[j] == '&':
+                # A trailing '&' is a line continuation; otherwise it is part
+                # of the string
+                if self.re_eol.match(line, j + 1, n):
+                    self.prior_delim = delim
+                    return line[start:j], j
+                j += 1
+
+            elif j + 1 < n and line[j + 1] == delim:
+                # Escaped delimiter
+                j += 2
+
+            else:
+                return line[start:j + 1], j + 1
+
+    def parse_numeric(self, line, i, n):
+        """Return the index after the numeric token starting at `i`."""
+        j = i
+        frac = False
+
+        # Only allow one decimal point
+        while j < n and (line[j].isdigit() or (line[j] == '.' and not frac)):
+            if line[j] == '.':
+                frac = True
+            j += 1
+
+        # Check for float exponent
+        if j < n and line[j] in 'eEdD':
+            j += 1
+            if j < n and line[j] in '+-':
+                j += 1
+            while j < n and line[j].isdigit():
+                j += 1
+
+        # Kind suffix
+        if j < n and line[j] == '_':
+            j += 1
+            named = j < n and line[j].isalpha()
+
+            while j < n and (line[j].isdigit() or line[j].isalpha()
+                             or (line[j] == '_' and named)):
+                j += 1
+
+        return j
+
+
+class TokenCache(object):
+    """Bounded LRU cache of tokenized lines.
+
+    Lines are keyed by their text, the string continuation state of the
+    tokenizer and the version of any macro table, and are stored as
+    immutable token tuples.  A cache may be shared by all of the tokenizers
+    of a project.
+    """
+
+    def __init__(self, max_size=2**16):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+        # Time spent tokenizing the misses
+        self.miss_time = 0.
+
+    def parse(self, tokenizer, line, macros=None):
+        """Return the tokens of a line, as with `tokenizer.parse`."""
+        version = None
+        if macros:
+            version = getattr(macros, 'version', None)
+            if version is None:
+                # Unversioned macros cannot be tracked
+                return tuple(tokenizer.parse(line, macros))
+
+        key = (line, tokenizer.prior_delim, version)
+        try:
+            tokens, prior_delim = self.entries[key]
+        except KeyError:
+            pass
+        else:
+            self.entries.move_to_end(key)
+            tokenizer.prior_delim = prior_delim
+            self.hits += 1
+            return tokens
+
+        start = time.perf_counter()
+        tokens = tuple(tokenizer.parse(line, macros or {}))
+        self.miss_time += time.perf_counter() - start
+        self.misses += 1
+
+        self.entries[key] = (tokens, tokenizer.prior_delim)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+        return tokens
+
+    def hit_rate(self):
+        """Return the fraction of lookups which were cache hits."""
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.
+
+    def time_saved(self):
+        """Estimate the tokenization time avoided by cache hits.
+
+        Each hit is assumed to save the mean time of a miss.  The cost of
+        the lookups is not included.
+        """
+        if not self.misses:
+            return 0.
+        return self.hits * self.miss_time / self.misses
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Tokenizer engines, selectable by name
+engines = {
+    'char': Tokenizer,
+    'scan': ScanTokenizer,
+}
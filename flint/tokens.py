@@ -0,0 +1,196 @@
+"""Compact token records.
+
+A tokenized line is stored as columns of token kinds and (start, end)
+offsets into the source line, so that the token strings only need to be
+created for the tokens which are actually used.
+"""
+import itertools
+from array import array
+
+from flint.document import is_docstring
+
+# Token kinds
+SPACE = 0
+NAME = 1
+NUMBER = 2
+OPERATOR = 3        # .op.
+STRING = 4
+PUNCTUATION = 5
+COMMENT = 6
+DOCSTRING = 7
+DIRECTIVE = 8       # Preprocessor lines
+
+kind_names = (
+    'space',
+    'name',
+    'number',
+    'operator',
+    'string',
+    'punctuation',
+    'comment',
+    'docstring',
+    'directive',
+)
+
+# Token kinds which are removed from the parsed source
+discard_kinds = frozenset((SPACE, COMMENT, DIRECTIVE))
+
+# Token kinds which retain their case in the parsed source
+literal_kinds = frozenset((STRING, DOCSTRING))
+
+# Token kinds which may be keywords, and are tracked for case consistency
+keyword_kinds = frozenset((NAME, OPERATOR))
+
+# Token kinds other than names
+unnamed_kinds = frozenset(range(len(kind_names))) - frozenset((NAME,))
+
+_kinds_by_char = {
+    ' ': SPACE,
+    '\t': SPACE,
+    '"': STRING,
+    '\'': STRING,
+    '#': DIRECTIVE,
+    '_': NAME,
+}
+_kinds_by_char.update((c, NAME) for c in
+                      'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_kinds_by_char.update((c, NUMBER) for c in '0123456789')
+
+
+def token_kind(tok):
+    """Return the kind of a token which starts a new lexical element."""
+    try:
+        return _kinds_by_char[tok[0]]
+    except KeyError:
+        pass
+
+    char = tok[0]
+    if char == '!':
+        return DOCSTRING if is_docstring(tok) else COMMENT
+    elif char == '.':
+        return NUMBER if tok[1:2].isdigit() else OPERATOR
+    elif char.isalpha():
+        return NAME
+    elif char.isdigit():
+        return NUMBER
+    else:
+        return PUNCTUATION
+
+
+class TokenList(list):
+    """Statement tokens of a source line, with its line number."""
+    __slots__ = ('line_number',)
+
+    def __init__(self, tokens=(), line_number=None):
+        super(TokenList, self).__init__(tokens)
+        self.line_number = line_number
+
+
+class TokenLine(object):
+    """The tokens of a source line, stored as spans of the line."""
+
+    def __init__(self, line, line_number=None):
+        self.line = line
+        self.line_number = line_number
+
+        self.kinds = array('B')
+        self.starts = array('l')
+        self.ends = array('l')
+
+        # Token text which is not a span of `line`, such as macro
+        # substitutions, indexed by token position.
+        self.subs = {}
+
+    @classmethod
+    def from_tokens(cls, line, tokens, line_number=None, prior_delim=None):
+        """Build the spans of a token list which covers `line`.
+
+        If `prior_delim` is set, then the line opens inside a string
+        continuation.
+        """
+        tline = cls(line, line_number)
+
+        ends = array('l', itertools.accumulate(map(len, tokens)))
+        tline.ends = ends
+        tline.starts = array('l', [0]) + ends[:-1] if tokens else array('l')
+
+        get_kind = _kinds_by_char.get
+        kinds = [get_kind(tok[0]) for tok in tokens]
+
+        # The first non-whitespace token continues the prior string
+        if prior_delim:
+            for i, kind in enumerate(kinds):
+                if kind != SPACE and tokens[i] != '&':
+                    kinds[i] = STRING
+                    break
+
+        for i, kind in enumerate(kinds):
+            if kind is None:
+                kinds[i] = token_kind(tokens[i])
+        tline.kinds = array('B', kinds)
+
+        return tline
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def append(self, kind, start, end, text=None):
+        """Add a token, with optional text which replaces the span."""
+        if text is not None:
+            self.subs[len(self.kinds)] = text
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def text(self, idx):
+        """Return the text of a token."""
+        if self.subs and idx in self.subs:
+            return self.subs[idx]
+        return self.line[self.starts[idx]:self.ends[idx]]
+
+    def size(self, idx):
+        """Return the length of a token."""
+        if self.subs and idx in self.subs:
+            return len(self.subs[idx])
+        return self.ends[idx] - self.starts[idx]
+
+    def join(self, start, end):
+        """Return the concatenated text of a range of tokens."""
+        end = min(end, len(self.kinds))
+        if not self.subs:
+            return self.line[self.starts[start]:self.ends[end - 1]]
+        return ''.join(self.text(idx) for idx in range(start, end))
+
+    def texts(self, exclude=frozenset()):
+        """Return the token strings, except for the kinds in `exclude`."""
+        if not self.subs:
+            line = self.line
+            return [line[start:end] for kind, start, end
+                    in zip(self.kinds, self.starts, self.ends)
+                    if kind not in exclude]
+
+        return [self.text(idx) for idx, kind in enumerate(self.kinds)
+                if kind not in exclude]
+
+    def statement_tokens(self):
+        """Return the tokens used by the parser.
+
+        Whitespace, comments and preprocessor tokens are removed, and all
+        tokens other than strings and docstrings are lowercased.  The tokens
+        are returned as a `TokenList` with the line number.
+        """
+        if not self.subs:
+            line = self.line
+            return TokenList((
+                line[start:end] if kind in literal_kinds
+                else line[start:end].lower()
+                for kind, start, end in zip(self.kinds, self.starts, self.ends)
+                if kind not in discard_kinds
+            ), self.line_number)
+
+        return TokenList((
+            self.text(idx) if kind in literal_kinds
+            else self.text(idx).lower()
+            for idx, kind in enumerate(self.kinds)
+            if kind not in discard_kinds
+        ), self.line_number)
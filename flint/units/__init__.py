@@ -1,15 +1,20 @@
-from flint.units.subroutine import Subroutine, is_subroutine
-from flint.units.function import Function, is_function
-from flint.units.module import Module, is_module
+from flint.statements import classify, FUNCTION, MODULE, PROGRAM, SUBROUTINE
+from flint.units.unit import Unit
+from flint.units.subroutine import Subroutine
+from flint.units.function import Function
+from flint.units.module import Module
+
+program_unit_types = {
+    SUBROUTINE: Subroutine,
+    FUNCTION: Function,
+    MODULE: Module,
+    PROGRAM: Unit,
+}
 
 
 def get_program_unit_type(line):
-    if is_subroutine(line):
-        return Subroutine
-    elif is_function(line):
-        return Function
-    elif is_module(line):
-        return Module
-    else:
+    try:
+        return program_unit_types[classify(line)]
+    except KeyError:
         # TODO: Submodule, block
         raise ValueError
@@ -25,6 +25,8 @@ decl_types = intrinsic_types + [
 
 class Function(Unit):
     # Placeholder class for now
+    __slots__ = ()
+
     def __init__(self):
         super(Function, self).__init__()
 
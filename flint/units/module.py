@@ -5,6 +5,8 @@ from flint.units.unit import Unit
 
 class Module(Unit):
     # Placeholder class for now
+    __slots__ = ()
+
     def __init__(self):
         super(Module, self).__init__()
 
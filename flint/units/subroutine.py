@@ -13,6 +13,8 @@ subprog_attrs = [
 
 
 class Subroutine(Unit):
+    __slots__ = ()
+
     def __init__(self):
         super(Subroutine, self).__init__()
 
@@ -1,115 +1,91 @@
+import collections
+
+# Use the interned string table
+try:
+    from sys import intern      # Python 3
+except ImportError:
+    pass                        # Python 2
+
+from flint import statements
 from flint.construct import Construct
+from flint.events import UNIT_START, UNIT_END, SPECIFICATION, DECLARATION
+from flint.events import STATEMENT, UNRESOLVED
+from flint.statements import classify, CONTAINS, END, IMPLICIT, IMPORT, USE
+from flint.statements import construct_kinds, declaration_kinds, unit_kinds
+from flint.parser import parse_scope
 from flint.report import Report
 from flint.variable import Variable
 from flint.document import is_docstring, Document
 
+# A USE statement: the module, its nature ('intrinsic', 'non_intrinsic' or
+# None), whether the names are an ONLY list, and the (local name, module name)
+# pairs of the listed or renamed names
+Use = collections.namedtuple('Use', 'module nature only names')
+
+# Parser states
+_SPECIFICATION = 0
+_EXECUTION_START = 1    # At the statement which ended the specification
+_EXECUTION = 2
+_SUBPROGRAM_START = 3   # At the statement which ended the execution part
+_SUBPROGRAM = 4
+_END = 5
+_SKIP_EXECUTION = 6     # Skipping the execution part (skeleton mode)
+
 
 class Unit(object):
-    unit_types = [
-        'program',
-        'function',
-        'subroutine',
-        'module',
-        'submodule',
-        'block',
-        # Not really a program unit, but seems to work...
-        'interface',
-        'type',
-        'enum',
-    ]
-
-    # R507 access-spec
-    access_specs = [
-        'public',
-        'private',
-    ]
-
-    # R502 attr-spec
-    attribute_specs = access_specs + [
-        'allocatable',
-        'asynchronous',
-        'codimension',
-        'contiguous',
-        'dimension',
-        'external',
-        'intent',
-        'intrinsic',
-        'namelist',     # NOTE: Not an attribute...
-        # language-binding-spec
-        'optional',
-        'pointer',
-        'protected',
-        'save',
-        'target',
-        'value',
-        'volatile',
-        'common',       # Deprecated
-        'equivalence',  # Deprecated
-    ]
-
-    declaration_types = Variable.intrinsic_types + attribute_specs + [
-        'type',         # R426, R403
-        'enum',         # R459 ("ENUM, BIND(C)")
-        'generic',      # R1210
-        'interface',    # R1201
-        'parameter',    # R551
-        'procedure',    # R1213: Procedure declaration statement
-        'data',         # R537
-        'format',       # R1001
-        'entry',        # R1242 (obsolete)
-    ]
-
-    unit_prefix = Variable.intrinsic_types + [
-        'elemental',
-        'impure',
-        'non_recursive',
-        'pure',
-        'recursive',
-    ]
-
-    def __init__(self, report=None, verbose=False):
+    unit_types = statements.unit_types
+    access_specs = statements.access_specs
+    attribute_specs = statements.attribute_specs
+    declaration_types = statements.declaration_types
+    unit_prefix = statements.unit_prefix
+
+    __slots__ = ('name', 'utype', 'line', 'events', 'mode', 'subprograms',
+                 'variables', 'blocks', 'namelists', 'uses', '_report', 'doc',
+                 'state', 'nested', 'nested_line')
+
+    def __init__(self, report=None, events=None, mode='full'):
         self.name = None
         self.utype = None
-        self.verbose = verbose
+
+        # Line number of the header, if known
+        self.line = None
+
+        # Event stream of the parse, if any
+        self.events = events
+
+        # Parse mode, 'full' or 'skeleton' (without execution parts)
+        self.mode = mode
 
         self.subprograms = []
         self.variables = []
         self.blocks = []
         self.namelists = {}
-        self.report = report if report else Report()
+        self.uses = []
+
+        # The report is created when first needed
+        self._report = report
 
         self.doc = Document()
 
-    @staticmethod
-    def statement(line):
-        # TODO: If this ends up being a full type-statement parser, then it
-        # needs to be moved into its own class
-        idx = next((i for i, w in enumerate(line) if w in Unit.unit_types), -1)
+        # Parser state
+        self.state = None
+        self.nested = None
+        self.nested_line = None
 
-        if idx == 0:
-            return True
-        elif idx > 0:
-            words = iter(line[:idx])
+    @property
+    def report(self):
+        if self._report is None:
+            self._report = Report()
+        return self._report
 
-            word = next(words)
-            while True:
-                try:
-                    if word in Variable.intrinsic_types:
-                        word = next(words)
-                        if word == '(':
-                            # TODO: Parse this more formally
-                            while word != ')':
-                                word = next(words)
-                    elif word not in Unit.unit_prefix:
-                        return False
-
-                    word = next(words)
-                except StopIteration:
-                    break
-            return True
+    @report.setter
+    def report(self, report):
+        self._report = report
 
-        else:
-            return False
+    @staticmethod
+    def statement(line):
+        """Return True if the line starts a program unit or block."""
+        return classify(line) in unit_kinds
 
     def end_statement(self, line):
         assert self.utype
@@ -129,17 +105,61 @@ class Unit(object):
         Program units are generally very similar, but we leave it undefined
         here due to some slight differences.
         """
+        parse_scope(self, lines)
+
+    def open(self, lines):
+        """Parse the header of the program unit at the current line."""
         # NOTE: Unit docstrings precede the header.
         docstrings = lines.docstrings
         self.doc.docstring = '\n'.join(docstrings)
         lines.docstrings = []
 
         self.doc.header = ' '.join(lines.current_line)
+        if lines.line_numbers:
+            self.line = lines.line_numbers[0]
 
         self.parse_header(lines.current_line)
-        self.parse_specification(lines)
-        self.parse_execution(lines)
-        self.parse_subprogram(lines)
+        self.state = _SPECIFICATION
+
+    def advance(self, lines):
+        """Parse the program unit up to its next nested scope.
+
+        The specification, execution and subprogram parts are parsed in turn.
+        The nested block, construct or subprogram is returned, or None once
+        the unit has ended.
+        """
+        if self.nested:
+            self.close_nested()
+
+        while self.state != _END:
+            if self.state == _SKIP_EXECUTION:
+                if not self.skip_execution(lines):
+                    break
+                continue
+
+            if self.state in (_EXECUTION_START, _SUBPROGRAM_START):
+                # Resume from the line which ended the previous part
+                line = lines.current_line
+            else:
+                try:
+                    line = next(lines)
+                except StopIteration:
+                    break
+
+            kind = classify(line)
+            if self.state == _SPECIFICATION:
+                nested = self.parse_specification(lines, line, kind)
+            elif self.state == _SUBPROGRAM_START or self.state == _SUBPROGRAM:
+                nested = self.parse_subprogram(line, kind)
+            else:
+                nested = self.parse_execution(line, kind)
+
+            if nested:
+                self.nested = nested
+                self.nested_line = line
+                return nested
+
+        self.state = _END
 
         # Gather any trailing docstrings
         if lines.docstrings:
@@ -147,9 +167,21 @@ class Unit(object):
             lines.docstrings = []
 
         # Finalisation
-        if self.verbose:
-            print('{}: {}'.format(
-                  self.utype[0].upper(), ' '.join(lines.current_line)))
+        if self.events:
+            self.events.emit(UNIT_END, lines.current_line,
+                             self.utype[0].upper())
+
+    def close_nested(self):
+        """Add the nested scope which has just ended to the unit."""
+        if self.state == _SPECIFICATION:
+            # TODO: parse name
+            self.nested.name = ' '.join(self.nested_line)
+            self.blocks.append(self.nested)
+        elif self.state == _SUBPROGRAM:
+            self.subprograms.append(self.nested)
+
+        self.nested = None
+        self.nested_line = None
 
     def parse_header(self, line):
         """Parse the name of the program unit, if present.
@@ -171,18 +203,19 @@ class Unit(object):
         # the first character...
         utype_idx = line.index(self.utype)
 
-        if len(line) >= 2:
+        if len(line) > utype_idx + 1:
             self.name = line[utype_idx + 1]
         else:
             self.name = None
 
-        if self.verbose:
-            print('{}: {} '.format(self.utype[0].upper(), ' '.join(line)))
+        if self.events:
+            self.events.emit(UNIT_START, line, self.utype[0].upper())
 
     # Specification
 
-    def parse_specification(self, lines):
-        """Parse the specification part (R204) of a program unit (R202).
+    def parse_specification(self, lines, line, kind):
+        """Parse a statement of the specification part (R204) of a program
+        unit (R202).
 
         Specification parts contain the following:
 
@@ -190,59 +223,99 @@ class Unit(object):
         2. IMPORT statements (R1211)
         3. IMPLICIT statements (R205)
         4. Declaration constructs (R207)
+
+        Any other statement ends the specification part.
         """
         # TODO: `use`, `implicit`, and declarations must appear in that order.
-        #       This loop does not check order.
-        for line in lines:
-            if line[0] == 'use':
-                self.parse_use_stmt(line)
-            elif line[0] == 'import':
-                self.parse_import_stmt(line)
-            elif line[0] in 'implicit':
-                # TODO: PARAMETER, FORMAT, ENTRY
-                self.parse_implicit_stmt(line)
-            elif line[0] in Unit.declaration_types:
-                self.parse_declaration_construct(lines, line)
-            else:
-                break
+        #       This does not check order.
+        if kind == USE:
+            self.parse_use_stmt(line)
+        elif kind == IMPORT:
+            self.parse_import_stmt(line)
+        elif kind == IMPLICIT:
+            # TODO: PARAMETER, FORMAT, ENTRY
+            self.parse_implicit_stmt(line)
+        elif kind in declaration_kinds:
+            return self.parse_declaration_construct(lines, line)
+        else:
+            self.state = _EXECUTION_START
 
     def parse_use_stmt(self, line):
         """Parse the use statement (R1109) within a specification (R204)."""
-        if self.verbose:
-            print('U: {}'.format(' '.join(line)))
+        tokens = line[1:]
+
+        nature = None
+        if tokens[0] == ',':
+            nature = tokens[1]
+            tokens = tokens[2:]
+        if tokens[0] == '::':
+            tokens = tokens[1:]
+
+        module = intern(tokens[0])
+        tokens = tokens[1:]
+        if tokens and tokens[0] == ',':
+            tokens = tokens[1:]
+
+        only = tokens[:2] == ['only', ':']
+        if only:
+            tokens = tokens[2:]
+
+        # Split the names at the commas outside of parentheses (as in
+        # `operator(.op.)`)
+        items = [[]]
+        depth = 0
+        for tok in tokens:
+            if tok == ',' and depth == 0:
+                items.append([])
+                continue
+            elif tok == '(':
+                depth += 1
+            elif tok == ')':
+                depth -= 1
+            items[-1].append(tok)
+
+        names = []
+        for item in items:
+            if '=>' in item:
+                idx = item.index('=>')
+                names.append((''.join(item[:idx]), ''.join(item[idx + 1:])))
+            elif item:
+                name = ''.join(item)
+                names.append((name, name))
+
+        self.uses.append(Use(module, nature, only, tuple(names)))
+
+        if self.events:
+            self.events.emit(SPECIFICATION, line, 'U')
 
     def parse_import_stmt(self, line):
-        if self.verbose:
-            print('i: {}'.format(' '.join(line)))
+        if self.events:
+            self.events.emit(SPECIFICATION, line, 'i')
 
     def parse_implicit_stmt(self, line):
-        if self.verbose:
-            print('I: {}'.format(' '.join(line)))
+        if self.events:
+            self.events.emit(SPECIFICATION, line, 'I')
 
     def parse_declaration_construct(self, lines, line):
 
-        if (line[0] in ('enum', 'interface')
+        if (line[0] in ('enum', 'interface', 'abstract')
                 or (line[0] == 'type' and line[1] != '(')):
-            block = Unit(verbose=self.verbose)
-            block.parse(lines)
-
-            # TODO: parse name
-            block.name = ' '.join(line)
-            self.blocks.append(block)
+            # The block is parsed as a nested unit
+            return Unit(events=self.events, mode=self.mode)
 
         elif line[0] in Unit.access_specs:
-            if self.verbose:
-                print('d: {}'.format(' '.join(line)))
+            if self.events:
+                self.events.emit(DECLARATION, line, 'd')
 
         # R357 (placeholder)
         elif line[0] == 'data':
-            if self.verbose:
-                print('d: {}'.format(' '.join(line)))
+            if self.events:
+                self.events.emit(DECLARATION, line, 'd')
 
         # R551 (placeholder)
         elif line[0] == 'parameter':
-            if self.verbose:
-                print('p: {}'.format(' '.join(line)))
+            if self.events:
+                self.events.emit(DECLARATION, line, 'p')
 
         else:
             tokens = iter(line)
@@ -259,8 +332,8 @@ class Unit(object):
                 return
             else:
                 # Unhandled
-                if self.verbose:
-                    print('X: {}'.format(' '.join(line)))
+                if self.events:
+                    self.events.emit(UNRESOLVED, line, 'X')
                 return
 
             # Character length parsing
@@ -276,9 +349,11 @@ class Unit(object):
                 tok = next(tokens)
 
             # Attributes
+            attrs = []
             while tok == ',':
                 tok = next(tokens)
                 attr = tok
+                attrs.append(intern(attr))
                 if attr in ('dimension', 'intent'):
                     tok = next(tokens)
                     assert tok == '('
@@ -308,8 +383,12 @@ class Unit(object):
                         self.report.error_endcomma()
                     vnames.append(tok)
 
+            # The attribute names are shared by each variable
+            attributes = tuple(attrs)
+            line_number = lines.line_numbers[0] if lines.line_numbers else None
+
             for vname in vnames:
-                var = Variable(vname, vtype)
+                var = Variable(vname, vtype, attributes, line_number)
 
                 # TODO: Move all this docstring stuff to a support function
                 if lines.docstrings:
@@ -321,16 +400,16 @@ class Unit(object):
                     doc = ''
 
                 if lines.prior_var:
-                    lines.prior_var.doc.docstring += '\n'.join(prior_docs)
+                    lines.prior_var.add_docstring('\n'.join(prior_docs))
 
-                var.doc.docstring = doc
+                var.add_docstring(doc)
                 lines.docstrings = []
                 lines.prior_var = var
 
                 self.variables.append(var)
 
-            if self.verbose:
-                print('D: {}'.format(' '.join(line)))
+            if self.events:
+                self.events.emit(DECLARATION, line, 'D')
 
     def parse_namelist(self, line):
         assert(line[0] == 'namelist')
@@ -353,69 +432,66 @@ class Unit(object):
                 if tok == ',':
                     tok = next(tokens)
 
-        if self.verbose:
-            print('N: {}'.format(' '.join(line)))
+        if self.events:
+            self.events.emit(DECLARATION, line, 'N')
 
     # Execution
 
-    def parse_execution(self, lines):
-        # First parse the line which terminated specification
-        # TODO: How to merge with iteration below?
-
-        line = lines.current_line
+    def parse_execution(self, line, kind):
+        """Parse a statement of the execution part of a program unit."""
+        if self.state == _EXECUTION_START:
+            self.state = _EXECUTION
 
-        # Exit for interfaces
-        if self.utype == 'interface':
-            return
+            # Exit for interfaces
+            if self.utype == 'interface':
+                self.state = _SUBPROGRAM_START
+                return
 
-        if Construct.statement(line):
-            cons = Construct(verbose=self.verbose)
-            cons.parse(lines)
-        elif self.end_statement(line) or line[0] == 'contains':
-            return
+        if kind == END and self.end_statement(line) or kind == CONTAINS:
+            self.state = _SUBPROGRAM_START
+        elif self.mode == 'skeleton':
+            self.state = _SKIP_EXECUTION
+        # Execution constructs
+        elif kind in construct_kinds:
+            return Construct(events=self.events)
         else:
             # Unhandled
-            if self.verbose:
-                print('E: {}'.format(' '.join(line)))
-
-        # Now iterate over the rest of the lines
-        for line in lines:
-            # Execution constructs
-            if Construct.statement(line):
-                cons = Construct(verbose=self.verbose)
-                cons.parse(lines)
-            elif self.end_statement(line) or line[0] == 'contains':
-                # TODO: Use return?
-                break
-            else:
-                # Unhandled
-                if self.verbose:
-                    print('E: {}'.format(' '.join(line)))
+            if self.events:
+                self.events.emit(STATEMENT, line, 'E')
+
+    def skip_execution(self, lines):
+        """Skip to the END or CONTAINS statement of the execution part.
 
-    def parse_subprogram(self, lines):
+        Only the first token of each statement is checked, and the lines are
+        marked as skipped so that other statements need not be tokenized.
+        Returns False if the lines are exhausted first.
+        """
+        lines.skipping = True
+        try:
+            for line in lines:
+                word = line[0]
+                if word == 'contains' or (word.startswith('end')
+                                          and self.end_statement(line)):
+                    self.state = _SUBPROGRAM_START
+                    return True
+            return False
+        finally:
+            lines.skipping = False
+
+    def parse_subprogram(self, line, kind):
+        """Parse a statement of the subprogram part of a program unit."""
         # TODO: I think the first line of subprogram is always CONTAINS, so
         # this check may be pointless. (No, not for interfaces)
+        start = self.state == _SUBPROGRAM_START
+        self.state = _SUBPROGRAM
 
-        line = lines.current_line
-
-        if Unit.statement(line):
-            subprog = Unit(verbose=self.verbose)
-            subprog.parse(lines)
-            self.subprograms.append(subprog)
-        elif self.end_statement(line):
-            return
+        if kind in unit_kinds:
+            return Unit(events=self.events, mode=self.mode)
+        elif kind == END and self.end_statement(line):
+            self.state = _END
         else:
-            if self.verbose:
-                print('{}: {}'.format(self.utype[0].upper(), ' '.join(line)))
-
-        for line in lines:
-            if Unit.statement(line):
-                subprog = Unit(verbose=self.verbose)
-                subprog.parse(lines)
-                self.subprograms.append(subprog)
-            elif self.end_statement(line):
-                # TODO: Use return?
-                break
-            else:
-                if self.verbose:
-                    print('X: {}'.format(' '.join(line)))
+            if self.events:
+                if start:
+                    self.events.emit(STATEMENT, line, self.utype[0].upper())
+                else:
+                    self.events.emit(UNRESOLVED, line, 'X')
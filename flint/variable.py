@@ -1,8 +1,16 @@
-from flint.document import Document
+# Use the interned string table
+try:
+    from sys import intern      # Python 3
+except ImportError:
+    pass                        # Python 2
+
+from flint.document import Document, empty_document
 
 
 class Variable(object):
 
+    __slots__ = ('name', 'type', 'attributes', 'line', 'refs', '_doc')
+
     intrinsic_types = [
         'integer',      # R405
         'real',         # R404
@@ -12,10 +20,41 @@ class Variable(object):
         'logical',      # R404
     ]
 
-    def __init__(self, name, vtype):
-        self.name = name
-        self.type = vtype
-        self.attributes = []
+    def __init__(self, name, vtype, attributes=(), line=None):
+        # Names are interned, since most are repeated across a project
+        self.name = intern(name)
+        self.type = intern(vtype)
+
+        # Attribute names, which may be shared by the variables of a
+        # declaration
+        self.attributes = attributes
+
+        # Line number of the declaration, if known
+        self.line = line
         self.refs = 0
 
-        self.doc = Document()
+        # Variables without documentation share an empty document
+        self._doc = None
+
+    @property
+    def doc(self):
+        return empty_document if self._doc is None else self._doc
+
+    @doc.setter
+    def doc(self, doc):
+        self._doc = doc
+
+    @property
+    def docstring(self):
+        return self.doc.docstring
+
+    @property
+    def footer(self):
+        return self.doc.footer
+
+    def add_docstring(self, text):
+        """Append to the docstring, creating the document if needed."""
+        if text:
+            if self._doc is None:
+                self._doc = Document()
+            self._doc.docstring += text
@@ -0,0 +1,87 @@
+"""Watch the files of a project, and update it as they change."""
+import os
+import time
+
+
+class FileScanner(object):
+    """Detect changed files by polling their modification time and size."""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.files = self.scan()
+
+    def scan(self):
+        """Return the (modification time, size) of each file."""
+        files = {}
+        for path in self.paths:
+            for root, dirs, fnames in os.walk(path):
+                for fname in fnames:
+                    fpath = os.path.join(root, fname)
+                    try:
+                        stat = os.stat(fpath)
+                    except OSError:
+                        # Removed during the scan
+                        continue
+                    files[fpath] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def changes(self):
+        """Return the files added, modified or removed since the last scan."""
+        files = self.scan()
+        changed = [path for path, state in files.items()
+                   if self.files.get(path) != state]
+        changed.extend(path for path in self.files if path not in files)
+        self.files = files
+        return sorted(changed)
+
+
+class Watcher(object):
+    """Update a parsed project whenever its files change.
+
+    The directories of the project (and its include paths) are scanned every
+    `interval` seconds.  After each update, `callback(project, sources,
+    elapsed)` is called with the updated sources and the time of the update,
+    in seconds; by default, the diagnostics of the sources are printed.
+    """
+
+    def __init__(self, project, interval=0.2, callback=None):
+        self.project = project
+        self.interval = interval
+        self.callback = callback or print_update
+        self.scanner = FileScanner(project.roots + project.include_paths)
+
+    def poll(self):
+        """Update the project with any changed files, and return the updated
+        sources."""
+        changes = self.scanner.changes()
+        if not changes:
+            return []
+
+        start = time.perf_counter()
+        sources = self.project.update(changes)
+        self.callback(self.project, sources, time.perf_counter() - start)
+        return sources
+
+    def run(self):
+        """Poll for changes until interrupted."""
+        try:
+            while True:
+                self.poll()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+
+def print_update(project, sources, elapsed):
+    """Print the diagnostics of the updated sources (and their includes)."""
+    for src in sources:
+        for path in [src.path] + list(src.inc_reports):
+            for diag in project.diagnostics.select(path=path):
+                print('{}:{}:{}: {} {}'.format(diag.path, diag.line,
+                                               diag.column, diag.code,
+                                               diag.text).rstrip())
+        if src.failure:
+            print('{}: failed: {}'.format(src.path,
+                                          src.failure.splitlines()[-1]))
+    print('flint: updated {} files in {:.0f} ms'
+          ''.format(len(sources), 1e3 * elapsed))
@@ -0,0 +1,150 @@
+import io
+import json
+import pickle
+import sys
+import unittest
+
+sys.path.insert(1, '../')
+from flint.diagnostics import Diagnostics, JSONLWriter, SARIFWriter
+from flint.report import CaseCounts, Report
+from flint.tokenizer import Tokenizer
+
+
+def diagnostics():
+    diags = Diagnostics()
+    diags.add('C0102', 'a.f90', 3, 10)
+    diags.add('C0103', 'a.f90', 4, 2, 'x  =')
+    diags.add('C0102', 'b.f90', 1, 5)
+    diags.add('C0104', 'b.f90', text='END end')
+    return diags
+
+
+class Test(unittest.TestCase):
+
+    def test_store(self):
+        diags = diagnostics()
+        self.assertEqual(len(diags), 4)
+        self.assertEqual(list(diags)[1],
+                         ('C0103', 'a.f90', 4, 2, 'x  ='))
+
+        self.assertEqual(diags.count_by_code(),
+                         {'C0102': 2, 'C0103': 1, 'C0104': 1})
+        self.assertEqual(diags.count_by_file(), {'a.f90': 2, 'b.f90': 2})
+        self.assertEqual([d.line for d in diags.select(code='C0102')],
+                         [3, 1])
+        self.assertEqual(list(diags.select(code='C0102', path='c.f90')), [])
+
+        # Codes and paths are stored once
+        self.assertEqual(len(diags.path_table), 2)
+        self.assertEqual(diags.files.tolist(), [0, 0, 1, 1])
+
+        merged = Diagnostics()
+        merged.add('E0101', 'b.f90', 7)
+        merged.extend(diags)
+        self.assertEqual(list(merged)[1:], list(diags))
+        self.assertEqual(merged.count_by_file(), {'a.f90': 2, 'b.f90': 3})
+        self.assertEqual([d.line for d in merged.select(path='b.f90')],
+                         [7, 1, 0])
+        self.assertEqual(list(merged.select(code='C0102', path='a.f90')),
+                         [('C0102', 'a.f90', 3, 10, '')])
+
+        copy = pickle.loads(pickle.dumps(merged))
+        self.assertEqual(list(copy), list(merged))
+        copy.add('C0101', 'a.f90', 1)
+        self.assertEqual(copy.files[-1], 1)
+        self.assertEqual([d.code for d in copy.select(path='a.f90')],
+                         ['C0102', 'C0103', 'C0101'])
+
+    def test_report(self):
+        report = Report('a.f90')
+        tokenizer = Tokenizer()
+        line = 'x  = 1 \n'
+        tokens = tokenizer.spans(line, 2)
+        report.check_trailing_whitespace(tokens, 2)
+        report.check_token_spacing(tokens, 2)
+        for line_number, line in enumerate(['END\n', 'x = end\n', 'end\n'],
+                                           3):
+            report.track_case(tokenizer.spans(line, line_number), line_number)
+        report.check_keyword_case()
+
+        self.assertEqual(
+            list(report.diagnostics),
+            [('C0102', 'a.f90', 2, 7, ''),
+             ('C0103', 'a.f90', 2, 2, 'x  ='),
+             ('C0104', 'a.f90', 3, 1, 'END end')])
+
+        # The previous per-code formats
+        self.assertEqual(dict(report.errors), {
+            'C0102': [2],
+            'C0103': [(2, 'x  =')],
+            'C0104': [{'end', 'END'}],
+        })
+
+        # The formats are a view of the diagnostics
+        with self.assertRaises(TypeError):
+            report.errors['C0101'] = [1]
+        self.assertEqual(report.errors['C0101'], [])
+
+    def test_case_counts(self):
+        cases = CaseCounts()
+        for n in range(2 * cases.max_spellings):
+            spelling = ''.join(c.upper() if n >> i & 1 else c
+                               for i, c in enumerate('then'))
+            cases.add('then', spelling, 'a.f90', n + 1, 1)
+        for line in (97, 98, 99):
+            cases.add('then', 'then', 'a.f90', line, 1)
+        cases.add('end', 'end', 'a.f90', 5, 1)
+        cases.add('end', 'end', 'a.f90', 6, 1)
+
+        # Spellings beyond the limit are dropped, rather than stored
+        self.assertEqual(len(cases.words['then']), cases.max_spellings)
+
+        other = CaseCounts()
+        other.add('then', 'THEN', 'b.f90', 1, 1)
+        other.add('then', 'Then', 'b.f90', 2, 1)
+        other.add('then', 'Then', 'b.f90', 3, 1)
+        other.add('end', 'END', 'b.f90', 4, 1)
+        cases.update(other)
+
+        minority = cases.minority()
+        self.assertEqual(minority[0], ('then', 'Then', 3, 'then',
+                                       'a.f90', 2, 1))
+        self.assertEqual([(s.word, s.spelling, s.count) for s in minority[1:]],
+                         [('end', 'END', 1)] + [
+                             ('then', s, 1) for s in
+                             sorted(cases.words['then'])
+                             if s not in ('then', 'Then')])
+
+    def test_writers(self):
+        jsonl = io.StringIO()
+        sarif = io.StringIO()
+        writers = [JSONLWriter(jsonl), SARIFWriter(sarif)]
+        for diag in diagnostics():
+            for writer in writers:
+                writer.write(diag)
+        for writer in writers:
+            writer.close()
+
+        records = [json.loads(line) for line in jsonl.getvalue().splitlines()]
+        self.assertEqual(records[1], {'code': 'C0103', 'path': 'a.f90',
+                                      'line': 4, 'column': 2, 'text': 'x  ='})
+
+        log = json.loads(sarif.getvalue())
+        results = log['runs'][0]['results']
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['ruleId'], 'C0102')
+        location = results[0]['locations'][0]['physicalLocation']
+        self.assertEqual(location['region'],
+                         {'startLine': 3, 'startColumn': 10})
+        self.assertNotIn('region',
+                         results[3]['locations'][0]['physicalLocation'])
+
+        # An empty log is still valid
+        sarif = io.StringIO()
+        SARIFWriter(sarif).close()
+        self.assertEqual(json.loads(sarif.getvalue())['runs'][0]['results'],
+                         [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import sys
+import unittest
+
+sys.path.insert(1, '../')
+from flint.fortlines import FortLines
+from flint.tokens import TokenList
+
+
+def continued_lines(n):
+    """Return a statement with `n` continuation lines, ending in a string."""
+    lines = [TokenList(['data', 'x', '/', '&'], 1)]
+    for i in range(n):
+        lines.append(TokenList(['&', str(i), ',', '&'], 2 + i))
+    lines.append(TokenList(['"a ', '&'], n + 2))
+    for i in range(n):
+        lines.append(TokenList(['&', 'b ', '&'], n + 3 + i))
+    lines.append(TokenList(['&', 'c"', '/'], 2 * n + 3))
+    return lines
+
+
+class Test(unittest.TestCase):
+
+    def test_continuation(self):
+        lines = continued_lines(2)
+        flines = FortLines(lines + [TokenList(['end'], 8)])
+
+        line = next(flines)
+        self.assertEqual(line, ['data', 'x', '/', '0', ',', '1', ',',
+                                '"a b b c"', '/'])
+        self.assertEqual(flines.line_numbers, [1, 1, 1, 2, 2, 3, 3, 4, 7])
+
+        self.assertEqual(next(flines), ['end'])
+        self.assertEqual(flines.line_numbers, [8])
+
+    def test_semicolon(self):
+        flines = FortLines([TokenList(['a', ';', 'b', '&'], 5),
+                            TokenList(['c'], 6)])
+        self.assertEqual(next(flines), ['a'])
+        self.assertEqual(flines.line_numbers, [5])
+        self.assertEqual(next(flines), ['b', 'c'])
+        self.assertEqual(flines.line_numbers, [5, 6])
+
+    def test_scaling(self):
+        # Continuation lines are appended to the first line in place, and
+        # continued strings are joined once, so that each token is copied
+        # once (rather than once per line, as in the previous quadratic join)
+        concatenated = []
+
+        class Part(str):
+            def __add__(self, other):
+                concatenated.append(self)
+                return str.__add__(self, other)
+
+        for n in (10, 100, 10000):
+            lines = continued_lines(n)
+            for tokens in lines:
+                tokens[:] = [Part(tok) for tok in tokens]
+
+            line = next(FortLines(lines))
+            self.assertIs(line, lines[0])
+            self.assertEqual(len(line), 2 * n + 5)
+            self.assertEqual(line[2 * n + 3], '"a ' + 'b ' * n + 'c"')
+            self.assertEqual(concatenated, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
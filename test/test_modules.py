@@ -0,0 +1,85 @@
+import sys
+import unittest
+
+sys.path.insert(1, '../')
+from flint.fortlines import FortLines
+from flint.modules import ModuleGraph
+from flint.units import get_program_unit_type
+
+
+class Source(object):
+    """A parsed source of a list of statements."""
+
+    def __init__(self, path, lines):
+        self.path = path
+        self.units = []
+        flines = FortLines([line.split() for line in lines])
+        for line in flines:
+            unit = get_program_unit_type(line)()
+            unit.parse(flines)
+            self.units.append(unit)
+
+
+def module(name, *uses):
+    return (['module {}'.format(name)]
+            + ['use {}'.format(use) for use in uses]
+            + ['end module {}'.format(name)])
+
+
+class Test(unittest.TestCase):
+
+    def graph(self):
+        return ModuleGraph([
+            Source('a.f90', module('a', 'mpi')),
+            Source('b.f90', module('b', 'a , only : x')
+                   + ['module c', 'contains', 'subroutine f', 'use b',
+                      'end subroutine f', 'end module c']),
+            Source('d.f90', module('d', 'a', 'c')),
+            Source('p.f90', ['program p', 'use d', 'end program p']),
+            Source('e.f90', module('e')),
+        ])
+
+    def test_graph(self):
+        graph = self.graph()
+
+        self.assertEqual(graph.paths['c'], 'b.f90')
+        self.assertEqual(graph.uses['c'], {'b'})
+        self.assertEqual(graph.external, {'mpi'})
+        self.assertEqual(graph.order(), ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(graph.cycles(), [])
+
+        self.assertEqual(graph.dependencies('d'), {'a', 'b', 'c', 'mpi'})
+        self.assertEqual(graph.dependencies('d', transitive=False),
+                         {'a', 'c'})
+        self.assertEqual(graph.dependents('b'), {'c', 'd'})
+        self.assertEqual(graph.dependents('mpi', transitive=False), {'a'})
+
+        # Sources to check again if the modules of b.f90 change
+        self.assertEqual(graph.affected_files(['b.f90']),
+                         {'b.f90', 'd.f90', 'p.f90'})
+        self.assertEqual(graph.affected_files(['e.f90']), {'e.f90'})
+
+    def test_cycles(self):
+        graph = self.graph()
+        graph.add_source(Source('x.f90', module('x', 'y', 'a')
+                                + module('y', 'z') + module('z', 'x')
+                                + module('s', 's')))
+
+        self.assertEqual(graph.cycles(), [['s'], ['x', 'y', 'z']])
+        with self.assertRaises(ValueError) as ctx:
+            graph.order()
+        self.assertIn('x -> y -> z -> x', str(ctx.exception))
+
+        # Deep chains are not limited by the recursion limit
+        depth = 2 * sys.getrecursionlimit()
+        lines = []
+        for i in range(depth):
+            lines += module('m{}'.format(i), 'm{}'.format(i + 1))
+        lines += module('m{}'.format(depth), 'm0')
+        graph = ModuleGraph([Source('m.f90', lines)])
+        cycle, = graph.cycles()
+        self.assertEqual(len(cycle), depth + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import pickle
+import sys
+import unittest
+
+sys.path.insert(1, '../')
+from flint.document import empty_document
+from flint.fortlines import FortLines
+from flint.units import get_program_unit_type
+
+
+def parse(lines):
+    """Parse the program units of a list of statements."""
+    flines = FortLines([line.split() for line in lines])
+    units = []
+    for line in flines:
+        unit = get_program_unit_type(line)()
+        unit.parse(flines)
+        units.append(unit)
+    return units
+
+
+def nested_do(depth):
+    """Return a subroutine with `depth` nested DO constructs."""
+    return (['subroutine f ( n )', 'integer :: i , n']
+            + ['do i = 1 , n'] * depth
+            + ['i = i + 1']
+            + ['end do'] * depth
+            + ['end subroutine f'])
+
+
+class Test(unittest.TestCase):
+
+    def test_tree(self):
+        units = parse([
+            'module m',
+            'implicit none',
+            'type , public :: t',
+            'integer :: k',
+            'end type t',
+            'real :: x , y',
+            'contains',
+            'subroutine f ( a )',
+            'real :: a',
+            'do i = 1 , 2',
+            'if ( a > 0 ) then',
+            'a = 0',
+            'end if',
+            'end do',
+            'end subroutine f',
+            'function g ( a ) result ( r )',
+            'real :: a , r',
+            'r = a',
+            'end function g',
+            'end module m',
+            'program p',
+            'use m',
+            'call f ( 1. )',
+            'end program p',
+        ])
+
+        self.assertEqual([u.name for u in units], ['m', 'p'])
+        mod, prog = units
+
+        self.assertEqual([b.name for b in mod.blocks],
+                         ['type , public :: t'])
+        self.assertEqual([v.name for v in mod.blocks[0].variables], ['k'])
+        self.assertEqual([v.name for v in mod.variables], ['x', 'y'])
+
+        self.assertEqual([s.name for s in mod.subprograms], ['f', 'g'])
+        self.assertEqual([v.name for v in mod.subprograms[1].variables],
+                         ['a', 'r'])
+        self.assertEqual(prog.subprograms, [])
+
+    def test_paired_constructs(self):
+        # SELECT and CHANGE TEAM constructs end with END SELECT and END TEAM
+        mod, = parse([
+            'module m',
+            'contains',
+            'subroutine f ( n )',
+            'select case ( n )',
+            'case ( 1 )',
+            'n = 0',
+            'end select',
+            'change team ( t )',
+            'select type ( p => n )',
+            'end select',
+            'end team',
+            'change team ( t )',
+            'endteam',
+            'end subroutine f',
+            'subroutine g',
+            'end subroutine g',
+            'end module m',
+        ])
+        self.assertEqual([s.name for s in mod.subprograms], ['f', 'g'])
+
+    def test_depth(self):
+        # Nesting well beyond the recursion limit
+        depth = 2 * sys.getrecursionlimit()
+        unit, = parse(nested_do(depth))
+        self.assertEqual(unit.name, 'f')
+        self.assertEqual([v.name for v in unit.variables], ['i', 'n'])
+
+    def test_unterminated(self):
+        # Units and constructs left open at the end of the input are closed
+        units = parse(['module m', 'contains', 'subroutine f', 'do i = 1 , 2'])
+        self.assertEqual([u.name for u in units], ['m'])
+        self.assertEqual([s.name for s in units[0].subprograms], ['f'])
+
+    def test_use(self):
+        mod, = parse([
+            'module m',
+            'use a',
+            'use , intrinsic :: iso_c_binding , only : c_int , c_ptr',
+            'use :: b , x => y',
+            'use c , only : p , q => r , operator ( .add. ) , '
+            'assignment ( = ) , operator ( .eq. ) => operator ( .same. )',
+            'use d , only :',
+            'contains',
+            'subroutine f',
+            'use e',
+            'end subroutine f',
+            'end module m',
+        ])
+        self.assertEqual(mod.uses, [
+            ('a', None, False, ()),
+            ('iso_c_binding', 'intrinsic', True,
+             (('c_int', 'c_int'), ('c_ptr', 'c_ptr'))),
+            ('b', None, False, (('x', 'y'),)),
+            ('c', None, True,
+             (('p', 'p'), ('q', 'r'), ('operator(.add.)', 'operator(.add.)'),
+              ('assignment(=)', 'assignment(=)'),
+              ('operator(.eq.)', 'operator(.same.)'))),
+            ('d', None, True, ()),
+        ])
+        self.assertEqual(mod.subprograms[0].uses, [('e', None, False, ())])
+
+    def test_compact(self):
+        mod, = parse([
+            'module m',
+            'real , allocatable , dimension ( : ) :: x , y !<X',
+            'real , allocatable :: z',
+            'end module m',
+        ])
+        x, y, z = mod.variables
+
+        # Undocumented variables share an empty, read-only document
+        self.assertEqual(x.doc.docstring, '!<X')
+        self.assertIs(y.doc, empty_document)
+        with self.assertRaises(AttributeError):
+            y.doc.docstring = 'y'
+
+        # Attributes are shared by each variable of a declaration, and
+        # names are interned
+        self.assertEqual(x.attributes, ('allocatable', 'dimension'))
+        self.assertIs(x.attributes, y.attributes)
+        self.assertIs(x.attributes[0], z.attributes[0])
+        self.assertIs(x.type, z.type)
+
+        for obj in (mod, x, mod.doc):
+            self.assertFalse(hasattr(obj, '__dict__'))
+
+        mod = pickle.loads(pickle.dumps(mod, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(mod.variables[0].doc.docstring, '!<X')
+        self.assertIs(mod.variables[1].doc, empty_document)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(1, '../')
+from flint.preprocessor import MacroTable, evaluate
+from flint.source import Source
+from flint.tokenizer import ScanTokenizer
+
+
+conditional_src = (
+    'module m\n'
+    '#define A 2\n'
+    '#ifdef A\n'
+    '  integer :: a\n'
+    '#  ifndef B\n'
+    '  integer :: not_b\n'
+    '#  else\n'
+    '  integer :: b\n'
+    '#  endif\n'
+    '#else\n'
+    '  integer :: no_a\n'
+    '#  ifdef B\n'
+    '  integer :: no_a_b\n'
+    '#  endif\n'
+    '#endif\n'
+    '#if A > 2\n'
+    '  integer :: c\n'
+    '#elif A == 2 && !defined(B)\n'
+    '  integer :: d\n'
+    '#elif 1\n'
+    '  integer :: e\n'
+    '#else\n'
+    '  integer :: f\n'
+    '#endif\n'
+    '#if 0\n'
+    '#define A 3\n'
+    '#include "missing.h"\n'
+    '#endif\n'
+    '#if A == 2 /* still 2 */\n'
+    '  integer :: g\n'
+    '#endif\n'
+    'end module m\n'
+)
+
+
+class Test(unittest.TestCase):
+
+    def test_evaluate(self):
+        defines = {'A': '2', 'B': None, 'C': 'A + 1', 'R': 'R'}
+        cases = [
+            ('1', 1),
+            ('0x10 + 010', 24),
+            ('A * C', 6),
+            ('B', 0),
+            ('UNDEFINED', 0),
+            ('R', 0),
+            ('defined(B) && defined A', 1),
+            ('!defined(D)', 1),
+            ('-7 / 2', -3),
+            ('-7 % 2', -1),
+            ('1 << 4 | 1', 17),
+            ('A == 2 ? 10 : 20', 10),
+            ('(A > 1) + (A < 1) + (A >= 2) + (A <= 1) + (A != 2)', 2),
+            ('2L // comment', 2),
+            # Unused operands are not evaluated
+            ('0 && 1 / 0', 0),
+            ('1 || 1 / 0', 1),
+            ('1 ? 2 : 1 / 0', 2),
+            ('0 ? 1 / 0 : 3', 3),
+            ('0 && (1 / 0 || 1 % 0) || A', 1),
+            ('1 ? 0 ? 1 / 0 : 4 : 1 / 0', 4),
+        ]
+        for expr, value in cases:
+            self.assertEqual(evaluate(expr, defines), value, expr)
+
+        for expr in ('', '1 +', '(1', '1 / 0', '"a"', '1 2', '0 && (1',
+                     '1 || )', '1 ? 2 : 3 4'):
+            with self.assertRaises(ValueError):
+                evaluate(expr, defines)
+
+    def test_macros(self):
+        macros = MacroTable()
+        macros.parse_define(' N 10')
+        macros.parse_define(' EMPTY')
+        macros.parse_define(' MAX(a, b) merge(a, b, a > b)')
+        macros.parse_define(' TWICE(x) MAX(x, N)')
+        macros.parse_define(' LOOP1 LOOP2 + 1')
+        macros.parse_define(' LOOP2 LOOP1')
+        macros.parse_define(' NOARGS() 0')
+        macros.parse_define(' SPACED (x) x')
+
+        self.assertEqual(macros['MAX'].params, ('a', 'b'))
+        self.assertEqual(macros['EMPTY'].text, None)
+        self.assertEqual(macros['SPACED'].params, None)
+
+        tokenizer = ScanTokenizer()
+        cases = [
+            ('x = N + EMPTY 1', 'x = 10 +  1'),
+            ('y = MAX(f(i, j), N)', 'y = merge(f(i, j), 10, f(i, j) > 10)'),
+            ('y = TWICE( (1, 2) )', 'y = merge((1, 2), 10, (1, 2) > 10)'),
+            ('z = MAX', 'z = MAX'),
+            ('z = MAX(1)', 'z = MAX(1)'),
+            ('z = MAX(1, 2', 'z = MAX(1, 2'),
+            ('z = LOOP1', 'z = LOOP1 + 1'),
+            ('z = NOARGS()', 'z = 0'),
+            ('s = "N"', 's = "N"'),
+        ]
+        for line, result in cases:
+            tokens = tokenizer.spans(line + '\n')
+            items = list(zip(tokens.kinds, tokens.texts()))
+            expanded = ''.join(tok for kind, tok in macros.expand(items))
+            self.assertEqual(expanded, result, line)
+
+        self.assertEqual(macros.counts['N'], 3)
+        self.assertEqual(macros.counts['MAX'], 2)
+        self.assertEqual(macros.counts['LOOP1'], 1)
+        self.assertEqual(macros.counts['LOOP2'], 1)
+
+    def test_conditionals(self):
+        path = tempfile.mkdtemp()
+        try:
+            fpath = os.path.join(path, 'm.F90')
+            with open(fpath, 'w') as f:
+                f.write(conditional_src)
+
+            src = Source()
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                src.parse(fpath)
+        finally:
+            shutil.rmtree(path)
+
+        names = [v.name for v in src.units[0].variables]
+        self.assertEqual(names, ['a', 'not_b', 'd', 'g'])
+        # Skipped lines include the directives which start inactive blocks
+        self.assertEqual(src.inactive_lines, 16)
+        self.assertEqual(src.defines['A'].text, '2')
+        self.assertEqual(src.includes, [])
+        self.assertEqual(src.conditions, [])
+        self.assertNotIn('warning', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
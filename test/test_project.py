@@ -0,0 +1,640 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(1, '../')
+from flint.cache import ParseCache
+from flint.diagnostics import JSONLWriter
+from flint.events import CountingSink, EventLog, FileSink, PrintSink
+from flint.events import format_event
+from flint.export import SQLiteExporter
+from flint.project import Project
+from flint.source import Source
+from flint.symbols import Symbol, SymbolIndex
+from flint.tokenindex import TokenMatch
+from flint.watch import Watcher
+
+
+sources = {
+    'a.f90': (
+        'module a_mod\n'
+        '  implicit none\n'
+        '  integer :: n  !< Count\n'
+        'contains\n'
+        'subroutine f(x)\n'
+        '  real, intent(in) :: x \n'
+        'end subroutine f\n'
+        'end module a_mod\n'
+    ),
+    'sub/b.F90': (
+        'module b_mod\n'
+        '#define NY 2\n'
+        '#include "b.h"\n'
+        '  real :: y(NY)\n'
+        'end module b_mod\n'
+    ),
+    'sub/b.h': (
+        '  integer :: h \n'
+    ),
+    'sub/bad.f90': (
+        'module bad_mod\n'
+        '  x = \x01\n'
+        'end module bad_mod\n'
+    ),
+}
+
+# Executable statements which the skeleton parse must not mistake for the
+# end of a unit
+skeleton_source = (
+    '#define ENDSUB end subroutine g\n'
+    '#define TWO 2\n'
+    'module c_mod\n'
+    '  real :: x  !< X\n'
+    'contains\n'
+    '!> Doc for f\n'
+    'subroutine f(a)\n'
+    '  real :: a\n'
+    '  do i = 1, TWO\n'
+    '    a = a + 1; end do\n'
+    '  if (a > 0) then\n'
+    '    end_x = 1\n'
+    '  endif\n'
+    '  x = a + &\n'
+    '      end\n'
+    '  x = a + & ! sum\n'
+    '      end\n'
+    "  call log('end subroutine f;' // &\n"
+    '    "end")\n'
+    '  a = 1  !< A docstring in the body\n'
+    'end subroutine f\n'
+    'subroutine g\n'
+    '  integer :: k\n'
+    '  k = 1\n'
+    '  k = 2; ENDSUB\n'
+    'subroutine h\n'
+    '  k = 1\n'
+    '  k = 2; end subroutine h\n'
+    'subroutine i\n'
+    'end subroutine i\n'
+    'end module c_mod\n'
+)
+
+
+def profile_a(path):
+    return path.endswith('a.f90')
+
+
+def tree(unit):
+    """Summarize a unit and its nested units."""
+    return (unit.name, unit.doc.docstring, unit.doc.footer,
+            [(v.name, v.doc.docstring) for v in unit.variables],
+            [tree(b) for b in unit.blocks],
+            [tree(s) for s in unit.subprograms])
+
+
+class Test(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        for fname, text in sources.items():
+            fpath = os.path.join(self.path, fname)
+            if not os.path.isdir(os.path.dirname(fpath)):
+                os.makedirs(os.path.dirname(fpath))
+            with open(fpath, 'w') as f:
+                f.write(text)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def parse(self, **kwargs):
+        proj = Project(**kwargs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.parse(self.path)
+        return proj
+
+    def summary(self, proj):
+        return [
+            (src.path,
+             [(u.name, [v.name for v in u.variables],
+               [s.name for s in u.subprograms]) for u in src.units],
+             dict(src.report.errors),
+             bool(src.failure))
+            for src in proj.files
+        ]
+
+    def test_failure(self):
+        proj = self.parse()
+        self.assertEqual(len(proj.files), 3)
+
+        failures = proj.failures()
+        self.assertEqual(len(failures), 1)
+        self.assertTrue(failures[0].path.endswith('bad.f90'))
+
+    def test_parallel(self):
+        serial = self.parse()
+        parallel = self.parse(jobs=2)
+
+        self.assertEqual(self.summary(serial), self.summary(parallel))
+        for src in parallel.files:
+            self.assertIs(src.project, parallel)
+
+    def test_token_cache(self):
+        uncached = self.parse()
+        cached = self.parse(token_cache=True)
+        self.assertEqual(self.summary(uncached), self.summary(cached))
+        self.assertGreater(cached.token_cache.misses, 0)
+
+        src = Source(project=cached)
+        with contextlib.redirect_stdout(io.StringIO()):
+            src.parse(os.path.join(self.path, 'a.f90'))
+        self.assertGreater(cached.token_cache.hits, 0)
+
+    def test_diagnostics(self):
+        results = []
+        for jobs in (1, 2):
+            proj = Project(jobs=jobs)
+            stream = io.StringIO()
+            proj.writers.append(JSONLWriter(stream))
+            with contextlib.redirect_stdout(io.StringIO()):
+                proj.parse(self.path)
+
+            # Trailing whitespace in a source and its include
+            paths = [os.path.join(self.path, fname)
+                     for fname in ('a.f90', os.path.join('sub', 'b.h'))]
+            self.assertEqual(proj.diagnostics.count_by_file(),
+                             {paths[0]: 1, paths[1]: 1})
+            self.assertEqual(proj.diagnostics.count_by_code(), {'C0102': 2})
+            self.assertEqual(len(stream.getvalue().splitlines()), 2)
+
+            results.append((list(proj.diagnostics), stream.getvalue()))
+
+        self.assertEqual(results[0], results[1])
+
+    def test_events(self):
+        logs = []
+        for jobs in (1, 2):
+            proj = Project(jobs=jobs)
+            log = EventLog()
+            counts = CountingSink()
+            proj.sinks.extend([log, counts])
+            with contextlib.redirect_stdout(io.StringIO()):
+                proj.parse(self.path)
+            logs.append(log.events)
+
+            # Three modules and a subroutine, and a declaration in each
+            self.assertEqual(counts.kinds['file'], 4)
+            self.assertEqual(counts.kinds['skip'], 1)
+            self.assertEqual(counts.kinds['unit_start'], 4)
+            self.assertEqual(counts.kinds['declaration'], 3)
+            self.assertEqual(counts.labels['S'], 2)
+
+        self.assertEqual(logs[0], logs[1])
+
+        # Sinks format the events as annotated lines
+        fpath = os.path.join(self.path, 'events.txt')
+        sink = FileSink(fpath, buffer_lines=4)
+        stream = io.StringIO()
+        for event in logs[0]:
+            sink.emit(event)
+            PrintSink(stream).emit(event)
+        sink.close()
+        with open(fpath) as f:
+            self.assertEqual(f.read(), stream.getvalue())
+
+        lines = stream.getvalue().splitlines()
+        self.assertIn('M: module a_mod', lines)
+        self.assertIn('D: real , intent ( in ) :: x', lines)
+        self.assertEqual(format_event(logs[0][-1]), lines[-1])
+
+        # Nothing is printed without a sink
+        src = Source()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            src.parse(os.path.join(self.path, 'a.f90'))
+        self.assertEqual(out.getvalue(), '')
+        self.assertIsNone(src.units[0].events)
+
+    def test_stats(self):
+        counts = []
+        for jobs in (1, 2):
+            proj = self.parse(jobs=jobs, stats=True, profile=profile_a)
+            stats = proj.stats
+            counts.append(stats.counts)
+
+            self.assertEqual(len(stats.files), 3)
+            self.assertEqual(stats.counts['units'], 4)
+            self.assertEqual(stats.counts['include_misses'], 1)
+            # The lines of each file and include, up to the failure of bad.f90
+            self.assertEqual(stats.counts['lines'], 16)
+            self.assertGreater(stats.counts['tokens'], stats.counts['lines'])
+            self.assertGreater(sum(stats.wall.values()), 0.)
+
+            slowest = stats.slowest(2)
+            self.assertEqual(len(slowest), 2)
+            self.assertGreaterEqual(slowest[0].wall_time, slowest[1].wall_time)
+            self.assertEqual(len(stats.table(2).splitlines()), 3)
+
+            # Only a.f90 is profiled
+            a_path = os.path.join(self.path, 'a.f90')
+            profile = stats.profile(a_path, stream=io.StringIO())
+            self.assertGreater(profile.total_calls, 0)
+            self.assertIsNone(stats.profile(os.path.join(self.path, 'sub',
+                                                         'b.F90')))
+
+        self.assertEqual(counts[0], counts[1])
+
+        # Updated files replace their stats, and removed files drop them
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.update([a_path])
+        self.assertEqual(len(stats.files), 3)
+        self.assertEqual(stats.counts, counts[0])
+
+        b_path = os.path.join(self.path, 'sub', 'b.F90')
+        os.remove(b_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.update([b_path])
+        self.assertEqual(len(stats.files), 2)
+        self.assertEqual(stats.counts['units'], 3)
+
+        # Without instrumentation
+        proj = self.parse()
+        self.assertIsNone(proj.stats)
+        self.assertIsNone(proj.files[0].stats)
+
+    def test_update(self):
+        proj = self.parse()
+        a_path = os.path.join(self.path, 'a.f90')
+        b_path = os.path.join(self.path, 'sub', 'b.F90')
+        h_path = os.path.join(self.path, 'sub', 'b.h')
+        paths = [src.path for src in proj.files]
+
+        def update(changes):
+            with contextlib.redirect_stdout(io.StringIO()):
+                return [src.path for src in proj.update(changes)]
+
+        # An included file is parsed with its includer
+        with open(h_path, 'w') as f:
+            f.write('  integer :: h\n')
+        self.assertEqual(update([h_path]), [b_path])
+        self.assertEqual([src.path for src in proj.files], paths)
+        self.assertEqual(proj.diagnostics.count_by_file(), {a_path: 1})
+
+        # Missing files are not indexed as includes
+        self.assertEqual(update([os.path.join(self.path, 'x.h')]), [])
+        self.assertNotIn('x.h', proj.include_index)
+
+        # Added and removed sources, and a newly resolved include
+        c_path = os.path.join(self.path, 'c.F90')
+        c_inc_path = os.path.join(self.path, 'c.h')
+        with open(c_path, 'w') as f:
+            f.write('module c_mod\n'
+                    '#include "c.h"\n'
+                    'end module c_mod\n')
+        os.remove(a_path)
+        self.assertEqual(update([a_path, c_path]), [c_path])
+        self.assertEqual([src.path for src in proj.files],
+                         paths[1:] + [c_path])
+        self.assertEqual(proj.files[-1].includes, [('c.h', None)])
+        self.assertEqual(len(proj.diagnostics), 0)
+
+        with open(c_inc_path, 'w') as f:
+            f.write('  real :: c \n')
+        self.assertEqual(update([c_inc_path]), [c_path])
+        self.assertEqual(proj.files[-1].includes, [('c.h', c_inc_path)])
+
+        # The merged keyword cases are those of the current files
+        def counts(proj):
+            return {word: {s: entry[0] for s, entry in spellings.items()}
+                    for word, spellings in proj.cases.words.items()}
+        self.assertEqual(counts(proj), counts(self.parse()))
+        self.assertEqual(proj.diagnostics.count_by_file(), {c_inc_path: 1})
+
+    def test_symbols(self):
+        proj = self.parse()
+        a_path = os.path.join(self.path, 'a.f90')
+        b_path = os.path.join(self.path, 'sub', 'b.F90')
+
+        self.assertEqual(proj.symbols.lookup('A_Mod::F::X'),
+                         [Symbol('x', 'a_mod::f::x', 'variable', a_path, 6)])
+        self.assertEqual(proj.symbols.lookup('f'),
+                         [Symbol('f', 'a_mod::f', 'subroutine', a_path, 5)])
+        self.assertEqual(proj.symbols.lookup('f', kind='variable'), [])
+        self.assertEqual(
+            [s.qualname
+             for s in proj.symbols.search('a_mod::', qualified=True)],
+            ['a_mod::f', 'a_mod::f::x', 'a_mod::n'])
+        self.assertEqual(
+            [s.qualname for s in proj.symbols.search(kind='module')],
+            ['a_mod', 'b_mod', 'bad_mod'])
+
+        # Re-parsed and removed files replace their symbols
+        with open(a_path, 'w') as f:
+            f.write('module a_mod\n'
+                    '  integer :: n2\n'
+                    'end module a_mod\n')
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.update([a_path])
+        self.assertEqual(proj.symbols.lookup('f'), [])
+        self.assertEqual(proj.symbols.search('n'),
+                         [Symbol('n2', 'a_mod::n2', 'variable', a_path, 2)])
+
+        os.remove(b_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.update([b_path])
+        self.assertEqual(proj.symbols.lookup('y'), [])
+        self.assertEqual(sorted(proj.symbols),
+                         sorted(SymbolIndex(proj.files)))
+
+        # Generic interfaces are named, and interface bodies are not
+        # definitions
+        c_path = os.path.join(self.path, 'c.f90')
+        with open(c_path, 'w') as f:
+            f.write('module c_mod\n'
+                    '  interface norm\n'
+                    '    module procedure norm_r\n'
+                    '  end interface norm\n'
+                    '  abstract interface\n'
+                    '    subroutine callback(x)\n'
+                    '      real :: x\n'
+                    '    end subroutine callback\n'
+                    '  end interface\n'
+                    'contains\n'
+                    '  real function norm_r(x)\n'
+                    '  end function norm_r\n'
+                    'end module c_mod\n')
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.update([c_path])
+        self.assertEqual(proj.symbols.lookup('norm'),
+                         [Symbol('norm', 'c_mod::norm', 'interface', c_path,
+                                 2)])
+        self.assertEqual(proj.symbols.lookup('norm_r'),
+                         [Symbol('norm_r', 'c_mod::norm_r', 'function',
+                                 c_path, 11)])
+        self.assertEqual(proj.symbols.lookup('callback'), [])
+        self.assertEqual(proj.symbols.lookup('interface'), [])
+
+    def test_export(self):
+        proj = self.parse()
+        a_path = os.path.join(self.path, 'a.f90')
+        b_path = os.path.join(self.path, 'sub', 'b.F90')
+        h_path = os.path.join(self.path, 'sub', 'b.h')
+        db_path = os.path.join(self.path, 'flint.db')
+
+        exporter = SQLiteExporter(db_path)
+        self.addCleanup(exporter.close)
+        exporter.export(proj, 'v1')
+        self.assertEqual((exporter.written, exporter.unchanged), (3, 0))
+
+        def query(sql, *args):
+            return exporter.conn.execute(sql, args).fetchall()
+
+        self.assertEqual(
+            query("SELECT files.path, variables.line, variables.name "
+                  "FROM variables JOIN files ON files.id = variables.file_id "
+                  "WHERE variables.type = 'real' "
+                  "AND variables.docstring IS NULL ORDER BY files.path"),
+            [(a_path, 6, 'x'), (b_path, 4, 'y')])
+        self.assertEqual(
+            query("SELECT units.qualname, variables.attributes "
+                  "FROM variables JOIN units ON units.id = variables.unit_id "
+                  "WHERE variables.name = 'x'"),
+            [('a_mod::f', 'intent')])
+        self.assertEqual(query("SELECT path, code FROM diagnostics "
+                               "ORDER BY path"),
+                         [(a_path, 'C0102'), (h_path, 'C0102')])
+        self.assertEqual(query("SELECT COUNT(*) FROM files "
+                               "WHERE failure IS NOT NULL"), [(1,)])
+
+        # Only the changed files are written again
+        exporter.export(proj, 'v1')
+        self.assertEqual((exporter.written, exporter.unchanged), (0, 3))
+
+        # As are the files of a project parsed with other settings
+        defined = Project()
+        defined.defines['NY'] = '3'
+        with contextlib.redirect_stdout(io.StringIO()):
+            defined.parse(self.path)
+        exporter.export(defined, 'v1')
+        self.assertEqual((exporter.written, exporter.unchanged), (3, 0))
+        exporter.export(proj, 'v1')
+        self.assertEqual((exporter.written, exporter.unchanged), (3, 0))
+
+        with open(a_path, 'w') as f:
+            f.write('module a_mod\n'
+                    '  namelist /a_nml/ n, m\n'
+                    'end module a_mod\n')
+        os.remove(b_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.update([a_path, b_path])
+        exporter.export(proj, 'v1')
+        self.assertEqual((exporter.written, exporter.unchanged,
+                          exporter.removed), (1, 1, 1))
+        self.assertEqual(query("SELECT name FROM variables"), [])
+        self.assertEqual(query("SELECT name, position, object "
+                               "FROM namelists ORDER BY position"),
+                         [('a_nml', 0, 'n'), ('a_nml', 1, 'm')])
+        self.assertEqual(query("SELECT COUNT(*) FROM diagnostics"), [(0,)])
+
+        # Projects are exported side by side
+        exporter.export(self.parse(), 'v2')
+        self.assertEqual(query("SELECT projects.name, COUNT(*) FROM files "
+                               "JOIN projects "
+                               "ON projects.id = files.project_id "
+                               "GROUP BY projects.name"),
+                         [('v1', 2), ('v2', 2)])
+
+    def test_token_index(self):
+        proj = self.parse(token_index=True)
+        a_path = os.path.join(self.path, 'a.f90')
+        b_path = os.path.join(self.path, 'sub', 'b.F90')
+        index = proj.token_index
+
+        self.assertEqual(index.search('real , intent ( in )'),
+                         [TokenMatch(a_path, 6, 5)])
+        self.assertEqual(index.search('REAL ... ( ? )'),
+                         [TokenMatch(a_path, 6, 5), TokenMatch(b_path, 4, 1)])
+        self.assertEqual(index.search('module ? ... b_mod'), [])
+        self.assertEqual(index.search('? :: ...'),
+                         [TokenMatch(a_path, 3, 2), TokenMatch(a_path, 6, 5),
+                          TokenMatch(b_path, 4, 1)])
+        with self.assertRaises(ValueError):
+            index.search('? ...')
+
+        # Continued statements, and updated and removed files
+        with open(a_path, 'w') as f:
+            f.write('subroutine g(a)\n'
+                    '  call h(a, &  ! Continued\n'
+                    '         & .not. a)\n'
+                    'end subroutine g\n')
+        os.remove(b_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.update([a_path, b_path])
+        self.assertEqual(index.search('call h ( ... .not. a )'),
+                         [TokenMatch(a_path, 2, 1)])
+        self.assertEqual(index.search('? .not. a'), [TokenMatch(a_path, 3, 1)])
+        self.assertEqual(index.search('real'), [])
+        self.assertEqual(index.count('.NOT.'), 1)
+
+        # Replaced statements are dropped as the file is updated
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(5):
+                proj.update([a_path])
+        self.assertLessEqual(len(index.paths), 2)
+        self.assertLessEqual(len(index.stmt_files), 2 * 4)
+        self.assertLessEqual(len(index.postings['call']), 2)
+        self.assertEqual(index.search('? .not. a'), [TokenMatch(a_path, 3, 1)])
+
+        # Skeleton and cached sources are indexed in full
+        cache_path = os.path.join(self.path, 'cache')
+        for _ in range(2):
+            other = Project(token_index=True, cache=cache_path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                other.parse(self.path, mode='skeleton')
+            self.assertEqual(other.token_index.search('call h'),
+                             [TokenMatch(a_path, 2, 1)])
+        self.assertEqual(other.cache.hits, 1)
+
+    def test_watch(self):
+        proj = self.parse()
+        updates = []
+        watcher = Watcher(proj, callback=lambda proj, sources, elapsed:
+                          updates.append([src.path for src in sources]))
+        self.assertEqual(watcher.poll(), [])
+
+        a_path = os.path.join(self.path, 'a.f90')
+        with open(a_path, 'a') as f:
+            f.write('module a2_mod\nend module a2_mod\n')
+        with contextlib.redirect_stdout(io.StringIO()):
+            watcher.poll()
+        self.assertEqual(updates, [[a_path]])
+
+        a_src = next(src for src in proj.files if src.path == a_path)
+        self.assertEqual([u.name for u in a_src.units], ['a_mod', 'a2_mod'])
+
+    def test_cases(self):
+        with open(os.path.join(self.path, 'd.f90'), 'w') as f:
+            f.write('MODULE d_mod\n'
+                    '  integer :: n = 1, m = 2\n'
+                    '  m = N\n'
+                    'END MODULE d_mod\n')
+
+        for jobs in (1, 2):
+            proj = self.parse(jobs=jobs)
+            minority = [s for s in proj.cases.minority() if s.word == 'module']
+            self.assertEqual(
+                [tuple(s) for s in minority],
+                [('module', 'MODULE', 2, 'module',
+                  os.path.join(self.path, 'd.f90'), 1, 1)])
+
+            # Identifiers are not tracked by default
+            self.assertNotIn('n', proj.cases.words)
+
+        proj = self.parse(case_vocabulary={'n'})
+        self.assertEqual([(s.spelling, s.preferred, s.line, s.column)
+                          for s in proj.cases.minority()],
+                         [('N', 'n', 3, 7)])
+
+        # An empty vocabulary tracks no words
+        proj = self.parse(case_vocabulary=set())
+        self.assertEqual(proj.cases.words, {})
+
+    def test_skeleton(self):
+        with open(os.path.join(self.path, 'c.F90'), 'w') as f:
+            f.write(skeleton_source)
+
+        trees = {}
+        for mode in ('full', 'skeleton'):
+            proj = Project()
+            with contextlib.redirect_stdout(io.StringIO()):
+                proj.parse(self.path, mode=mode)
+            trees[mode] = [(src.path, [tree(u) for u in src.units])
+                           for src in proj.files]
+
+        self.assertEqual(trees['full'], trees['skeleton'])
+
+        c_units = next(units for path, units in trees['skeleton']
+                       if path.endswith('c.F90'))
+        self.assertEqual([s[0] for s in c_units[0][5]], ['f', 'g', 'h', 'i'])
+
+        with self.assertRaises(ValueError):
+            Project().parse(self.path, mode='outline')
+
+    def test_find_include(self):
+        for idir in ('inc1', 'inc2'):
+            os.makedirs(os.path.join(self.path, 'x', idir, 'sub'))
+            with open(os.path.join(self.path, 'x', idir, 'sub', 'b.h'),
+                      'w') as f:
+                f.write('\n')
+
+        inc1, inc2 = (os.path.join(self.path, 'x', idir)
+                      for idir in ('inc1', 'inc2'))
+        proj = self.parse(include_paths=[inc2, inc1])
+
+        # The including directory is searched first
+        curdir = os.path.join(self.path, 'sub')
+        self.assertEqual(proj.find_include('b.h', curdir),
+                         os.path.join(curdir, 'b.h'))
+
+        # Otherwise, the first include path
+        curdir = os.path.join(self.path, 'x')
+        self.assertEqual(proj.find_include('sub/b.h', curdir),
+                         os.path.join(inc2, 'sub', 'b.h'))
+        self.assertIsNone(proj.find_include('c.h', curdir))
+
+    def test_include_cache(self):
+        proj = self.parse()
+        self.assertEqual(proj.include_cache.misses, 1)
+        self.assertEqual(proj.include_cache.hits, 0)
+
+        src = Source(project=proj)
+        with contextlib.redirect_stdout(io.StringIO()):
+            src.parse(os.path.join(self.path, 'sub', 'b.F90'))
+        self.assertEqual(proj.include_cache.hits, 1)
+
+        first = next(f for f in proj.files if f.path == src.path)
+        self.assertEqual(src.includes, first.includes)
+        self.assertEqual(src.inc_reports, first.inc_reports)
+
+    def test_cache(self):
+        cache_path = os.path.join(self.path, 'cache')
+        cold = self.parse(cache=cache_path)
+        self.assertEqual(cold.cache.hits, 0)
+
+        warm = self.parse(cache=cache_path)
+        self.assertEqual(warm.cache.hits, 2)
+        self.assertEqual(self.summary(cold), self.summary(warm))
+        for src in warm.files:
+            self.assertIs(src.project, warm)
+
+        # Changes to the source or its includes are misses
+        with open(os.path.join(self.path, 'sub', 'b.h'), 'a') as f:
+            f.write('  integer :: h2\n')
+        with open(os.path.join(self.path, 'a.f90'), 'a') as f:
+            f.write('\n')
+        proj = self.parse(cache=cache_path)
+        self.assertEqual(proj.cache.hits, 0)
+
+    def test_cache_corrupt(self):
+        cache = ParseCache(os.path.join(self.path, 'cache'))
+        self.parse(cache=cache)
+        for entry in os.scandir(cache.path):
+            with open(entry.path, 'r+b') as f:
+                f.seek(-1, os.SEEK_END)
+                f.write(b'?')
+
+        proj = self.parse(cache=cache)
+        self.assertEqual(proj.cache.hits, 0)
+        self.assertEqual(len(proj.files), 3)
+
+    def test_cache_eviction(self):
+        cache = ParseCache(os.path.join(self.path, 'cache'), max_size=1)
+        self.parse(cache=cache)
+        self.assertEqual(cache.size, 0)
+        self.assertEqual(os.listdir(cache.path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
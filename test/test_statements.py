@@ -0,0 +1,73 @@
+import sys
+import unittest
+
+sys.path.insert(1, '../')
+from flint import statements
+from flint.statements import classify
+
+
+class Test(unittest.TestCase):
+
+    def test_classify(self):
+        cases = [
+            ('use mpi', 'use'),
+            ('import :: t', 'import'),
+            ('implicit none', 'implicit'),
+            ('i = 1', 'other'),
+            ('real ( kind = 8 ) , dimension ( : ) :: x', 'declaration'),
+            ('public :: f', 'declaration'),
+            ('contains', 'contains'),
+            ('10 continue', 'continue'),
+            ('10 format ( a )', 'other'),
+            ('end', 'end'),
+            ('end subroutine f', 'end'),
+            ('enddo', 'end'),
+            ('endselect', 'end'),
+            ('endteam', 'end'),
+            ('endchange', 'other'),
+            ('endfile ( 10 )', 'other'),
+            ('module m', 'module'),
+            ('program p', 'program'),
+            ('subroutine f', 'subroutine'),
+            ('recursive subroutine f ( a , b )', 'subroutine'),
+            ('pure function f ( a ) result ( r )', 'function'),
+            ('real ( kind = 8 ) elemental function f ( x )', 'function'),
+            ('double precision function f ( x )', 'function'),
+            ('pure real :: x', 'other'),
+            ('type , public :: t', 'type'),
+            ('type ( t ) , pointer :: p', 'type'),
+            ('interface gen', 'interface'),
+            ('abstract interface', 'interface'),
+            ('module procedure f , g', 'declaration'),
+            ('block', 'block'),
+            ('do i = 1 , n', 'construct'),
+            ('if ( x ) then', 'construct'),
+            ('if ( x ) y = 1', 'other'),
+            ('where ( m > 0 )', 'construct'),
+            ('where ( m > 0 ) m = 0', 'other'),
+            ('where = 1', 'other'),
+            ('associate ( p => q )', 'construct'),
+            ('select case ( n )', 'construct'),
+            ('select type ( p )', 'construct'),
+            ('select rank ( a )', 'construct'),
+            ('change team ( t )', 'construct'),
+            ('select = 1', 'other'),
+            ('change ( 1 ) = 2', 'other'),
+        ]
+        for line, kind in cases:
+            self.assertEqual(statements.kind_names[classify(line.split())],
+                             kind, line)
+
+    def test_kind_sets(self):
+        # Blocks which are parsed as declarations or program units
+        for kind in (statements.TYPE, statements.INTERFACE, statements.ENUM):
+            self.assertIn(kind, statements.declaration_kinds)
+            self.assertIn(kind, statements.unit_kinds)
+
+        # BLOCK is both a construct and (for BLOCK DATA) a unit
+        self.assertIn(statements.BLOCK, statements.construct_kinds)
+        self.assertIn(statements.BLOCK, statements.unit_kinds)
+
+
+if __name__ == '__main__':
+    unittest.main()
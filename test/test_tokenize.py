@@ -1,8 +1,13 @@
+import contextlib
+import io
+import random
 import sys
 import unittest
 
 sys.path.insert(1, '../')
-from flint.tokenizer import Tokenizer
+from flint.preprocessor import MacroTable
+from flint.tokenizer import Tokenizer, ScanTokenizer, TokenCache
+from flint import tokens
 
 
 class Test(unittest.TestCase):
@@ -100,5 +105,157 @@ class Test(unittest.TestCase):
             test_toks = self.tokenizer.parse(line)
             self.assertEqual(test_toks, toks)
 
+
+class TestScan(Test):
+    """Run the tokenizer tests on the scanning engine."""
+
+    def setUp(self):
+        super(TestScan, self).setUp()
+        self.tokenizer = ScanTokenizer()
+
+
+class TestEngines(unittest.TestCase):
+    """Compare the token lists of the tokenizer engines."""
+
+    corpus = [
+        'module foo_mod\n',
+        '  real(kind=8), dimension(:,:), allocatable :: x, y  !< Doc\n',
+        '  x = 1.0_r8 * y**2 + 3.e-4_dp / .5d0 - 2_8\n',
+        '  if (a .and. .not. b .eqv. c) z = 1.eq.2\n',
+        '  s = \'it\'\'s\' // "say ""hi""" // \'a & b\'\n',
+        '  call f(a=>b, c==d, e/=f, g<=h, i>=j) ; y = x\n',
+        '#include "header.h"\n',
+        '\tx\t=\t1 ! tabs\n',
+        '  v = (/ 1, 2, 3 /) ; w = [1, 2] % z\n',
+        '  caf\u00e9 = \'na\u00efve\'  ! \u00fcnicode\n',
+        '  x = 1._rk + 2.5_k8m + 3_ + 4.4.4\n',
+        '  s = "abc &  \n',
+        '      & def &\n',
+        '    ghi"\n',
+        '  t = \'unterminated &\n',
+        '  \n',
+        '    x\'\n',
+        '\n',
+    ]
+
+    fragments = [
+        'a', 'x1', '_k', 'end', ' ', '\t', '   ', '"', '\'', '""', '\'\'',
+        '&', ' &', '.', '.and.', '.eq.', '1', '2.5', '.5', '1.e', '1.0_r8',
+        '3_8', 'e', 'd', '-', '+', '_', '=', '==', '/', '(', ')', '::', '*',
+        '!', ' !c', '#', ',', ';', '<', '>', '%', '\u00e9',
+    ]
+
+    def assertEqualEngines(self, lines):
+        char_tok, scan_tok = Tokenizer(), ScanTokenizer()
+        for line in lines:
+            self.assertEqual(char_tok.parse(line), scan_tok.parse(line))
+            self.assertEqual(char_tok.prior_delim, scan_tok.prior_delim)
+
+    def test_corpus(self):
+        self.assertEqualEngines(self.corpus)
+
+    def test_generated(self):
+        rng = random.Random(90)
+        for _ in range(5000):
+            lines = [''.join(rng.choice(self.fragments)
+                             for _ in range(rng.randint(1, 12))) + '\n'
+                     for _ in range(3)]
+
+            # Only compare lines which the character engine accepts
+            char_tok = Tokenizer()
+            try:
+                for line in lines:
+                    char_tok.parse(line)
+            except (StopIteration, ValueError):
+                continue
+
+            self.assertEqualEngines(lines)
+
+
+class TestSpans(unittest.TestCase):
+
+    def setUp(self):
+        self.tokenizer = ScanTokenizer()
+
+    def test_kinds(self):
+        line = '  x = .5 .and. f(\'s\') ! c\n'
+        tline = self.tokenizer.spans(line, 3)
+        self.assertEqual(tline.line_number, 3)
+        self.assertEqual(tline.texts(), self.tokenizer.parse(line))
+        self.assertEqual(list(tline.kinds), [
+            tokens.SPACE, tokens.NAME, tokens.SPACE, tokens.PUNCTUATION,
+            tokens.SPACE, tokens.NUMBER, tokens.SPACE, tokens.OPERATOR,
+            tokens.SPACE, tokens.NAME, tokens.PUNCTUATION, tokens.STRING,
+            tokens.PUNCTUATION, tokens.SPACE, tokens.COMMENT,
+        ])
+        self.assertEqual((tline.starts[1], tline.ends[1]), (2, 3))
+
+    def test_statement_tokens(self):
+        line = '  X = "Abc" !< Doc\n'
+        tline = self.tokenizer.spans(line)
+        self.assertEqual(tline.statement_tokens(),
+                         ['x', '=', '"Abc"', '!< Doc'])
+
+    def test_string_continue(self):
+        self.tokenizer.spans("s = 'abc &\n")
+        tline = self.tokenizer.spans('  ! not a comment\'\n')
+        self.assertEqual(list(tline.kinds), [tokens.SPACE, tokens.STRING])
+
+
+class Macros(dict):
+    pass
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def test_cache(self):
+        cache = TokenCache(max_size=2)
+        tokenizer = ScanTokenizer()
+        tokenizer.cache = cache
+
+        line = '  ! not a comment\'\n'
+        first = tokenizer.spans(line)
+        self.assertEqual(tokenizer.spans(line).texts(), first.texts())
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsInstance(cache.parse(tokenizer, line), tuple)
+
+        # The continuation state is part of the key, and is restored on hits
+        for _ in range(2):
+            tokenizer.spans("s = 'abc &\n")
+            self.assertEqual(tokenizer.prior_delim, "'")
+            tline = tokenizer.spans(line)
+            self.assertEqual(list(tline.kinds),
+                             [tokens.SPACE, tokens.STRING])
+            self.assertIsNone(tokenizer.prior_delim)
+
+        self.assertEqual(len(cache.entries), 2)
+        self.assertEqual(cache.hits, 4)
+        self.assertAlmostEqual(cache.hit_rate(), 4. / 7.)
+
+    def test_macros(self):
+        cache = TokenCache()
+        tokenizer = ScanTokenizer()
+        macros = Macros(N='10')
+        macros.version = 1
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for version, value in ((1, '10'), (2, '20'), (2, '20')):
+                macros['N'] = value
+                macros.version = version
+                self.assertEqual(cache.parse(tokenizer, 'x = N\n', macros),
+                                 ('x', ' ', '=', ' ', value))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        # Unversioned macros are not cached
+        cache.parse(tokenizer, 'x = N\n', {'N': '30'})
+        self.assertEqual(len(cache.entries), 2)
+
+        # Macro tables are versioned on every change
+        table = MacroTable()
+        version = table.version
+        table.define('N', None, '10')
+        self.assertNotEqual(table.version, version)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,52 @@
+"""Cold versus warm parse times of a project with a parse cache."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from flint.project import Project
+
+from bench_stream import write_source
+
+
+def timed_parse(path, cache_path):
+    proj = Project(cache=cache_path)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        proj.parse(path)
+    return time.perf_counter() - start, proj
+
+
+def main():
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src_path = os.path.join(tmpdir, 'src')
+        cache_path = os.path.join(tmpdir, 'cache')
+        for i in range(n_files):
+            fdir = os.path.join(src_path, 'd{}'.format(i % 10))
+            if not os.path.isdir(fdir):
+                os.makedirs(fdir)
+            write_source(os.path.join(fdir, 'f{}.f90'.format(i)), 20)
+
+        uncached, _ = timed_parse(src_path, None)
+        cold, _ = timed_parse(src_path, cache_path)
+        warm, proj = timed_parse(src_path, cache_path)
+
+        # Modify one file
+        with open(os.path.join(src_path, 'd0', 'f0.f90'), 'a') as f:
+            f.write('\n')
+        single, _ = timed_parse(src_path, cache_path)
+
+        print('{} files'.format(n_files))
+        print('uncached:    {:8.3f} s'.format(uncached))
+        print('cold cache:  {:8.3f} s'.format(cold))
+        print('warm cache:  {:8.3f} s ({} hits)'.format(warm, proj.cache.hits))
+        print('one changed: {:8.3f} s'.format(single))
+        print('cache size:  {:8.2f} MiB'.format(proj.cache.size / 2.**20))
+
+
+if __name__ == '__main__':
+    main()
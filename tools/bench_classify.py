@@ -0,0 +1,128 @@
+"""Statement classifications per second, by dispatch table and by probes."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from flint.fortlines import FortLines
+from flint.source import Source
+from flint.statements import classify
+from flint.units.function import is_function
+from flint.units.module import is_module
+from flint.units.subroutine import is_subroutine
+from flint.variable import Variable
+
+from bench_stream import write_source
+
+unit_types = ['program', 'function', 'subroutine', 'module', 'submodule',
+              'block', 'interface', 'type', 'enum']
+unit_prefix = Variable.intrinsic_types + ['elemental', 'impure',
+                                          'non_recursive', 'pure',
+                                          'recursive']
+construct_types = ['associate', 'block', 'critical', 'do', 'if', 'forall',
+                   'where', 'changeselect']
+declaration_types = Variable.intrinsic_types + [
+    'public', 'private', 'allocatable', 'asynchronous', 'codimension',
+    'contiguous', 'dimension', 'external', 'intent', 'intrinsic', 'namelist',
+    'optional', 'pointer', 'protected', 'save', 'target', 'value',
+    'volatile', 'common', 'equivalence', 'type', 'enum', 'generic',
+    'interface', 'parameter', 'procedure', 'data', 'format', 'entry',
+]
+
+
+def unit_statement(line):
+    """The previous Unit.statement."""
+    idx = next((i for i, w in enumerate(line) if w in unit_types), -1)
+    if idx == 0:
+        return True
+    elif idx > 0:
+        words = iter(line[:idx])
+        word = next(words)
+        while True:
+            try:
+                if word in Variable.intrinsic_types:
+                    word = next(words)
+                    if word == '(':
+                        while word != ')':
+                            word = next(words)
+                elif word not in unit_prefix:
+                    return False
+                word = next(words)
+            except StopIteration:
+                break
+        return True
+    return False
+
+
+def construct_statement(line):
+    """The previous Construct.statement, without the WHERE assertion."""
+    if line[0] in construct_types:
+        if line[0] == 'if':
+            return (line[0], line[-1]) == ('if', 'then')
+        return True
+
+
+def probe(line):
+    """Classify a line by the previous sequence of probes."""
+    if is_subroutine(line) or is_function(line) or is_module(line):
+        return 'unit'
+    elif line[0] in ('use', 'import', 'implicit'):
+        return 'spec'
+    elif line[0] in declaration_types:
+        return 'declaration'
+    elif construct_statement(line):
+        return 'construct'
+    elif unit_statement(line):
+        return 'unit'
+    elif line[0].startswith('end'):
+        return 'end'
+    return 'other'
+
+
+def statements(path):
+    src = Source()
+    src.path = path
+    with contextlib.redirect_stdout(io.StringIO()):
+        flines = FortLines(src.tokenize())
+        return [list(line) for line in flines]
+
+
+def rate(func, lines, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        runtime = time.perf_counter() - start
+        best = runtime if best is None else min(best, runtime)
+    return len(lines) / best
+
+
+def main():
+    paths = sys.argv[1:]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if not paths:
+            paths = [os.path.join(tmpdir, 'big.f90')]
+            write_source(paths[0], 2000)
+
+        lines = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    lines.extend(statements(os.path.join(root, fname))
+                                 for fname in files
+                                 if fname.endswith(('.f90', '.F90')))
+            else:
+                lines.append(statements(path))
+        lines = [line for flines in lines for line in flines]
+
+    print('{} statements'.format(len(lines)))
+    print('probes:   {:12.0f} per second'.format(rate(probe, lines)))
+    print('classify: {:12.0f} per second'.format(rate(classify, lines)))
+
+
+if __name__ == '__main__':
+    main()
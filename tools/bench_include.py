@@ -0,0 +1,72 @@
+"""Include resolution by directory scan versus the project include index."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from flint.project import Project
+
+
+def make_tree(path, depth, fanout):
+    """Create a directory tree with a header in each leaf directory."""
+    dirs = [path]
+    for level in range(depth):
+        dirs = [os.path.join(d, 'd{}'.format(i))
+                for d in dirs for i in range(fanout)]
+    for i, d in enumerate(dirs):
+        os.makedirs(d)
+        with open(os.path.join(d, 'h{}.h'.format(i)), 'w') as f:
+            f.write('integer :: h{}\n'.format(i))
+    return len(dirs)
+
+
+def scan_include(directories, inc_fname):
+    """The previous resolution: test every project directory."""
+    inc_path = None
+    for idir in directories:
+        test_fpath = os.path.join(idir, inc_fname)
+        if os.path.isfile(test_fpath):
+            inc_path = test_fpath
+    return inc_path
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    fanout = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    n_lookups = 200
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        n_leaves = make_tree(tmpdir, depth, fanout)
+
+        proj = Project()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            proj.parse(tmpdir)
+            walk_time = time.perf_counter() - start
+
+        names = ['h{}.h'.format(i * n_leaves // n_lookups)
+                 for i in range(n_lookups)]
+
+        start = time.perf_counter()
+        scanned = [scan_include(proj.directories, name) for name in names]
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed = [proj.find_include(name, tmpdir) for name in names]
+        index_time = time.perf_counter() - start
+
+        assert scanned == indexed
+
+        print('{} directories, {} lookups'
+              ''.format(len(proj.directories), n_lookups))
+        print('walk and index: {:10.3f} ms'.format(1e3 * walk_time))
+        print('scan:           {:10.3f} ms per include'
+              ''.format(1e3 * scan_time / n_lookups))
+        print('index:          {:10.3f} ms per include'
+              ''.format(1e3 * index_time / n_lookups))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Macro expansion by re-tokenizing each replacement versus a macro table."""
+import sys
+import time
+
+from flint.preprocessor import MacroTable
+from flint.tokenizer import ScanTokenizer
+
+
+def retokenize(items, defines, tokenizer):
+    """The previous expansion: tokenize the replacement at each use."""
+    expanded = []
+    for kind, tok in items:
+        if tok in defines:
+            replacement = tokenizer.spans(defines[tok] + '\n')
+            expanded.extend(zip(replacement.kinds, replacement.texts()))
+        else:
+            expanded.append((kind, tok))
+    return expanded
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    defines = {
+        'NK': '10',
+        'REAL_KIND': 'selected_real_kind(12, 307)',
+        'ASSERT': 'if (.not. (cond)) call abort("failed")',
+    }
+    macros = MacroTable(defines=defines)
+
+    tokenizer = ScanTokenizer()
+    lines = [
+        tokenizer.spans('  real(REAL_KIND) :: x{}(NK, NK)  ! ASSERT\n'
+                        ''.format(i))
+        for i in range(n_lines)
+    ]
+
+    items = [list(zip(tokens.kinds, tokens.texts())) for tokens in lines]
+
+    start = time.perf_counter()
+    for line_items in items:
+        retokenize(line_items, defines, tokenizer)
+    retok_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for line_items in items:
+        macros.expand(line_items)
+    table_time = time.perf_counter() - start
+
+    print('{} lines'.format(n_lines))
+    print('re-tokenize: {:8.3f} s'.format(retok_time))
+    print('table:       {:8.3f} s'.format(table_time))
+    for name, count in macros.counts.most_common():
+        print('  {:10} {:8d}'.format(name, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Memory of a parsed project, in total and per variable."""
+import contextlib
+import gc
+import io
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from flint.project import Project
+
+from bench_stream import write_source
+
+
+def count(units):
+    """Return the number of units and variables in a tree of units."""
+    n_units = n_vars = 0
+    for unit in units:
+        n_sub_units, n_sub_vars = count(unit.blocks + unit.subprograms)
+        n_units += 1 + n_sub_units
+        n_vars += len(unit.variables) + n_sub_vars
+    return n_units, n_vars
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if len(sys.argv) > 1:
+            src_path = sys.argv[1]
+        else:
+            src_path = os.path.join(tmpdir, 'src')
+            os.makedirs(src_path)
+            for i in range(50):
+                write_source(os.path.join(src_path, 'f{}.f90'.format(i)), 200)
+
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj = Project()
+            proj.parse(src_path)
+        retained, peak = tracemalloc.get_traced_memory()
+
+        # Keep only the program units
+        n_files = len(proj.files)
+        units = [u for src in proj.files for u in src.units]
+        del proj
+        gc.collect()
+        ast_size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    n_units, n_vars = count(units)
+
+    print('{} files, {} units, {} variables'.format(n_files, n_units, n_vars))
+    print('peak:     {:8.2f} MiB'.format(peak / 2.**20))
+    print('retained: {:8.2f} MiB'.format(retained / 2.**20))
+    print('units:    {:8.2f} MiB ({:.0f} bytes per variable)'
+          ''.format(ast_size / 2.**20, ast_size / n_vars))
+
+
+if __name__ == '__main__':
+    main()
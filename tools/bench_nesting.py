@@ -0,0 +1,64 @@
+"""Parse time per statement of deeply nested constructs and blocks."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from flint.source import Source
+
+
+def write_source(path, depth):
+    """Write a module of nested DO and BLOCK constructs and an interface."""
+    with open(path, 'w') as src:
+        src.write('module nest_mod\n')
+        src.write('  implicit none\n')
+        src.write('  interface gen\n')
+        src.write('    subroutine s(x)\n')
+        src.write('      real :: x\n')
+        src.write('    end subroutine s\n')
+        src.write('  end interface gen\n')
+        src.write('contains\n')
+        src.write('subroutine f(n)\n')
+        src.write('  integer :: i, n\n')
+        for i in range(depth):
+            src.write('do i = 1, n\n' if i % 2 else 'block\n')
+        src.write('  i = i + 1\n')
+        for i in reversed(range(depth)):
+            src.write('end do\n' if i % 2 else 'end block\n')
+        src.write('end subroutine f\n')
+        src.write('end module nest_mod\n')
+
+
+def main():
+    depths = [int(d) for d in sys.argv[1:]] or [10, 100, 1000, 10000, 100000]
+
+    print('recursion limit {}'.format(sys.getrecursionlimit()))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for depth in depths:
+            path = os.path.join(tmpdir, 'nest{}.f90'.format(depth))
+            write_source(path, depth)
+            n_lines = 2 * depth + 12
+
+            best = None
+            for trial in range(3):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    try:
+                        Source().parse(path)
+                    except RecursionError:
+                        runtime = None
+                        break
+                    runtime = time.perf_counter() - start
+                best = runtime if best is None else min(best, runtime)
+
+            if runtime is None:
+                print('depth {:>7}: RecursionError'.format(depth))
+            else:
+                print('depth {:>7}: {:8.3f} s, {:6.2f} us per line'
+                      ''.format(depth, best, 1e6 * best / n_lines))
+
+
+if __name__ == '__main__':
+    main()
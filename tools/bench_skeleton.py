@@ -0,0 +1,44 @@
+"""Full versus skeleton parse times of a project."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from flint.project import Project
+
+from bench_stream import write_source
+
+
+def timed_parse(path, mode, repeat=3):
+    best = None
+    for _ in range(repeat):
+        proj = Project()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            proj.parse(path, mode=mode)
+        runtime = time.perf_counter() - start
+        best = runtime if best is None else min(best, runtime)
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if len(sys.argv) > 1:
+            src_path = sys.argv[1]
+        else:
+            src_path = os.path.join(tmpdir, 'src')
+            os.makedirs(src_path)
+            for i in range(50):
+                write_source(os.path.join(src_path, 'f{}.f90'.format(i)), 40)
+
+        full = timed_parse(src_path, 'full')
+        skeleton = timed_parse(src_path, 'skeleton')
+
+    print('full:     {:8.3f} s'.format(full))
+    print('skeleton: {:8.3f} s ({:.1f}x)'.format(skeleton, full / skeleton))
+
+
+if __name__ == '__main__':
+    main()
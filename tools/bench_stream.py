@@ -0,0 +1,84 @@
+"""Peak memory of materialized versus streamed tokenization of a large file."""
+import collections
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flint.source import Source
+
+
+def write_source(path, n_subprograms):
+    with open(path, 'w') as src:
+        src.write('module big_mod\n')
+        src.write('  implicit none\n')
+        src.write('  integer, parameter :: n = 10  !< Size\n')
+        src.write('contains\n')
+        for i in range(n_subprograms):
+            src.write('!> Subroutine {}\n'.format(i))
+            src.write('subroutine sub{}(a, b, &\n'.format(i))
+            src.write('    c)\n')
+            src.write('  real, intent(inout) :: a(:), b, c  !< Arguments\n')
+            src.write('  integer :: k\n')
+            src.write('  do k = 1, n\n')
+            src.write('    if (a(k) > b) then\n')
+            src.write('      a(k) = b * 2.0 + c ! Clip\n')
+            src.write('    end if\n')
+            src.write('  end do\n')
+            src.write('  call log_msg("sub{} ""done"" &\n'.format(i))
+            src.write('      &here")\n')
+            src.write('end subroutine sub{}\n'.format(i))
+        src.write('end module big_mod\n')
+
+
+def measure(func):
+    """Return the runtime and the (separately traced) peak memory."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        runtime = time.perf_counter() - start
+
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return runtime, peak
+
+
+def main():
+    n_subprograms = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'big.f90')
+        write_source(path, n_subprograms)
+        with open(path) as src:
+            n_lines = sum(1 for line in src)
+
+        def materialized():
+            src = Source()
+            src.path = path
+            src.tokenize()
+
+        def streamed():
+            src = Source()
+            src.path = path
+            collections.deque(src.tokenized_lines(), maxlen=0)
+
+        def parsed():
+            Source().parse(path)
+
+        print('{} lines'.format(n_lines))
+        for name, func in (('tokenize (list)', materialized),
+                           ('tokenized_lines', streamed),
+                           ('Source.parse', parsed)):
+            runtime, peak = measure(func)
+            print('{:>16}: {:8.3f} s, peak {:8.2f} MiB'
+                  ''.format(name, runtime, peak / 2.**20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""Throughput of each stage of parsing a synthetic tree of sources.
+
+The tokenizer, FortLines, unit parser, Source and Project are timed
+separately over the same generated tree, and their lines per second and
+peak memory are reported.  Results can be saved as JSON, and compared with
+the results of another commit:
+
+    python bench_suite.py -o base.json
+    (change something)
+    python bench_suite.py --compare base.json
+"""
+import argparse
+import collections
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import flint
+from flint.fortlines import FortLines
+from flint.project import Project
+from flint.source import Source
+from flint.tokenizer import engines
+from flint.units import get_program_unit_type
+
+from gentree import write_tree
+
+
+def source_paths(path):
+    """Return the paths of the Fortran sources of a tree."""
+    paths = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        paths.extend(os.path.join(root, fname) for fname in sorted(files)
+                     if fname.endswith('.F90'))
+    return paths
+
+
+def read_lines(paths):
+    """Return the lines of each file."""
+    lines = []
+    for path in paths:
+        with open(path) as f:
+            lines.append(f.readlines())
+    return lines
+
+
+def statements(paths):
+    """Return the tokenized statements of each file."""
+    stmts = []
+    for path in paths:
+        src = Source()
+        src.path = path
+        stmts.append(src.tokenize())
+    return stmts
+
+
+def parse_units(flines):
+    """Parse the program units of a FortLines."""
+    units = []
+    for line in flines:
+        unit = get_program_unit_type(line)()
+        unit.parse(flines)
+        units.append(unit)
+    return units
+
+
+class Benchmarks(object):
+    """The benchmarks of a generated tree.
+
+    Each benchmark is a setup function, whose result is passed to a timed
+    function.  The setup builds (and copies) the inputs of each stage, so
+    that only the stage itself is timed.
+    """
+
+    def __init__(self, path, engine='scan', jobs=1):
+        self.path = path
+        self.engine = engine
+        self.jobs = jobs
+        self.paths = source_paths(path)
+        self.lines = read_lines(self.paths)
+        self.stmts = statements(self.paths)
+        self.n_lines = sum(len(lines) for lines in self.lines)
+
+    def tokenize(self):
+        """Tokenizer.parse of each line"""
+        def run(files):
+            for lines in files:
+                tokenizer = engines[self.engine]()
+                for line in lines:
+                    tokenizer.parse(line)
+        return self.lines, run
+
+    def fortlines(self):
+        """FortLines splitting and joining of the tokenized lines"""
+        def run(files):
+            for stmts in files:
+                collections.deque(FortLines(stmts), maxlen=0)
+        return copy.deepcopy(self.stmts), run
+
+    def units(self):
+        """FortLines and Unit.parse of the tokenized lines"""
+        def run(files):
+            for stmts in files:
+                parse_units(FortLines(stmts))
+        return copy.deepcopy(self.stmts), run
+
+    def source(self):
+        """Source.parse of each file"""
+        def run(paths):
+            for path in paths:
+                Source(engine=self.engine).parse(path)
+        return self.paths, run
+
+    def project(self):
+        """Project.parse of the tree"""
+        def run(path):
+            Project(engine=self.engine, jobs=self.jobs).parse(path)
+        return self.path, run
+
+    names = ('tokenize', 'fortlines', 'units', 'source', 'project')
+
+    def measure(self, name, repeat=3):
+        """Return the timing and peak memory of a benchmark."""
+        bench = getattr(self, name)
+
+        times = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                data, run = bench()
+                start = time.perf_counter()
+                run(data)
+                times.append(time.perf_counter() - start)
+
+            # Memory is traced separately, since tracing slows the run
+            data, run = bench()
+            tracemalloc.start()
+            run(data)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        best = min(times)
+        return {
+            'description': bench.__doc__,
+            'times': times,
+            'best': best,
+            'lines_per_s': self.n_lines / best,
+            'peak_bytes': peak,
+        }
+
+
+def git_commit():
+    """Return the current commit of the flint repository, if known."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(flint.__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, base, threshold):
+    """Print the change from the base results, and return the names of the
+    benchmarks which are slower by more than `threshold`."""
+    for key in ('tree', 'engine', 'jobs'):
+        if base.get(key) != results[key]:
+            print('warning: the {} differs from the base results'.format(key))
+
+    slower = []
+    print('{:<10} {:>12} {:>12} {:>8}'
+          ''.format('benchmark', 'base (s)', 'new (s)', 'change'))
+    for name, result in results['benchmarks'].items():
+        base_result = base['benchmarks'].get(name)
+        if not base_result:
+            continue
+        change = result['best'] / base_result['best'] - 1.
+        flag = ''
+        if change > threshold:
+            slower.append(name)
+            flag = '  slower'
+        print('{:<10} {:12.4f} {:12.4f} {:+7.1%}{}'.format(
+            name, base_result['best'], result['best'], change, flag))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n')[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--files', type=int, default=100)
+    parser.add_argument('--subprograms', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--continued', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-e', '--engine', default='scan',
+                        choices=sorted(engines))
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of processes of the project parse')
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-b', '--bench', action='append',
+                        choices=Benchmarks.names,
+                        help='benchmarks to run (default: all)')
+    parser.add_argument('-o', '--output', help='save the results as JSON')
+    parser.add_argument('--compare', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown reported as a regression (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    tree = {
+        'files': args.files,
+        'subprograms': args.subprograms,
+        'depth': args.depth,
+        'continued': args.continued,
+        'seed': args.seed,
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_tree(tmpdir, args.files, n_subprograms=args.subprograms,
+                   depth=args.depth, n_continued=args.continued,
+                   seed=args.seed)
+        benchmarks = Benchmarks(tmpdir, engine=args.engine, jobs=args.jobs)
+        tree['lines'] = benchmarks.n_lines
+
+        results = {
+            'flint': flint.__version__,
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'engine': args.engine,
+            'jobs': args.jobs,
+            'tree': tree,
+            'benchmarks': collections.OrderedDict(),
+        }
+
+        print('{} lines in {} files'.format(tree['lines'], args.files))
+        print('{:<10} {:>10} {:>12} {:>10}'.format('benchmark', 'best (s)',
+                                                  'lines/s', 'peak MiB'))
+        for name in args.bench or Benchmarks.names:
+            result = benchmarks.measure(name, args.repeat)
+            results['benchmarks'][name] = result
+            print('{:<10} {:10.4f} {:12.0f} {:10.2f}'.format(
+                name, result['best'], result['lines_per_s'],
+                result['peak_bytes'] / 2.**20))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        print()
+        if compare(results, base, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
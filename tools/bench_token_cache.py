@@ -0,0 +1,47 @@
+"""Project parse times with and without the tokenized line cache."""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from flint.project import Project
+
+from bench_stream import write_source
+
+
+def timed_parse(path, token_cache):
+    proj = Project(token_cache=token_cache)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        proj.parse(path)
+    return time.perf_counter() - start, proj
+
+
+def bench(path):
+    uncached, _ = timed_parse(path, False)
+    cached, proj = timed_parse(path, True)
+
+    cache = proj.token_cache
+    print('uncached:   {:8.3f} s'.format(uncached))
+    print('cached:     {:8.3f} s'.format(cached))
+    print('lookups:    {:8d}'.format(cache.hits + cache.misses))
+    print('hit rate:   {:8.1%}'.format(cache.hit_rate()))
+    print('tokenizing: {:8.3f} s (misses)'.format(cache.miss_time))
+    print('saved:      {:8.3f} s (estimated)'.format(cache.time_saved()))
+
+
+def main():
+    if len(sys.argv) > 1:
+        bench(sys.argv[1])
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i in range(100):
+            write_source(os.path.join(tmpdir, 'f{}.f90'.format(i)), 50)
+        bench(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+from io import open
+
+from flint.tokenizer import engines
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else 'mom6'
+
+    srcpaths = []
+    for root, dirs, files in os.walk(path):
+        for fname in files:
+            if os.path.splitext(fname)[1] in ('.f90', '.F90', '.h', '.inc'):
+                srcpaths.append(os.path.join(root, fname))
+
+    timings = dict((name, 0.) for name in engines)
+    n_lines = 0
+    n_diffs = 0
+
+    for srcpath in sorted(srcpaths):
+        with open(srcpath, errors='replace') as srcfile:
+            lines = srcfile.readlines()
+        n_lines += len(lines)
+
+        results = {}
+        for name in engines:
+            tokenizer = engines[name]()
+            start = time.perf_counter()
+            try:
+                results[name] = [tokenizer.parse(line) for line in lines]
+            except (StopIteration, ValueError, RuntimeError):
+                results[name] = None
+            timings[name] += time.perf_counter() - start
+
+        ref = results['char']
+        if ref is None:
+            print('SKIP (char engine failed): {}'.format(srcpath))
+            continue
+
+        for name in engines:
+            if results[name] is None:
+                print('{}: {} failed'.format(srcpath, name))
+                n_diffs += 1
+                continue
+
+            for lineno, (a, b) in enumerate(zip(ref, results[name]), 1):
+                if a != b:
+                    print('{}:{}: {}: {!r} != {!r}'
+                          ''.format(srcpath, lineno, name, b, a))
+                    n_diffs += 1
+
+    print('{} files, {} lines, {} differences'
+          ''.format(len(srcpaths), n_lines, n_diffs))
+    for name in engines:
+        rate = n_lines / timings[name] if timings[name] else 0.
+        print('{:>6}: {:8.3f} s ({:.0f} lines/s)'
+              ''.format(name, timings[name], rate))
+
+
+if __name__ == '__main__':
+    main()
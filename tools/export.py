@@ -0,0 +1,29 @@
+"""Parse a project, and export it to an SQLite database."""
+import argparse
+import time
+
+from flint.export import SQLiteExporter
+from flint.project import Project
+
+parser = argparse.ArgumentParser()
+parser.add_argument('path', nargs='?', default='mom6')
+parser.add_argument('-o', '--output', default='flint.db',
+                    help='SQLite database (default: flint.db)')
+parser.add_argument('-n', '--name',
+                    help='name of the project in the database (default: '
+                         'the path)')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='number of parsing processes (0 for one per CPU)')
+args = parser.parse_args()
+
+proj = Project(jobs=args.jobs or None)
+proj.parse(args.path)
+
+start = time.perf_counter()
+exporter = SQLiteExporter(args.output)
+exporter.export(proj, args.name)
+exporter.close()
+print('flint: exported {} files ({} unchanged, {} removed) to {} in '
+      '{:.2f} s'.format(exporter.written, exporter.unchanged,
+                        exporter.removed, args.output,
+                        time.perf_counter() - start))
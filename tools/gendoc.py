@@ -11,7 +11,7 @@ from flint.project import Project
 
 def main():
     proj = Project()
-    proj.parse('mom6')
+    proj.parse('mom6', mode='skeleton')
 
     doc_path = 'docs'
     os.makedirs(doc_path, exist_ok=True)
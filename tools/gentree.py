@@ -0,0 +1,190 @@
+"""Generate a synthetic, reproducible tree of Fortran sources.
+
+Each directory has a configuration header, and each module includes it and
+uses the previous module.  The modules contain docstrings, derived types,
+namelists, conditional blocks, and subprograms with nested constructs and
+long continued statements.  Sizes vary (reproducibly, by the seed) about the
+requested values.
+"""
+import argparse
+import os
+import random
+
+config_header = (
+    '#define NK 10\n'
+    '#ifndef USE_FAST\n'
+    '#define USE_SAFE\n'
+    '#endif\n'
+)
+
+constants_header = (
+    '  real, parameter :: pi = 3.14159265  !< Pi\n'
+    '#ifdef USE_SAFE\n'
+    '  real, parameter :: eps = 1.e-12  !< Tolerance\n'
+    '#else\n'
+    '  real, parameter :: eps = 0.  !< Tolerance\n'
+    '#endif\n'
+)
+
+
+def write_construct(out, rng, indent, depth, n_continued):
+    """Write a nest of `depth` DO, IF and SELECT CASE constructs."""
+    pad = ' ' * indent
+    if depth == 0:
+        out.append(pad + 'a(k) = b + c * &')
+        for i in range(n_continued):
+            out.append(pad + '     & d * {}.0 + &  ! Term {}'.format(i, i))
+        out.append(pad + '     & eps')
+        return
+
+    kind = rng.choice(('do', 'if', 'select'))
+    if kind == 'do':
+        out.append(pad + 'do k = 1, size(a)')
+        write_construct(out, rng, indent + 2, depth - 1, n_continued)
+        out.append(pad + 'end do')
+    elif kind == 'if':
+        out.append(pad + 'if (a(k) > b) then')
+        write_construct(out, rng, indent + 2, depth - 1, n_continued)
+        out.append(pad + 'else if (a(k) < -b) then')
+        out.append(pad + '  a(k) = -b')
+        out.append(pad + 'else')
+        out.append(pad + '  a(k) = 0.')
+        out.append(pad + 'endif')
+    else:
+        out.append(pad + 'select case (m)')
+        out.append(pad + '  case (1)')
+        write_construct(out, rng, indent + 4, depth - 1, n_continued)
+        out.append(pad + '  case default')
+        out.append(pad + '    a(k) = c')
+        out.append(pad + 'end select')
+
+
+def write_module(rng, name, prior, n_subprograms, depth, n_continued):
+    """Return the lines of a module."""
+    out = [
+        '!> Synthetic module {}'.format(name),
+        '!! with a two-line docstring',
+        'module {}'.format(name),
+        '',
+        '#include "config.h"',
+    ]
+    if prior:
+        out.append('  use {}, only : {}_type'.format(prior, prior))
+    out += [
+        '  implicit none ; private',
+        '',
+        '  public :: {}_init'.format(name),
+        '',
+        '  integer, parameter :: nk = NK  !< Number of levels',
+        '  real, allocatable, dimension(:,:) :: field  !< A field',
+        '  integer :: n_steps = 1  !< Number of steps',
+        '  real :: dt = 3600.  !< Time step [s]',
+        '  character(len=*), parameter :: mdl = "{}"  !< Module name'
+        ''.format(name),
+        '',
+        '  !> A derived type',
+        '  type, public :: {}_type'.format(name),
+        '    real :: x = 0.  !< Position',
+        '    integer, allocatable :: idx(:)  !< Indices',
+        '  end type {}_type'.format(name),
+        '',
+        '  namelist /{}_nml/ n_steps, &'.format(name),
+        '      dt',
+        '',
+        'contains',
+        '',
+        '!> Initialize the module',
+        'subroutine {}_init(unit)'.format(name),
+        '  integer, intent(in) :: unit  !< Namelist unit',
+        '  read(unit, nml={}_nml)'.format(name),
+        '  allocate(field(nk, nk))',
+        'end subroutine {}_init'.format(name),
+    ]
+
+    for j in range(n_subprograms):
+        sub = '{}_sub{}'.format(name, j)
+        out += [
+            '',
+            '!> Subroutine {} of {}'.format(j, name),
+            'subroutine {}(a, b, &'.format(sub),
+            '    & c, d, m)',
+            '  real, intent(inout) :: a(:)  !< Values',
+            '  real, intent(in) :: b, c, d  !< Coefficients',
+            '  integer, intent(in) :: m  !< Case',
+            '#include "constants.h"',
+            '  integer :: k',
+            '',
+            '#ifdef USE_FAST',
+            '  a(:) = a(:) * b',
+            '#else',
+        ]
+        write_construct(out, rng, 2, rng.randint(1, depth), n_continued)
+        out += [
+            '#endif',
+            '#if NK > 5',
+            '  call log_msg("{} ""done"" &'.format(sub),
+            '      &here")',
+            '#endif',
+            'end subroutine {}'.format(sub),
+            '',
+            '!> Function {} of {}'.format(j, name),
+            'pure function {}_fn{}(x) result(y)'.format(name, j),
+            '  real, intent(in) :: x  !< Input',
+            '  real :: y  !< Output',
+            '  y = 2. * x',
+            'end function {}_fn{}'.format(name, j),
+        ]
+
+    out.append('end module {}'.format(name))
+    return out
+
+
+def write_tree(path, n_files=100, n_dirs=4, n_subprograms=10, depth=4,
+               n_continued=4, seed=1):
+    """Write a tree of sources to `path`, and return its number of lines."""
+    rng = random.Random(seed)
+
+    n_lines = 0
+    prior = None
+    for i in range(n_files):
+        dpath = os.path.join(path, 'src', 'd{}'.format(i % n_dirs))
+        if not os.path.isdir(dpath):
+            os.makedirs(dpath)
+            for fname, text in (('config.h', config_header),
+                                ('constants.h', constants_header)):
+                with open(os.path.join(dpath, fname), 'w') as f:
+                    f.write(text)
+
+        name = 'synth{}_mod'.format(i)
+        n_subs = rng.randint(max(1, n_subprograms // 2),
+                             max(1, 3 * n_subprograms // 2))
+        lines = write_module(rng, name, prior, n_subs, depth, n_continued)
+        with open(os.path.join(dpath, name + '.F90'), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        n_lines += len(lines)
+        prior = name
+
+    return n_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path')
+    parser.add_argument('-n', '--files', type=int, default=100)
+    parser.add_argument('--dirs', type=int, default=4)
+    parser.add_argument('--subprograms', type=int, default=10,
+                        help='mean number of subprograms per module')
+    parser.add_argument('--depth', type=int, default=4,
+                        help='maximum depth of nested constructs')
+    parser.add_argument('--continued', type=int, default=4,
+                        help='continuation lines per statement')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    n_lines = write_tree(args.path, args.files, args.dirs, args.subprograms,
+                         args.depth, args.continued, args.seed)
+    print('{} lines in {} files'.format(n_lines, args.files))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Parse a project, and print the statements which match token patterns.
+
+Patterns are tokens separated by spaces, where ``?`` matches any token and
+``...`` any run of tokens:
+
+    python grep.py mom6 'allocate ( h ...' 'call ? ( ... .add. ...'
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from flint.project import Project
+
+parser = argparse.ArgumentParser(
+    description=__doc__.split('\n')[0],
+    formatter_class=argparse.RawDescriptionHelpFormatter,
+    epilog=__doc__.split('\n', 1)[1])
+parser.add_argument('path')
+parser.add_argument('patterns', nargs='+')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='number of parsing processes (0 for one per CPU)')
+parser.add_argument('--cache', help='parse cache directory')
+args = parser.parse_args()
+
+proj = Project(jobs=args.jobs or None, cache=args.cache, token_index=True)
+with contextlib.redirect_stdout(io.StringIO()):
+    proj.parse(args.path)
+
+for pattern in args.patterns:
+    start = time.perf_counter()
+    matches = proj.token_index.search(pattern)
+    elapsed = time.perf_counter() - start
+
+    for match in matches:
+        print('{}:{}: {}'.format(match.path, match.line, pattern))
+    print('flint: {} statements match {!r} ({:.1f} ms)'
+          ''.format(len(matches), pattern, 1e3 * elapsed))
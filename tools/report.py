@@ -1,10 +1,36 @@
+import argparse
+
+from flint.diagnostics import JSONLWriter, SARIFWriter
 from flint.project import Project
 
-proj = Project()
-proj.parse('mom6')
+parser = argparse.ArgumentParser()
+parser.add_argument('path', nargs='?', default='mom6')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='number of parsing processes (0 for one per CPU)')
+parser.add_argument('--jsonl', help='write the diagnostics as JSON lines')
+parser.add_argument('--sarif', help='write the diagnostics as a SARIF log')
+args = parser.parse_args()
+
+proj = Project(jobs=args.jobs or None)
+
+outputs = []
+for fpath, writer_type in ((args.jsonl, JSONLWriter),
+                           (args.sarif, SARIFWriter)):
+    if fpath:
+        output = open(fpath, 'w')
+        outputs.append(output)
+        proj.writers.append(writer_type(output))
+
+proj.parse(args.path)
+
+for writer in proj.writers:
+    writer.close()
+for output in outputs:
+    output.close()
 
 for src in proj.files:
-    ws_lines = src.report.errors['C0102']
+    ws_lines = [diag.line for diag in
+                proj.diagnostics.select(code='C0102', path=src.path)]
     if ws_lines:
         print(
             '{fname}: {lineno}'.format(
@@ -12,3 +38,14 @@ for src in proj.files:
                 lineno=', '.join(str(n) for n in ws_lines),
             )
         )
+
+for code, count in sorted(proj.diagnostics.count_by_code().items()):
+    print('{}: {}'.format(code, count))
+
+for spelling in proj.cases.minority()[:10]:
+    print('{s.spelling} ({s.count}, not {s.preferred}): '
+          '{s.path}:{s.line}:{s.column}'.format(s=spelling))
+
+for src in proj.failures():
+    print('{fname}: failed: {failure}'.format(fname=src.path,
+                                              failure=src.failure))
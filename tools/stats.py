@@ -0,0 +1,45 @@
+"""Time the phases of parsing a project, and list its slowest files."""
+import argparse
+
+from flint.project import Project
+
+
+class Profiled(object):
+    """Select the files whose path contains a substring."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def __call__(self, path):
+        return self.pattern in path
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('path', nargs='?', default='mom6')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='number of parsing processes (0 for one per CPU)')
+parser.add_argument('-n', '--top', type=int, default=10,
+                    help='number of slowest files to list')
+parser.add_argument('--mode', default='full', help='full or skeleton parse')
+parser.add_argument('--profile',
+                    help='profile the files whose path contains PROFILE')
+args = parser.parse_args()
+
+profile = Profiled(args.profile) if args.profile else None
+proj = Project(jobs=args.jobs or None, stats=True, profile=profile)
+proj.parse(args.path, mode=args.mode)
+
+stats = proj.stats
+print(stats.phase_table())
+print()
+print(stats.table(args.top))
+print()
+print('{} files in {:.3f} s'.format(len(stats.files), stats.elapsed))
+for name, count in sorted(stats.counts.items()):
+    print('{:>10} {}'.format(count, name))
+
+for file_stats in stats.files:
+    if file_stats.profile:
+        print()
+        print(file_stats.path)
+        stats.profile(file_stats.path).sort_stats('cumulative').print_stats(20)
@@ -0,0 +1,19 @@
+"""Parse a project, and update its diagnostics as its files change."""
+import argparse
+
+from flint.project import Project
+from flint.watch import Watcher
+
+parser = argparse.ArgumentParser()
+parser.add_argument('path', nargs='?', default='mom6')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+                    help='number of parsing processes (0 for one per CPU)')
+parser.add_argument('-i', '--interval', type=float, default=0.2,
+                    help='seconds between scans of the files')
+args = parser.parse_args()
+
+proj = Project(jobs=args.jobs or None)
+proj.parse(args.path)
+print('flint: parsed {} files; watching for changes'.format(len(proj.files)))
+
+Watcher(proj, interval=args.interval).run()